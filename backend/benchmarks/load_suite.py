@@ -0,0 +1,357 @@
+"""In-process load-test suite with per-endpoint latency and regression checks.
+
+Boots the FastAPI app inside this process (no network, no uvicorn) and drives
+it through httpx's ASGI transport. The database is either a real mongod
+(``--mongo-url``, a throwaway database that is dropped afterwards) or, by
+default, the mongomock-motor stand-in; the LLM is replaced by a stub with a
+fixed latency, so runs are offline and repeatable.
+
+N users with M transactions each are seeded directly into the store (rollups
+and monthly trends are built with the server's own helpers from the same
+groups its rebuild uses), then each scenario runs for ``--duration`` seconds
+with ``--concurrency`` workers:
+
+    login_storm     POST /api/auth/login (bcrypt on the hashing pool)
+    dashboard       GET  /api/dashboard
+    bulk_import     POST /api/transactions/bulk, NDJSON; ``--auto-share`` of the
+                    rows are left to the background categorizer (stub LLM)
+    report_fanout   the three report endpoints requested concurrently
+
+Numbers from mongomock measure the app's own overhead, not Mongo: the stand-in
+is synchronous and has no indexes. Compare like with like. For the same reason
+``--auto-share`` defaults to 0 on mongomock: every background category update
+is a full collection scan that blocks the event loop, which would starve the
+load workers rather than measure anything.
+
+Usage (from the backend directory):
+    python benchmarks/load_suite.py --users 50 --transactions 500 --duration 10
+    python benchmarks/load_suite.py --mongo-url mongodb://localhost:27017
+    python benchmarks/load_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/load_suite.py --baseline benchmarks/baseline.json --tolerance 0.25
+    python benchmarks/load_suite.py --check
+
+With ``--baseline`` the exit status is 1 when any endpoint's p95 grew, or its
+throughput fell, by more than the tolerance. ``--check`` compares against the
+committed ``benchmarks/baseline.json`` and reruns with the config it was
+recorded with; CI runs it on mongomock (.github/workflows/load-suite.yml).
+Absolute latencies depend on the machine, so re-record the baseline with
+``--save-baseline`` when the CI runners change.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SCENARIOS = ("login_storm", "dashboard", "bulk_import", "report_fanout")
+REPORT_ENDPOINTS = ("/api/reports/health-score", "/api/reports/pl", "/api/reports/balance-sheet")
+EXPENSE_CATEGORIES = (
+    "Food & Dining", "Transportation", "Shopping", "Bills & Utilities",
+    "Healthcare", "Entertainment", "Travel", "Education"
+)
+DESCRIPTIONS = ("swiggy order", "uber ride", "amazon purchase", "electricity bill", "pharmacy", "movie tickets")
+PASSWORD = "bench-password"
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+BASELINE_CONFIG = ("users", "transactions", "concurrency", "duration", "import_rows", "auto_share")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StubLlmClient:
+    """Answers categorization prompts after a fixed delay, deterministically"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, system_message: str, text: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        lines = text.splitlines()
+        if len(lines) == 1:
+            return self.pick(text)
+        return json.dumps([self.pick(line) for line in lines[1:]])
+
+    @staticmethod
+    def pick(line: str) -> str:
+        return EXPENSE_CATEGORIES[zlib.crc32(line.encode()) % len(EXPENSE_CATEGORIES)]
+
+
+def boot(args):
+    """Import the server with benchmark settings and point it at the chosen database"""
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = f"arthverse_bench_{uuid.uuid4().hex[:8]}"
+    os.environ["ENSURE_INDEXES_ON_STARTUP"] = "true" if args.mongo_url else "false"
+    # Every simulated user shares one client address; the limits would cap the run, not measure it
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    server = importlib.import_module("server")
+
+    if args.mongo_url:
+        server.open_database()
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.open_database(AsyncMongoMockClient())
+    server.categorizer.llm_client = StubLlmClient(args.llm_latency)
+    return server
+
+
+def random_transaction(rng, today):
+    expense = rng.random() < 0.8
+    return {
+        "amount": round(rng.uniform(50, 5000) if expense else rng.uniform(20000, 90000), 2),
+        "type": "expense" if expense else "income",
+        "category": rng.choice(EXPENSE_CATEGORIES) if expense else "Salary",
+        "description": rng.choice(DESCRIPTIONS) if expense else "salary credit",
+        "date": (today - timedelta(days=rng.randrange(365))).isoformat()
+    }
+
+
+async def seed(server, args, rng):
+    """Insert users, questionnaires, transactions and matching rollups; returns user dicts"""
+    password_hash = server.hash_password(PASSWORD)
+    today = datetime.now(timezone.utc).date()
+    now = datetime.now(timezone.utc).isoformat()
+    users = []
+    for number in range(args.users):
+        user_id = str(uuid.uuid4())
+        client_id = f"AV{uuid.uuid4().hex[:8].upper()}"
+        await server.db.users.insert_one({
+            "id": user_id, "client_id": client_id, "email": f"bench{number}@example.com",
+            "password_hash": password_hash, "name": f"Bench {number}", "mobile_number": "9999999999",
+            "age": 30, "city": "Pune", "marital_status": "single", "no_of_dependents": 0,
+            "data_privacy_consent": True, "monthly_income": 80000.0, "networth": 0, "created_at": now
+        })
+        questionnaire = server.FinancialQuestionnaire(
+            salary_income=80000, rent_expense=20000, groceries=8000, fuel=3000
+        ).model_dump()
+        await server.db.questionnaires.insert_one({**questionnaire, "user_id": user_id, "version": 1, "updated_at": now})
+
+        docs, groups = [], {}
+        for _ in range(args.transactions):
+            fields = server.stored_transaction_fields(server.TransactionCreate(**random_transaction(rng, today)))
+            docs.append({"id": str(uuid.uuid4()), "user_id": user_id, **fields, "created_at": now})
+            month = fields["date"].replace(day=1)
+            key = (fields["type"], fields["category"], month)
+            group = groups.setdefault(key, {"_id": {"type": key[0], "category": key[1], "month": month}, "total": 0, "count": 0})
+            group["total"] += fields["amount_paise"]
+            group["count"] += 1
+        if docs:
+            await server.transaction_store.insert_many(docs)
+        rollup = server.rollup_from_groups(user_id, list(groups.values()))
+        await server.db.user_rollups.insert_one({**rollup, "version": 1})
+        await server.rebuild_monthly_trends(user_id, list(groups.values()))
+
+        users.append({
+            "id": user_id,
+            "client_id": client_id,
+            "headers": {"Authorization": f"Bearer {server.create_token(user_id)}"}
+        })
+    return users
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, endpoint, seconds, ok):
+        self.samples.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    async def timed(self, endpoint, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        self.add(endpoint, time.perf_counter() - start, ok)
+
+
+def import_body(rng, rows, auto_share):
+    today = datetime.now(timezone.utc).date()
+    lines = []
+    for _ in range(rows):
+        row = random_transaction(rng, today)
+        # unique descriptions so re-runs never hit the duplicate check
+        row["description"] = f"{row['description']} {uuid.uuid4().hex[:8]}"
+        if rng.random() < auto_share:
+            row["category"] = "auto"
+        lines.append(json.dumps(row))
+    return "\n".join(lines).encode()
+
+
+async def run_scenario(name, client, users, args, rng):
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+    counter = iter(range(1 << 62))
+
+    async def step():
+        user = users[next(counter) % len(users)]
+        if name == "login_storm":
+            await recorder.timed("POST /api/auth/login", client.post(
+                "/api/auth/login", json={"client_id": user["client_id"], "password": PASSWORD}
+            ))
+        elif name == "dashboard":
+            await recorder.timed("GET /api/dashboard", client.get("/api/dashboard", headers=user["headers"]))
+        elif name == "bulk_import":
+            await recorder.timed("POST /api/transactions/bulk", client.post(
+                "/api/transactions/bulk", content=import_body(rng, args.import_rows, args.auto_share),
+                headers={**user["headers"], "Content-Type": "application/x-ndjson"}
+            ))
+        elif name == "report_fanout":
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                recorder.timed(f"GET {path}", client.get(path, headers=user["headers"])) for path in REPORT_ENDPOINTS
+            ))
+            recorder.add("fan-out (3 reports)", time.perf_counter() - start, True)
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await step()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for endpoint, samples in recorder.samples.items():
+        ms = [s * 1000 for s in samples]
+        results[endpoint] = {
+            "requests": len(ms),
+            "errors": recorder.errors.get(endpoint, 0),
+            "rps": round(len(ms) / elapsed, 2),
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3)
+        }
+    return results
+
+
+def print_results(results):
+    print(f"{'scenario':<14} {'endpoint':<34} {'n':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for scenario, endpoints in results.items():
+        for endpoint, row in endpoints.items():
+            print(
+                f"{scenario:<14} {endpoint:<34} {row['requests']:>7} {row['errors']:>5} {row['rps']:>9.1f} "
+                f"{row['p50_ms']:>7.2f}ms {row['p95_ms']:>7.2f}ms {row['p99_ms']:>7.2f}ms"
+            )
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns a list of regression messages (empty when within tolerance)"""
+    regressions = []
+    for scenario, endpoints in baseline["scenarios"].items():
+        for endpoint, expected in endpoints.items():
+            actual = results.get(scenario, {}).get(endpoint)
+            if actual is None:
+                continue
+            if actual["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario} {endpoint}: p95 {actual['p95_ms']:.2f}ms vs baseline {expected['p95_ms']:.2f}ms"
+                )
+            if actual["rps"] < expected["rps"] * (1 - tolerance):
+                regressions.append(f"{scenario} {endpoint}: {actual['rps']:.1f} rps vs baseline {expected['rps']:.1f} rps")
+            if actual["errors"] > expected["errors"]:
+                regressions.append(f"{scenario} {endpoint}: {actual['errors']} errors vs baseline {expected['errors']}")
+    return regressions
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    server = boot(args)
+    started = time.perf_counter()
+    users = await seed(server, args, rng)
+    print(f"Seeded {len(users)} users x {args.transactions} transactions in {time.perf_counter() - started:.1f}s "
+          f"({'mongod' if args.mongo_url else 'mongomock'}, {server.TRANSACTION_STORAGE} storage)")
+
+    results = {}
+    # The lifespan keeps the client opened by boot() and closes it on exit
+    async with server.app.router.lifespan_context(server.app):
+        try:
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                for name in args.scenarios:
+                    results[name] = await run_scenario(name, client, users, args, rng)
+        finally:
+            if args.mongo_url and not args.keep_data:
+                await server.client.drop_database(os.environ["DB_NAME"])
+
+    print_results(results)
+    report = {
+        "config": {key: getattr(args, key) for key in BASELINE_CONFIG}
+        | {"database": "mongod" if args.mongo_url else "mongomock", "storage": server.TRANSACTION_STORAGE},
+        "scenarios": results
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Wrote {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("config") != report["config"]:
+            print(f"warning: baseline was recorded with {baseline.get('config')}")
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"Within {args.tolerance:.0%} of baseline {args.baseline}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", help="run against this mongod instead of mongomock")
+    parser.add_argument("--keep-data", action="store_true", help="don't drop the benchmark database")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=200, help="seeded transactions per user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--import-rows", type=int, default=200, help="rows per bulk import request")
+    parser.add_argument("--auto-share", type=float, help="share of imported rows sent as 'auto' "
+                        "(default 0.5 on mongod, 0 on mongomock)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM delay in seconds")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results JSON as a new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline and fail on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--check", action="store_true",
+                        help=f"compare against {BASELINE_PATH.name} using the config it was recorded with")
+    args = parser.parse_args()
+    if args.check:
+        config = json.loads(BASELINE_PATH.read_text())["config"]
+        for key in BASELINE_CONFIG:
+            setattr(args, key, config[key])
+        args.baseline = str(BASELINE_PATH)
+    if args.auto_share is None:
+        args.auto_share = 0.5 if args.mongo_url else 0.0
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
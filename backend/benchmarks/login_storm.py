@@ -0,0 +1,122 @@
+"""Login storm benchmark.
+
+Measures latency of a cheap endpoint (GET /api/transactions) while logins are
+hammered concurrently. With bcrypt on the hashing pool, p99 of the probe
+endpoint should stay roughly flat between the baseline and storm phases.
+
+Usage:
+    python benchmarks/login_storm.py --base-url http://localhost:8001 \
+        --duration 10 --login-concurrency 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, samples):
+    ms = [s * 1000 for s in samples]
+    if not ms:
+        print(f"{name:<10} no samples")
+        return
+    print(
+        f"{name:<10} n={len(ms):<6} mean={statistics.mean(ms):7.2f}ms "
+        f"p50={percentile(ms, 50):7.2f}ms p95={percentile(ms, 95):7.2f}ms "
+        f"p99={percentile(ms, 99):7.2f}ms"
+    )
+
+
+async def create_user(client, password):
+    response = await client.post("/api/auth/register", json={
+        "email": f"bench_{uuid.uuid4().hex[:10]}@arthvyay.com",
+        "password": password,
+        "name": "Bench User",
+        "mobile_number": "9999999999",
+        "age": 30,
+        "city": "Raipur",
+        "marital_status": "single",
+        "no_of_dependents": 0,
+        "data_privacy_consent": True,
+        "monthly_income": 50000
+    })
+    response.raise_for_status()
+    data = response.json()
+    return data["token"], data["user"]["client_id"]
+
+
+async def probe_loop(client, token, stop_at, samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.get("/api/transactions?limit=5", headers=headers)
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        await asyncio.sleep(0.01)
+
+
+async def login_loop(client, client_id, password, stop_at, samples, statuses):
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.post("/api/auth/login", json={
+            "client_id": client_id,
+            "password": password
+        })
+        samples.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run(args):
+    password = "Bench123!"
+    limits = httpx.Limits(max_connections=args.login_concurrency + 8)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token, client_id = await create_user(client, password)
+
+        baseline = []
+        await probe_loop(client, token, time.perf_counter() + args.duration, baseline)
+
+        storm_probe, storm_login, statuses = [], [], {}
+        stop_at = time.perf_counter() + args.duration
+        await asyncio.gather(
+            probe_loop(client, token, stop_at, storm_probe),
+            *[
+                login_loop(client, client_id, password, stop_at, storm_login, statuses)
+                for _ in range(args.login_concurrency)
+            ]
+        )
+
+    print("GET /api/transactions")
+    summarize("baseline", baseline)
+    summarize("storm", storm_probe)
+    print("POST /api/auth/login")
+    summarize("storm", storm_login)
+    print(f"login statuses: {statuses}")
+
+    ratio = percentile(storm_probe, 99) / max(percentile(baseline, 99), 1e-9)
+    print(f"probe p99 storm/baseline ratio: {ratio:.2f}")
+    return 0 if ratio <= args.max_p99_ratio else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--max-p99-ratio", type=float, default=3.0,
+                        help="exit non-zero if probe p99 grows by more than this factor")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Metrics overhead micro-benchmark.
+
+Measures the per-event cost of recording a histogram sample, of the Mongo
+command listener (started + succeeded) and of the request-timing middleware
+around a trivial ASGI app, plus the time to render /metrics for a registry
+with a realistic number of series.
+
+Usage (from the backend directory):
+    python benchmarks/metrics_overhead.py --iterations 200000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import Histogram, Gauge, MongoCommandMetrics, Registry, RequestMetricsMiddleware  # noqa: E402
+
+
+def per_call(label, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / iterations * 1e9:8.0f} ns/call")
+
+
+async def asgi_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app, iterations):
+    route = SimpleNamespace(path="/api/transactions")
+    scope = {"type": "http", "method": "GET", "path": "/api/transactions", "route": route}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    histogram = Histogram("bench_seconds", "bench", ("route",))
+    per_call("histogram.observe", lambda: histogram.observe(0.0123, "/api/transactions"), args.iterations)
+
+    listener = MongoCommandMetrics(Histogram("mongo_seconds", "bench", ("command", "collection", "outcome")))
+    started = SimpleNamespace(command={"find": "transactions"}, command_name="find", connection_id=1, request_id=1)
+    succeeded = SimpleNamespace(command_name="find", connection_id=1, request_id=1, duration_micros=850)
+
+    def command():
+        listener.started(started)
+        listener.succeeded(succeeded)
+
+    per_call("mongo listener (per cmd)", command, args.iterations)
+
+    middleware = RequestMetricsMiddleware(
+        asgi_app, Histogram("http_seconds", "bench", ("method", "route", "status")), Gauge("in_flight", "bench")
+    )
+    bare = asyncio.run(drive(asgi_app, args.iterations))
+    timed = asyncio.run(drive(middleware, args.iterations))
+    print(f"{'middleware (per request)':<28} {(timed - bare) * 1e9:8.0f} ns/call")
+
+    registry = Registry("bench")
+    routes = registry.histogram("http_request_duration_seconds", "bench", ("method", "route", "status"))
+    for i in range(60):
+        for status in ("200", "400", "404"):
+            routes.observe(0.01, "GET", f"/api/route_{i}", status)
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"{'render 180 series':<28} {(time.perf_counter() - start) * 1000:8.2f} ms ({len(body)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Planning engine benchmark over a synthetic cohort.
+
+Generates questionnaires for N users (default 100k) with a mix of loans,
+deposits and properties, then times each stage of the batch pipeline:
+flattening questionnaires into arrays, the vectorized projection and the
+cohort percentile summary. A pure-Python per-user loop is timed on a sample
+for comparison.
+
+Usage (from the backend directory):
+    python benchmarks/planning_100k.py --users 100000 --years 10
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import planning  # noqa: E402
+
+
+def synthetic_questionnaires(count, seed):
+    rng = np.random.default_rng(seed)
+    salaries = rng.lognormal(13.5, 0.6, count).round(-3)
+    loan_counts = rng.integers(0, 4, count)
+    deposit_counts = rng.integers(0, 3, count)
+    questionnaires = []
+    for i in range(count):
+        questionnaires.append({
+            "salary_income": float(salaries[i]),
+            "rent_expense": float(rng.choice([0, 15000, 25000])),
+            "groceries": float(salaries[i] / 120),
+            "food_dining": float(salaries[i] / 300),
+            "health_insurance": 25000.0,
+            "bank_balance": float(salaries[i] * 0.3),
+            "mutual_funds_value": float(salaries[i] * rng.random()),
+            "credit_card_outstanding": float(rng.integers(0, 50000)),
+            "loans": [
+                {
+                    "principal_amount": float(rng.integers(100_000, 5_000_000)),
+                    "interest_rate": float(rng.uniform(7, 16)),
+                    "tenure_months": int(rng.choice([12, 36, 60, 120, 240])),
+                }
+                for _ in range(loan_counts[i])
+            ],
+            "interest_investments": [
+                {
+                    "principal_amount": float(rng.integers(10_000, 1_000_000)),
+                    "interest_rate": float(rng.uniform(5, 8)),
+                    "investment_type": str(rng.choice(["FD", "RD", "Bonds"])),
+                }
+                for _ in range(deposit_counts[i])
+            ],
+            "properties": [{"estimated_value": float(salaries[i] * 5), "area_sqft": 1000.0}],
+        })
+    return questionnaires
+
+
+def scalar_projection(q, years, a=planning.DEFAULT_ASSUMPTIONS):
+    """Reference per-user loop: month-by-month amortization in plain Python"""
+    inputs = planning.build_inputs([q])
+    balances = list(inputs.loan_principal)
+    payments = [float(planning.emi(p, r, n)) for p, r, n in zip(inputs.loan_principal, inputs.loan_rate, inputs.loan_tenure)]
+    interest_income = float(planning.yearly_interest_income(
+        inputs.investment_principal, inputs.investment_rate, inputs.investment_kind
+    ).sum())
+    financial = inputs.financial_assets[0]
+    net_worth = []
+    for year in range(years):
+        paid = 0.0
+        for month in range(12):
+            for j, balance in enumerate(balances):
+                if balance <= 0:
+                    continue
+                interest = balance * inputs.loan_rate[j] / 1200
+                payment = min(payments[j], balance + interest)
+                balances[j] = balance + interest - payment
+                paid += payment
+        cash_flow = (
+            12 * inputs.monthly_income[0] * (1 + a["income_growth"]) ** year + interest_income
+            - 12 * inputs.monthly_expenses[0] * (1 + a["inflation"]) ** year - paid
+        )
+        financial = financial * (1 + a["expected_return"]) + cash_flow * (1 + a["expected_return"]) ** 0.5
+        net_worth.append(financial - sum(balances))
+    return net_worth
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f}ms")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=2_000, help="users for the pure-Python comparison")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    questionnaires, _ = timed(f"generate {args.users} users", synthetic_questionnaires, args.users, args.seed)
+    inputs, build_time = timed("build_inputs", planning.build_inputs, questionnaires)
+    print(f"{'':<28} {inputs.loan_owner.size} loans, {inputs.investment_owner.size} deposits")
+    projection, project_time = timed("project (vectorized)", planning.project, inputs, years=args.years)
+    timed("cohort_summary", planning.cohort_summary, inputs, projection)
+
+    sample = questionnaires[:args.sample]
+    _, loop_time = timed(f"python loop ({len(sample)} users)", lambda: [scalar_projection(q, args.years) for q in sample])
+    estimated = loop_time * args.users / max(1, len(sample))
+    print(f"{'python loop (extrapolated)':<28} {estimated * 1000:9.1f}ms")
+    print(f"speedup vs loop (projection only): {estimated / max(project_time, 1e-9):.1f}x; "
+          f"end to end: {estimated / max(project_time + build_time, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
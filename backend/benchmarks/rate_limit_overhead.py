@@ -0,0 +1,90 @@
+"""Rate limiting overhead micro-benchmark.
+
+Measures the cost of one in-process bucket check (hot key, and spread over
+many keys), of a ``RateLimiter.check`` applying two scopes, and of the
+per-IP middleware around a trivial ASGI app, plus the memory held per key.
+
+Usage (from the backend directory):
+    python benchmarks/rate_limit_overhead.py --iterations 200000 --keys 100000
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ratelimit import Rate, RateLimiter, RateLimitMiddleware, TokenBuckets  # noqa: E402
+
+# Generous enough that no call is rejected, so every iteration takes the full path
+RATE = Rate(10**9, 60)
+
+
+def per_call(label, fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / iterations * 1e9:8.0f} ns/call")
+
+
+async def asgi_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app, iterations):
+    scope = {"type": "http", "method": "GET", "path": "/api/dashboard", "client": ("10.0.0.1", 50000)}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / iterations
+
+
+async def checks(limiter, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        await limiter.check("login", ip="10.0.0.1", client_id=f"AV{i % 1000:08d}")
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=100_000)
+    args = parser.parse_args()
+
+    buckets = TokenBuckets()
+    per_call("bucket take (one key)", lambda i: buckets.take("login:ip:10.0.0.1", RATE), args.iterations)
+
+    keys = [f"login:client_id:AV{i:08d}" for i in range(args.keys)]
+    spread = TokenBuckets(max_keys=args.keys)
+    per_call(f"bucket take ({args.keys} keys)", lambda i: spread.take(keys[i % args.keys], RATE), args.iterations)
+
+    limiter = RateLimiter({"login": {"ip": RATE, "client_id": RATE}, "default": {"ip": RATE}})
+    print(f"{'limiter check (2 scopes)':<28} {asyncio.run(checks(limiter, args.iterations)) * 1e9:8.0f} ns/call")
+
+    bare = asyncio.run(drive(asgi_app, args.iterations))
+    limited = asyncio.run(drive(RateLimitMiddleware(asgi_app, limiter), args.iterations))
+    print(f"{'middleware (per request)':<28} {(limited - bare) * 1e9:8.0f} ns/call")
+
+    tracemalloc.start()
+    table = TokenBuckets(max_keys=args.keys)
+    for i in range(args.keys):
+        table.take(f"login:client_id:AV{i:08d}", RATE)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'memory per key':<28} {current / args.keys:8.0f} bytes ({current / 2**20:.1f} MB for {args.keys})")
+
+
+if __name__ == "__main__":
+    main()
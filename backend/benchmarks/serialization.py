@@ -0,0 +1,97 @@
+"""Serialization micro-benchmarks for transaction list responses.
+
+Compares the old response path (build ``Transaction`` models, let FastAPI
+validate them again against ``response_model``, ``jsonable_encoder`` and
+stdlib json) with the fast path (``to_response`` projection + orjson) for
+1k and 10k item lists, plus a single user document.
+
+Usage (from the backend directory):
+    python benchmarks/serialization.py --repeat 20
+"""
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+def stored_transactions(count):
+    user_id = str(uuid.uuid4())
+    created_at = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "amount_paise": 1000 + i * 37,
+            "type": "expense" if i % 4 else "income",
+            "category": "Food & Dining",
+            "description": f"Transaction number {i}",
+            "date": datetime(2024, 1 + i % 12, 1 + i % 28),
+            "created_at": created_at,
+            "content_hash": uuid.uuid4().hex,
+        }
+        for i in range(count)
+    ]
+
+
+TRANSACTION_LIST = TypeAdapter(List[server.Transaction])
+
+
+def model_path(docs):
+    models = [server.Transaction(**server.transaction_out(t)) for t in docs]
+    # FastAPI re-validates the return value against response_model, then encodes
+    validated = TRANSACTION_LIST.validate_python(jsonable_encoder(models))
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_path(docs):
+    return orjson.dumps([server.to_response(server.Transaction, server.transaction_out(t)) for t in docs])
+
+
+def user_model_path(user):
+    model = server.UserResponse(**user)
+    validated = server.UserResponse.model_validate(jsonable_encoder(model))
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def user_fast_path(user):
+    return orjson.dumps(server.to_response(server.UserResponse, user))
+
+
+def compare(label, before, after, payload, repeat):
+    assert json.loads(before(payload)) == json.loads(after(payload)), "paths disagree"
+    slow = min(timeit.repeat(lambda: before(payload), number=1, repeat=repeat))
+    fast = min(timeit.repeat(lambda: after(payload), number=1, repeat=repeat))
+    print(f"{label:<22} before={slow * 1000:9.3f}ms after={fast * 1000:9.3f}ms speedup={slow / fast:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for count in (1_000, 10_000):
+        compare(f"transactions x{count}", model_path, fast_path, stored_transactions(count), args.repeat)
+
+    user = {
+        "id": str(uuid.uuid4()), "client_id": "AV12345678", "email": "bench@example.com", "name": "Bench",
+        "mobile_number": "9999999999", "age": 30, "city": "Pune", "marital_status": "single",
+        "no_of_dependents": 0, "monthly_income": 85000.0, "networth": 1250000.0,
+        "created_at": datetime.now(timezone.utc).isoformat(), "data_privacy_consent": True,
+    }
+    compare("user", user_model_path, user_fast_path, user, args.repeat * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Worker cold-start benchmark: import time and resident memory of ``server``.
+
+Each run starts a fresh interpreter that imports the app module the way a
+uvicorn worker does and reports the wall time of the import, the RSS right
+after it and whether the LLM SDK (emergentintegrations/litellm/openai) was
+pulled in. With ``--warm-up`` the child then also runs the LLM client's
+warm-up, which shows what ``LLM_WARM_UP=true`` costs per worker. No database
+connection is opened; the app connects in its lifespan.
+
+Usage (from the backend directory):
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --warm-up
+    python benchmarks/startup.py --save-baseline benchmarks/startup_baseline.json
+    python benchmarks/startup.py --baseline benchmarks/startup_baseline.json --tolerance 0.25
+
+With ``--baseline`` the exit status is 1 when the median import time or RSS
+grew by more than the tolerance, or when importing the app loads the LLM SDK.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+LLM_MODULES = ("emergentintegrations", "litellm", "openai", "tiktoken")
+
+CHILD = """
+import asyncio, json, sys, time
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def llm_loaded():
+    return sorted(name for name in {LLM_MODULES!r} if name in sys.modules)
+
+result = {{"baseline_rss_mb": rss_mb()}}
+started = time.perf_counter()
+import server
+result["import_seconds"] = time.perf_counter() - started
+result["rss_mb"] = rss_mb()
+result["llm_modules"] = llm_loaded()
+if {warm_up!r}:
+    started = time.perf_counter()
+    result["warm_up_ok"] = asyncio.run(server.categorizer.llm_client.warm_up())
+    result["warm_up_seconds"] = time.perf_counter() - started
+    result["warm_rss_mb"] = rss_mb()
+    result["warm_llm_modules"] = llm_loaded()
+print(json.dumps(result))
+"""
+
+
+def run_child(warm_up: bool) -> dict:
+    env = {**os.environ, "METRICS_ENABLED": os.environ.get("METRICS_ENABLED", "true")}
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "arthverse_startup_bench")
+    code = CHILD.format(LLM_MODULES=LLM_MODULES, warm_up=warm_up)
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs) -> dict:
+    summary = {
+        "import_seconds": statistics.median(run["import_seconds"] for run in runs),
+        "rss_mb": statistics.median(run["rss_mb"] for run in runs),
+        "interpreter_rss_mb": statistics.median(run["baseline_rss_mb"] for run in runs),
+        "llm_modules_on_import": sorted({name for run in runs for name in run["llm_modules"]})
+    }
+    if "warm_up_seconds" in runs[0]:
+        summary["warm_up_seconds"] = statistics.median(run["warm_up_seconds"] for run in runs)
+        summary["warm_rss_mb"] = statistics.median(run["warm_rss_mb"] for run in runs)
+        summary["warm_up_ok"] = all(run["warm_up_ok"] for run in runs)
+    return summary
+
+
+def compare_to_baseline(summary, baseline, tolerance):
+    """Returns a list of regression messages (empty when within tolerance)"""
+    regressions = []
+    for key, unit in (("import_seconds", "s"), ("rss_mb", " MB")):
+        if summary[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {summary[key]:.2f}{unit} vs baseline {baseline[key]:.2f}{unit}")
+    if summary["llm_modules_on_import"]:
+        regressions.append(f"importing server loads {', '.join(summary['llm_modules_on_import'])}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="also time the LLM client warm-up")
+    parser.add_argument("--output", help="write the summary JSON here")
+    parser.add_argument("--save-baseline", help="write the summary JSON as a new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline and fail on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    runs = [run_child(args.warm_up) for _ in range(args.runs)]
+    summary = summarize(runs)
+
+    print(f"import server        {summary['import_seconds'] * 1000:8.0f} ms (median of {args.runs})")
+    print(f"RSS after import     {summary['rss_mb']:8.1f} MB (bare interpreter {summary['interpreter_rss_mb']:.1f} MB)")
+    print(f"LLM SDK on import    {', '.join(summary['llm_modules_on_import']) or 'not loaded'}")
+    if args.warm_up:
+        status = "" if summary["warm_up_ok"] else " (SDK import failed)"
+        print(f"LLM warm-up          {summary['warm_up_seconds'] * 1000:8.0f} ms{status}")
+        print(f"RSS after warm-up    {summary['warm_rss_mb']:8.1f} MB")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).write_text(json.dumps(summary, indent=2) + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(summary, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"Within {args.tolerance:.0%} of baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,566 @@
+"""Expense categorization: keyword pre-classifier, caches and batched LLM calls.
+
+Lookups go, cheapest first, through an in-process LRU, a local keyword
+classifier, a persistent Mongo cache and finally the LLM, which receives every
+still-unknown description of a request in one batched prompt.
+
+Model calls are coalesced per (description, amount bucket) across concurrent
+requests, bounded by a global semaphore and a per-call timeout, and guarded by
+a circuit breaker that answers 'Other'/'low' immediately while the provider is
+failing.
+
+The LLM is reached only through an ``LlmClient`` (anything with an async
+``complete(system_message, text)``), so tests can pass a stub and run offline.
+``EmergentLlmClient`` imports its SDK (litellm, openai, tiktoken, ...) on first
+use rather than at import time; ``warm_up()`` loads it ahead of traffic.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Protocol
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+VALID_CATEGORIES = [
+    'Food & Dining', 'Transportation', 'Shopping', 'Bills & Utilities',
+    'Healthcare', 'Entertainment', 'Travel', 'Education', 'Investment', 'Other'
+]
+
+# Returned, as this very object, whenever no answer was obtained (breaker open,
+# timeout, provider error, unusable reply); see ``is_fallback``
+FALLBACK = {'category': 'Other', 'confidence': 'low'}
+
+SYSTEM_MESSAGE = (
+    "You are a financial assistant. Categorize expenses into one of these categories: "
+    + ", ".join(VALID_CATEGORIES)
+    + ". Respond with ONLY the category name, nothing else."
+)
+
+BATCH_SYSTEM_MESSAGE = (
+    "You are a financial assistant. Categorize each numbered expense into one of these categories: "
+    + ", ".join(VALID_CATEGORIES)
+    + ". Respond with ONLY a JSON array of category names, one per expense, in the same order."
+)
+
+# Tokens that carry no merchant information in bank narrations
+NOISE_TOKENS = {
+    'upi', 'pos', 'neft', 'imps', 'rtgs', 'ach', 'nach', 'ecs', 'txn', 'ref', 'refno',
+    'payment', 'paid', 'to', 'from', 'via', 'by', 'for', 'the', 'pvt', 'ltd', 'private',
+    'limited', 'india', 'in', 'www', 'com', 'co', 'dr', 'cr', 'debit', 'credit', 'card'
+}
+
+KEYWORDS = {
+    'Food & Dining': (
+        'swiggy', 'zomato', 'dominos', 'domino', 'pizza', 'mcdonalds', 'kfc', 'starbucks',
+        'cafe', 'restaurant', 'dining', 'food', 'eatsure', 'dunzo', 'blinkit', 'zepto',
+        'bigbasket', 'grocery', 'groceries', 'bakery', 'burger'
+    ),
+    'Transportation': (
+        'uber', 'ola', 'rapido', 'metro', 'petrol', 'diesel', 'fuel', 'fastag', 'parking',
+        'hpcl', 'bpcl', 'iocl', 'indianoil', 'taxi', 'cab', 'toll'
+    ),
+    'Shopping': (
+        'amazon', 'flipkart', 'myntra', 'ajio', 'meesho', 'nykaa', 'tatacliq', 'dmart',
+        'reliance trends', 'lifestyle', 'decathlon', 'ikea', 'croma', 'shopping'
+    ),
+    'Bills & Utilities': (
+        'electricity', 'bescom', 'msedcl', 'tneb', 'airtel', 'jio', 'vodafone',
+        'bsnl', 'broadband', 'recharge', 'dth', 'tatasky', 'water', 'gas', 'indane',
+        'lpg', 'bill', 'utility', 'rent', 'maintenance'
+    ),
+    'Healthcare': (
+        'pharmacy', 'apollo', 'medplus', 'netmeds', 'pharmeasy', '1mg', 'hospital',
+        'clinic', 'doctor', 'diagnostic', 'diagnostics', 'medical', 'medicine', 'dental'
+    ),
+    'Entertainment': (
+        'netflix', 'hotstar', 'prime video', 'spotify', 'bookmyshow', 'pvr', 'inox',
+        'youtube', 'gaming', 'steam', 'movie', 'cinema', 'concert'
+    ),
+    'Travel': (
+        'makemytrip', 'goibibo', 'cleartrip', 'yatra', 'irctc', 'indigo', 'airindia',
+        'vistara', 'spicejet', 'akasa', 'oyo', 'airbnb', 'hotel', 'flight', 'redbus', 'booking'
+    ),
+    'Education': (
+        'school', 'college', 'university', 'tuition', 'fees', 'udemy', 'coursera',
+        'byjus', 'unacademy', 'upgrad', 'books', 'exam', 'course'
+    ),
+    'Investment': (
+        'zerodha', 'groww', 'upstox', 'kuvera', 'sip', 'mutual fund', 'nps',
+        'ppf', 'lic', 'smallcase', 'angel one', 'icici direct', 'fd', 'fixed deposit'
+    ),
+}
+
+
+class LlmClient(Protocol):
+    async def complete(self, system_message: str, text: str) -> str:
+        ...
+
+
+class EmergentLlmClient:
+    """``LlmClient`` backed by emergentintegrations' LlmChat, imported on first use"""
+
+    def __init__(self, api_key: Optional[str], provider: str = "openai", model: str = "gpt-5.1"):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.sdk = None
+
+    @staticmethod
+    def _import_sdk():
+        from emergentintegrations.llm import chat
+        return chat
+
+    async def load(self):
+        # The import takes seconds; run it off the event loop. Concurrent
+        # first calls are serialized by the interpreter's import lock.
+        if self.sdk is None:
+            self.sdk = await asyncio.to_thread(self._import_sdk)
+        return self.sdk
+
+    async def warm_up(self) -> bool:
+        """Load the SDK ahead of the first call; False (logged) if it can't be imported"""
+        started = time.perf_counter()
+        try:
+            await self.load()
+        except ImportError:
+            logger.exception("LLM client warm-up failed")
+            return False
+        logger.info("LLM client loaded in %.2fs", time.perf_counter() - started)
+        return True
+
+    async def complete(self, system_message: str, text: str) -> str:
+        sdk = await self.load()
+        chat = sdk.LlmChat(
+            api_key=self.api_key,
+            session_id=f"categorize-{uuid.uuid4()}",
+            system_message=system_message
+        ).with_model(self.provider, self.model)
+        return await chat.send_message(sdk.UserMessage(text=text))
+
+
+def normalize_description(description: str) -> str:
+    """Reduce a narration to its merchant words: 'UPI/SWIGGY/4821/Payment' -> 'swiggy'"""
+    tokens = re.split(r'[^a-z0-9&]+', description.lower())
+    kept = [
+        token for token in tokens
+        if token and token not in NOISE_TOKENS and not any(ch.isdigit() for ch in token)
+    ]
+    return ' '.join(kept) or description.strip().lower()
+
+
+def _compile_keywords():
+    patterns = {}
+    for category, keywords in KEYWORDS.items():
+        alternatives = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        patterns[category] = re.compile(rf'\b(?:{alternatives})\b')
+    return patterns
+
+
+KEYWORD_PATTERNS = _compile_keywords()
+
+
+def classify_by_keywords(normalized: str) -> Optional[dict]:
+    """Local classifier; only answers when exactly one category matches"""
+    matches = [category for category, pattern in KEYWORD_PATTERNS.items() if pattern.search(normalized)]
+    if len(matches) == 1:
+        return {'category': matches[0], 'confidence': 'high'}
+    return None
+
+
+def is_fallback(result: dict) -> bool:
+    """True for the placeholder answer of a failed lookup, as opposed to a real 'Other'"""
+    return result is FALLBACK
+
+
+def parse_category(text: str) -> str:
+    category = text.strip().strip('."\'')
+    return category if category in VALID_CATEGORIES else 'Other'
+
+
+def parse_batch_response(text: str, expected: int) -> Optional[List[str]]:
+    """Read the JSON array from a batch reply; None if it doesn't line up"""
+    match = re.search(r'\[.*\]', text, re.S)
+    candidates = None
+    if match:
+        try:
+            candidates = json.loads(match.group(0))
+        except ValueError:
+            candidates = None
+    if candidates is None:
+        candidates = [re.sub(r'^\s*\d+[.)]\s*', '', line) for line in text.splitlines() if line.strip()]
+    if not isinstance(candidates, list) or len(candidates) != expected:
+        return None
+    return [parse_category(str(c)) for c in candidates]
+
+
+class LruCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def amount_bucket(amount: float) -> int:
+    """Order of magnitude of an amount, so 120 and 180 coalesce but 120 and 12000 don't"""
+    return int(math.log10(abs(amount))) if amount else 0
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open every call is rejected. After ``reset_timeout`` seconds a single
+    trial call is let through (half-open); its outcome closes or re-opens the
+    breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == 'open':
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = 'half_open'
+            self.trial_in_flight = False
+        if self.state == 'half_open':
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.state = 'open'
+            self.opened_at = self.clock()
+        self.trial_in_flight = False
+
+
+class ExpenseCategorizer:
+    def __init__(
+        self,
+        llm_client: LlmClient,
+        cache_collection=None,
+        cache_size: int = 10000,
+        batch_size: int = 50,
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        breaker: Optional[CircuitBreaker] = None,
+        on_llm_call: Optional[Callable[[float, str], None]] = None
+    ):
+        self.llm_client = llm_client
+        self.cache_collection = cache_collection
+        self.memory_cache = LruCache(cache_size)
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        # Called with (seconds, outcome) after every model call
+        self.on_llm_call = on_llm_call
+        self.inflight = {}
+        self.stats = {
+            'memory': 0, 'keyword': 0, 'persistent': 0, 'llm': 0, 'llm_calls': 0,
+            'failed': 0, 'coalesced': 0, 'timeouts': 0, 'short_circuited': 0
+        }
+
+    async def categorize(self, description: str, amount: float) -> dict:
+        return (await self.categorize_many([(description, amount)]))[0]
+
+    async def categorize_many(self, items: List[tuple]) -> List[dict]:
+        """Categorize ``(description, amount)`` pairs, calling the LLM at most once per batch"""
+        keys = [normalize_description(description) for description, _ in items]
+        resolved = {}
+
+        for key in set(keys):
+            cached = self.memory_cache.get(key)
+            if cached is not None:
+                resolved[key] = cached
+                self.stats['memory'] += 1
+                continue
+            local = classify_by_keywords(key)
+            if local is not None:
+                resolved[key] = local
+                self.memory_cache.set(key, local)
+                self.stats['keyword'] += 1
+
+        pending = [key for key in dict.fromkeys(keys) if key not in resolved]
+        if pending and self.cache_collection is not None:
+            async for doc in self.cache_collection.find({"key": {"$in": pending}}, {"_id": 0}):
+                result = {'category': doc['category'], 'confidence': doc['confidence']}
+                resolved[doc['key']] = result
+                self.memory_cache.set(doc['key'], result)
+                self.stats['persistent'] += 1
+            pending = [key for key in pending if key not in resolved]
+
+        # One representative (description, amount) per unknown key for the prompt
+        samples = {}
+        for key, item in zip(keys, items):
+            samples.setdefault(key, item)
+
+        # Join identical in-flight lookups from other requests; own the rest
+        loop = asyncio.get_running_loop()
+        flights, owned = [], []
+        for key in pending:
+            flight_key = (key, amount_bucket(samples[key][1]))
+            future = self.inflight.get(flight_key)
+            if future is None:
+                future = loop.create_future()
+                self.inflight[flight_key] = future
+                owned.append((flight_key, key))
+            else:
+                self.stats['coalesced'] += 1
+            flights.append((key, future))
+
+        try:
+            for start in range(0, len(owned), self.batch_size):
+                chunk = owned[start:start + self.batch_size]
+                results = await self._categorize_with_llm([(key, samples[key]) for _, key in chunk])
+                for flight_key, key in chunk:
+                    self.inflight[flight_key].set_result(results[key])
+        finally:
+            for flight_key, _ in owned:
+                future = self.inflight.pop(flight_key)
+                if not future.done():
+                    future.set_result(FALLBACK)
+
+        for key, future in flights:
+            # shield: a cancelled waiter must not cancel a lookup others share
+            resolved[key] = await asyncio.shield(future)
+
+        return [resolved.get(key, FALLBACK) for key in keys]
+
+    async def _complete(self, system_message: str, text: str) -> str:
+        async with self.semaphore:
+            return await self.llm_client.complete(system_message, text)
+
+    async def _categorize_with_llm(self, entries: List[tuple]) -> dict:
+        fallback = {key: FALLBACK for key, _ in entries}
+        if not self.breaker.allow():
+            self.stats['short_circuited'] += len(entries)
+            return fallback
+
+        self.stats['llm_calls'] += 1
+        if len(entries) == 1:
+            _, (description, amount) = entries[0]
+            system_message = SYSTEM_MESSAGE
+            text = f"Categorize this expense: '{description}' amount: ${amount}"
+        else:
+            system_message = BATCH_SYSTEM_MESSAGE
+            text = "Categorize these expenses:\n" + "\n".join(
+                f"{number}. '{description}' amount: ${amount}"
+                for number, (_, (description, amount)) in enumerate(entries, start=1)
+            )
+
+        started = time.perf_counter()
+        try:
+            # The timeout covers waiting for a semaphore slot as well
+            response = await asyncio.wait_for(self._complete(system_message, text), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"AI categorization timed out after {self.timeout}s")
+            self._record_call(started, 'timeout')
+            self.stats['timeouts'] += 1
+            self.stats['failed'] += len(entries)
+            self.breaker.record_failure()
+            return fallback
+        except Exception as e:
+            logger.error(f"AI categorization failed: {e}")
+            self._record_call(started, 'error')
+            self.stats['failed'] += len(entries)
+            self.breaker.record_failure()
+            return fallback
+        self.breaker.record_success()
+
+        if len(entries) == 1:
+            categories = [parse_category(response)]
+        else:
+            categories = parse_batch_response(response, len(entries))
+            if categories is None:
+                logger.error("AI categorization batch response did not match the request")
+                self._record_call(started, 'invalid')
+                self.stats['failed'] += len(entries)
+                return fallback
+        self._record_call(started, 'ok')
+
+        results = {}
+        for (key, _), category in zip(entries, categories):
+            results[key] = {'category': category, 'confidence': 'high'}
+            self.memory_cache.set(key, results[key])
+        self.stats['llm'] += len(entries)
+        await self._persist(results)
+        return results
+
+    def _record_call(self, started: float, outcome: str):
+        if self.on_llm_call is not None:
+            self.on_llm_call(time.perf_counter() - started, outcome)
+
+    async def _persist(self, results: dict):
+        if self.cache_collection is None or not results:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            await self.cache_collection.bulk_write([
+                UpdateOne(
+                    {"key": key},
+                    {"$set": {"key": key, **result, "updated_at": now}},
+                    upsert=True
+                )
+                for key, result in results.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Category cache write failed: {e}")
+
+
+class CategorizationQueue:
+    """Background worker for transactions saved without a category.
+
+    Items are drained in batches of up to ``batch_size`` (waiting at most
+    ``linger`` seconds for a batch to fill), categorized with a single
+    ``categorize_many`` call and handed to ``apply_results``. Only real answers
+    are applied: rows that got the fallback (breaker open, timeout, provider
+    error) stay flagged pending and are retried after ``retry_delay``. The queue
+    is in-process; rows that are flagged pending in the database but were
+    dropped (full queue, restart) are picked up again by ``load_pending``.
+    """
+
+    def __init__(self, categorizer: ExpenseCategorizer, apply_results, load_pending=None,
+                 batch_size: int = 50, linger: float = 0.5, maxsize: int = 10000, retry_delay: float = 5.0):
+        self.categorizer = categorizer
+        self.apply_results = apply_results
+        self.load_pending = load_pending
+        self.batch_size = batch_size
+        self.linger = linger
+        self.retry_delay = retry_delay
+        self.queue = asyncio.Queue(maxsize)
+        self.queued_ids = set()
+        self.needs_sweep = load_pending is not None
+        self.task = None
+        self.stats = {
+            'enqueued': 0, 'processed': 0, 'batches': 0, 'dropped': 0, 'errors': 0, 'deferred': 0,
+            'last_batch_size': 0, 'last_lag_seconds': 0.0, 'max_lag_seconds': 0.0
+        }
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def snapshot(self) -> dict:
+        return {'depth': self.depth, 'running': self.task is not None and not self.task.done(), **self.stats}
+
+    def enqueue(self, transaction: dict) -> bool:
+        if transaction['id'] in self.queued_ids:
+            return True
+        try:
+            self.queue.put_nowait((time.monotonic(), transaction))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            self.needs_sweep = True
+            return False
+        self.queued_ids.add(transaction['id'])
+        self.stats['enqueued'] += 1
+        return True
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _sweep(self):
+        self.needs_sweep = False
+        room = self.queue.maxsize - self.depth if self.queue.maxsize else 1000
+        for transaction in await self.load_pending(room):
+            self.enqueue(transaction)
+
+    async def _next_batch(self) -> List[tuple]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            if self.needs_sweep and self.depth == 0:
+                try:
+                    await self._sweep()
+                except Exception as e:
+                    logger.error(f"Categorization sweep failed: {e}")
+            batch = await self._next_batch()
+            transactions = [transaction for _, transaction in batch]
+            deferred = 0
+            try:
+                results = await self.categorizer.categorize_many(
+                    [(t['description'], t['amount']) for t in transactions]
+                )
+                answered = [(t, result) for t, result in zip(transactions, results) if not is_fallback(result)]
+                deferred = len(transactions) - len(answered)
+                if answered:
+                    await self.apply_results(answered)
+            except Exception as e:
+                # Rows stay flagged pending in the database; retry them later
+                logger.error(f"Background categorization batch failed: {e}")
+                self.stats['errors'] += 1
+                self.needs_sweep = self.load_pending is not None
+                await asyncio.sleep(self.retry_delay)
+            finally:
+                for transaction in transactions:
+                    self.queued_ids.discard(transaction['id'])
+            if deferred:
+                # No answer for these rows; they stay pending until the provider recovers
+                self.stats['deferred'] += deferred
+                self.needs_sweep = self.load_pending is not None
+                await asyncio.sleep(self.retry_delay)
+
+            now = time.monotonic()
+            lag = now - batch[0][0]
+            self.stats['batches'] += 1
+            self.stats['processed'] += len(batch)
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_lag_seconds'] = round(lag, 3)
+            self.stats['max_lag_seconds'] = round(max(self.stats['max_lag_seconds'], lag), 3)
@@ -0,0 +1,315 @@
+"""In-process metrics registry rendered in the Prometheus text format.
+
+Counters, gauges and fixed-bucket histograms keep their state in plain
+dicts keyed by label values, so recording a sample is a dict lookup, a
+``bisect`` and a few additions under a per-metric lock (pymongo calls its
+listeners from Motor's worker threads). Gauges and counters may instead be
+backed by a callback that is evaluated only when ``/metrics`` is scraped,
+which is how existing ``stats`` dicts are exposed without touching their
+hot paths.
+
+Also here: the ASGI middleware that times requests per route template, the
+pymongo command and connection pool listeners and the event-loop lag monitor.
+"""
+import asyncio
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from pymongo import monitoring
+
+# Seconds; tuned for API requests and Mongo commands (1 ms .. 10 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), callback: Optional[Callable] = None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.callback = callback
+        self.values: Dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def samples(self) -> Dict[tuple, float]:
+        """``{label values: value}``; callbacks return a number or such a dict"""
+        if self.callback is None:
+            with self.lock:
+                return dict(self.values)
+        result = self.callback()
+        if isinstance(result, dict):
+            return result
+        return {(): result}
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, value in sorted(self.samples().items()):
+            yield f"{self.name}{format_labels(self.labels, values)} {format_value(value)}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; ``observe`` stores per-bucket counts only"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # per-bucket counts (+Inf last), sum
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            states = sorted((labels, (list(state[0]), state[1])) for labels, state in self.values.items())
+        for labels, (counts, total) in states:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                yield f"{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self, namespace: str = ""):
+        self.prefix = f"{namespace}_" if namespace else ""
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = (), callback: Optional[Callable] = None) -> Counter:
+        return self.register(Counter(self.prefix + name, help, labels, callback))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = (), callback: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(self.prefix + name, help, labels, callback))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(self.prefix + name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware timing HTTP requests until the last body chunk is sent.
+
+    Requests are labelled by route template (``/api/transactions/{transaction_id}``)
+    rather than raw path, so label cardinality stays bounded; anything that
+    matched no route is reported as ``unmatched``.
+    """
+
+    def __init__(self, app, duration: Histogram, in_flight: Gauge, exclude: Iterable[str] = ()):
+        self.app = app
+        self.duration = duration
+        self.in_flight = in_flight
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            self.duration.observe(time.perf_counter() - start, scope["method"], template, str(status_code))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command Motor/pymongo sends; pass via ``event_listeners=[...]``"""
+
+    def __init__(self, duration: Histogram):
+        self.duration = duration
+        self.collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self.collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def _record(self, event, outcome: str):
+        collection = self.collections.pop((event.connection_id, event.request_id), "")
+        self.duration.observe(event.duration_micros / 1e6, event.command_name, collection, outcome)
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+
+class ConnectionPoolStats(monitoring.ConnectionPoolListener):
+    """Per-server pool occupancy tracked from pymongo's connection pool (CMAP) events"""
+
+    # pymongo only reports non-default pool options in PoolCreatedEvent
+    DEFAULT_MAX_POOL_SIZE = 100
+
+    def __init__(self):
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def _update(self, address, **changes):
+        with self.lock:
+            pool = self.pools.setdefault(address, {
+                "max_size": self.DEFAULT_MAX_POOL_SIZE, "open": 0, "in_use": 0, "waiting": 0,
+                "checkout_failures": 0, "checkout_timeouts": 0, "cleared": 0
+            })
+            for key, delta in changes.items():
+                pool[key] += delta
+
+    def pool_created(self, event):
+        self._update(event.address)
+        self.pools[event.address]["max_size"] = event.options.get("maxPoolSize", self.DEFAULT_MAX_POOL_SIZE)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        with self.lock:
+            self.pools.pop(event.address, None)
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        timed_out = event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT
+        self._update(event.address, waiting=-1, checkout_failures=1, checkout_timeouts=int(timed_out))
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """``{"host:port": counts + saturation}``; saturation is in_use / max_size"""
+        with self.lock:
+            pools = {address: dict(pool) for address, pool in self.pools.items()}
+        for pool in pools.values():
+            pool["saturation"] = round(pool["in_use"] / pool["max_size"], 4) if pool["max_size"] else 0.0
+        return {f"{host}:{port}": pool for (host, port), pool in pools.items()}
+
+
+class EventLoopLagMonitor:
+    """Sleeps ``interval`` seconds in a loop and records how late each wake-up is"""
+
+    def __init__(self, lag: Histogram, interval: float = 0.5):
+        self.lag = lag
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.lag.observe(lag)
@@ -0,0 +1,524 @@
+"""Vectorized financial planning engine for questionnaire data.
+
+Everything here works on NumPy arrays so one call can cover a single user or
+every user in the database: loans, interest-bearing investments and users are
+rows, months or years are columns. Nothing here touches the database.
+
+Field conventions follow the questionnaire form: rental income and most
+expenses are monthly, salary/business/other income and insurance/vehicle costs
+are yearly, custom entries carry their own ``frequency``. Loan
+``principal_amount`` is read as the amount outstanding today and
+``tenure_months`` as the months remaining.
+"""
+import numpy as np
+
+MONTHLY_INCOME_FIELDS = ('rental_property1', 'rental_property2')
+YEARLY_INCOME_FIELDS = (
+    'salary_income', 'business_income', 'dividend_income', 'capital_gains',
+    'freelance_income', 'other_income'
+)
+# 'emis' is left out: loan payments come from the loans' own schedules
+MONTHLY_EXPENSE_FIELDS = (
+    'rent_expense', 'household_maid', 'groceries', 'food_dining', 'fuel', 'travel',
+    'shopping', 'online_shopping', 'electronics', 'entertainment', 'telecom_utilities',
+    'healthcare', 'education', 'cash_withdrawals', 'foreign_transactions'
+)
+YEARLY_EXPENSE_FIELDS = (
+    'term_insurance', 'health_insurance', 'vehicle_2w_1', 'vehicle_2w_2',
+    'vehicle_4w_1', 'vehicle_4w_2', 'vehicle_4w_3'
+)
+FINANCIAL_ASSET_FIELDS = (
+    'gold_value', 'silver_value', 'stocks_value', 'mutual_funds_value',
+    'pf_nps_value', 'bank_balance', 'cash_in_hand'
+)
+LEGACY_LOAN_FIELDS = ('home_loan', 'personal_loan', 'vehicle_loan')
+
+SIMPLE, FIXED_DEPOSIT, RECURRING_DEPOSIT = 0, 1, 2
+INVESTMENT_KINDS = {'FD': FIXED_DEPOSIT, 'RD': RECURRING_DEPOSIT}
+
+DEFAULT_ASSUMPTIONS = {
+    'income_growth': 0.06,
+    'inflation': 0.06,
+    'expected_return': 0.10,
+    'property_growth': 0.05,
+    'vehicle_depreciation': 0.15,
+}
+
+
+def to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def monthly_entry_amount(entry) -> float:
+    entry = entry if isinstance(entry, dict) else dict(entry)
+    amount = to_float(entry.get('amount'))
+    return amount / 12 if entry.get('frequency') == 'yearly' else amount
+
+
+# ============= Loans =============
+
+def emi(principal, annual_rate, tenure_months):
+    """Equated monthly instalment; zero-rate loans repay principal evenly"""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 1200
+    tenure = np.asarray(tenure_months, dtype=float)
+    n = np.maximum(tenure, 1)
+    growth = (1 + monthly_rate) ** n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        amortizing = np.where(
+            monthly_rate > 0,
+            principal * monthly_rate * growth / (growth - 1),
+            principal / n
+        )
+    return np.where((tenure > 0) & (principal > 0), amortizing, 0.0)
+
+
+def loan_balance(principal, annual_rate, tenure_months, months_paid):
+    """Outstanding balance after ``months_paid`` instalments (broadcasts)"""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 1200
+    tenure = np.asarray(tenure_months, dtype=float)
+    k = np.minimum(np.asarray(months_paid, dtype=float), tenure)
+    payment = emi(principal, annual_rate, tenure_months)
+    growth = (1 + monthly_rate) ** k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance = np.where(
+            monthly_rate > 0,
+            principal * growth - payment * (growth - 1) / monthly_rate,
+            principal - payment * k
+        )
+    balance = np.where(tenure > 0, balance, principal)
+    return np.clip(balance, 0.0, None)
+
+
+def amortization_schedule(principal, annual_rate, tenure_months, horizon_months=None) -> dict:
+    """Month-by-month schedule for many loans: arrays of shape (loans, months)"""
+    principal = np.atleast_1d(np.asarray(principal, dtype=float))
+    annual_rate = np.atleast_1d(np.asarray(annual_rate, dtype=float))
+    tenure = np.atleast_1d(np.asarray(tenure_months, dtype=float))
+    if horizon_months is None:
+        horizon_months = int(tenure.max()) if tenure.size else 0
+    months = np.arange(1, horizon_months + 1)
+
+    balance = loan_balance(principal[:, None], annual_rate[:, None], tenure[:, None], months[None, :])
+    opening = np.concatenate([principal[:, None], balance[:, :-1]], axis=1)
+    active = months[None, :] <= tenure[:, None]
+    interest = np.where(active, opening * (annual_rate[:, None] / 1200), 0.0)
+    payment = np.where(active, emi(principal, annual_rate, tenure)[:, None], 0.0)
+    return {
+        'month': months,
+        'payment': payment,
+        'interest': interest,
+        'principal': payment - interest,
+        'balance': np.where(active, balance, 0.0),
+    }
+
+
+def yearly_loan_flows(principal, annual_rate, tenure_months, years: int) -> dict:
+    """Per-year payments, interest and closing balance, shape (loans, years).
+
+    Uses the closed-form balance at each year end, so cost does not depend on
+    loan tenure.
+    """
+    principal = np.asarray(principal, dtype=float)
+    annual_rate = np.asarray(annual_rate, dtype=float)
+    tenure = np.asarray(tenure_months, dtype=float)
+    year_end = 12 * np.arange(0, years + 1)
+
+    balance = loan_balance(principal[:, None], annual_rate[:, None], tenure[:, None], year_end[None, :])
+    months_paid = np.clip(tenure[:, None] - year_end[None, :-1], 0, 12)
+    payments = months_paid * emi(principal, annual_rate, tenure)[:, None]
+    interest = payments - (balance[:, :-1] - balance[:, 1:])
+    return {
+        'payments': payments,
+        'interest': np.clip(interest, 0.0, None),
+        'balance': balance,
+    }
+
+
+# ============= Interest-bearing investments =============
+
+def yearly_interest_income(principal, annual_rate, kind):
+    """Interest earned over a year.
+
+    FDs compound quarterly. For RDs ``principal`` is the monthly deposit, and
+    each deposit compounds quarterly for the rest of the year. Bonds and other
+    instruments pay simple interest.
+    """
+    principal = np.asarray(principal, dtype=float)
+    rate = np.asarray(annual_rate, dtype=float)
+    kind = np.asarray(kind)
+    quarterly = 1 + rate / 400
+    fd = principal * (quarterly ** 4 - 1)
+    months_invested = np.arange(1, 13)
+    rd = principal * ((quarterly[..., None] ** (months_invested / 3)).sum(axis=-1) - 12)
+    simple = principal * rate / 100
+    return np.select([kind == FIXED_DEPOSIT, kind == RECURRING_DEPOSIT], [fd, rd], simple)
+
+
+def effective_annual_yield(annual_rate, kind):
+    rate = np.asarray(annual_rate, dtype=float)
+    kind = np.asarray(kind)
+    compounded = (1 + rate / 400) ** 4 - 1
+    return np.where((kind == FIXED_DEPOSIT) | (kind == RECURRING_DEPOSIT), compounded, rate / 100)
+
+
+# ============= Properties =============
+
+def value_per_sqft(estimated_value, area_sqft):
+    value = np.asarray(estimated_value, dtype=float)
+    area = np.asarray(area_sqft, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(area > 0, value / area, 0.0)
+
+
+# ============= Questionnaire inputs =============
+
+class PlanningInputs:
+    """Questionnaires flattened into arrays.
+
+    Per-user arrays have shape (users,). Loans and investments are stored as
+    rows with an ``owner`` index into the user arrays.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.monthly_income = np.zeros(size)
+        self.monthly_expenses = np.zeros(size)
+        self.financial_assets = np.zeros(size)
+        self.fixed_income_assets = np.zeros(size)
+        self.property_value = np.zeros(size)
+        self.vehicle_value = np.zeros(size)
+        self.other_assets = np.zeros(size)
+        self.fixed_liabilities = np.zeros(size)
+        self.monthly_investment = np.zeros(size)
+        self.loan_owner, self.loan_principal, self.loan_rate, self.loan_tenure = [], [], [], []
+        self.investment_owner, self.investment_principal, self.investment_rate, self.investment_kind = [], [], [], []
+
+    def finalize(self):
+        for name in ('loan_owner', 'investment_owner', 'investment_kind'):
+            setattr(self, name, np.asarray(getattr(self, name), dtype=np.int64))
+        for name in ('loan_principal', 'loan_rate', 'loan_tenure', 'investment_principal', 'investment_rate'):
+            setattr(self, name, np.asarray(getattr(self, name), dtype=float))
+        return self
+
+
+def build_inputs(questionnaires) -> PlanningInputs:
+    """Flatten questionnaire dicts into ``PlanningInputs``"""
+    questionnaires = list(questionnaires)
+    inputs = PlanningInputs(len(questionnaires))
+    for index, q in enumerate(questionnaires):
+        income = sum(to_float(q.get(f)) for f in MONTHLY_INCOME_FIELDS)
+        income += sum(to_float(q.get(f)) for f in YEARLY_INCOME_FIELDS) / 12
+        income += sum(monthly_entry_amount(e) for e in q.get('income_entries') or [])
+        expenses = sum(to_float(q.get(f)) for f in MONTHLY_EXPENSE_FIELDS)
+        expenses += sum(to_float(q.get(f)) for f in YEARLY_EXPENSE_FIELDS) / 12
+        expenses += sum(monthly_entry_amount(e) for e in q.get('expense_entries') or [])
+
+        investments = q.get('interest_investments') or []
+        for investment in investments:
+            inputs.investment_owner.append(index)
+            inputs.investment_principal.append(to_float(investment.get('principal_amount')))
+            inputs.investment_rate.append(to_float(investment.get('interest_rate')))
+            inputs.investment_kind.append(INVESTMENT_KINDS.get(str(investment.get('investment_type', '')).upper(), SIMPLE))
+            inputs.fixed_income_assets[index] += to_float(investment.get('principal_amount'))
+        if not investments:
+            # Older questionnaires only carry the yearly total
+            income += to_float(q.get('interest_income')) / 12
+
+        loans = q.get('loans') or []
+        for loan in loans:
+            inputs.loan_owner.append(index)
+            inputs.loan_principal.append(to_float(loan.get('principal_amount')))
+            inputs.loan_rate.append(to_float(loan.get('interest_rate')))
+            inputs.loan_tenure.append(to_float(loan.get('tenure_months')))
+        if not loans:
+            # Legacy loan totals have no schedule: carry them as flat liabilities
+            inputs.fixed_liabilities[index] += sum(to_float(q.get(f)) for f in LEGACY_LOAN_FIELDS)
+            expenses += to_float(q.get('emis'))
+        inputs.fixed_liabilities[index] += to_float(q.get('credit_card_outstanding'))
+        inputs.fixed_liabilities[index] += sum(to_float(e.get('amount')) for e in q.get('liability_entries') or [])
+
+        properties = q.get('properties') or []
+        inputs.property_value[index] = (
+            sum(to_float(p.get('estimated_value')) for p in properties) if properties
+            else to_float(q.get('property_value'))
+        )
+        vehicles = q.get('vehicles') or []
+        inputs.vehicle_value[index] = (
+            sum(to_float(v.get('estimated_value')) for v in vehicles) if vehicles
+            else to_float(q.get('vehicles_value'))
+        )
+        inputs.financial_assets[index] = sum(to_float(q.get(f)) for f in FINANCIAL_ASSET_FIELDS)
+        inputs.other_assets[index] = sum(to_float(e.get('amount')) for e in q.get('asset_entries') or [])
+        inputs.monthly_investment[index] = to_float(q.get('monthly_investment'))
+        inputs.monthly_income[index] = income
+        inputs.monthly_expenses[index] = expenses
+    return inputs.finalize()
+
+
+def sum_by_owner(values, owner, size: int):
+    """Add loan/investment rows into per-user totals (works on 1-D and 2-D rows)"""
+    values = np.asarray(values, dtype=float)
+    out = np.zeros((size,) + values.shape[1:])
+    if owner.size:
+        np.add.at(out, owner, values)
+    return out
+
+
+# ============= Projections =============
+
+def project(inputs: PlanningInputs, years: int = 10, **assumptions) -> dict:
+    """Year-by-year cash flow and net worth for every user.
+
+    Returns arrays of shape (users, years + 1) where column 0 is today, except
+    for flow arrays (income, expenses, loan_payments, cash_flow) which have
+    shape (users, years).
+    """
+    if years < 1:
+        raise ValueError("years must be at least 1")
+    a = {**DEFAULT_ASSUMPTIONS, **{k: v for k, v in assumptions.items() if v is not None}}
+    n = inputs.size
+    year_index = np.arange(years)
+
+    loans = yearly_loan_flows(inputs.loan_principal, inputs.loan_rate, inputs.loan_tenure, years)
+    loan_payments = sum_by_owner(loans['payments'], inputs.loan_owner, n)
+    loan_interest = sum_by_owner(loans['interest'], inputs.loan_owner, n)
+    loan_balance_by_year = sum_by_owner(loans['balance'], inputs.loan_owner, n)
+
+    interest_income = sum_by_owner(
+        yearly_interest_income(inputs.investment_principal, inputs.investment_rate, inputs.investment_kind),
+        inputs.investment_owner, n
+    )
+
+    income = 12 * inputs.monthly_income[:, None] * (1 + a['income_growth']) ** year_index + interest_income[:, None]
+    expenses = 12 * inputs.monthly_expenses[:, None] * (1 + a['inflation']) ** year_index
+    cash_flow = income - expenses - loan_payments
+
+    # Savings arrive through the year: credit them with half a year's return
+    financial = np.empty((n, years + 1))
+    financial[:, 0] = inputs.financial_assets
+    growth = 1 + a['expected_return']
+    for year in range(years):
+        financial[:, year + 1] = financial[:, year] * growth + cash_flow[:, year] * np.sqrt(growth)
+
+    all_years = np.arange(years + 1)
+    property_value = inputs.property_value[:, None] * (1 + a['property_growth']) ** all_years
+    vehicle_value = inputs.vehicle_value[:, None] * (1 - a['vehicle_depreciation']) ** all_years
+    liabilities = loan_balance_by_year + inputs.fixed_liabilities[:, None]
+    assets = (
+        financial + property_value + vehicle_value
+        + (inputs.fixed_income_assets + inputs.other_assets)[:, None]
+    )
+    return {
+        'year': all_years,
+        'income': income,
+        'expenses': expenses,
+        'loan_payments': loan_payments,
+        'loan_interest': loan_interest,
+        'cash_flow': cash_flow,
+        'financial_assets': financial,
+        'property_value': property_value,
+        'vehicle_value': vehicle_value,
+        'total_assets': assets,
+        'liabilities': liabilities,
+        'net_worth': assets - liabilities,
+        'assumptions': a,
+    }
+
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def cohort_summary(inputs: PlanningInputs, projection: dict, groups=None) -> dict:
+    """Percentile distributions of key ratios, overall and per group label"""
+    annual_income = projection['income'][:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        savings_rate = np.where(annual_income > 0, projection['cash_flow'][:, 0] / annual_income, np.nan)
+        debt_to_income = np.where(annual_income > 0, projection['loan_payments'][:, 0] / annual_income, np.nan)
+    metrics = {
+        'net_worth_today': projection['net_worth'][:, 0],
+        'net_worth_projected': projection['net_worth'][:, -1],
+        'savings_rate': savings_rate,
+        'debt_to_income': debt_to_income,
+    }
+
+    def describe(mask):
+        summary = {'users': int(mask.sum())}
+        for name, values in metrics.items():
+            selected = values[mask]
+            selected = selected[~np.isnan(selected)]
+            summary[name] = (
+                {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(selected, PERCENTILES))}
+                if selected.size else None
+            )
+        return summary
+
+    result = {'all': describe(np.ones(inputs.size, dtype=bool))}
+    if groups is not None:
+        groups = np.asarray(groups)
+        for label in np.unique(groups):
+            result[str(label)] = describe(groups == label)
+    return result
+
+
+# ============= Single-user report =============
+
+def user_plan(questionnaire: dict, years: int = 10, **assumptions) -> dict:
+    """Per-item loan/investment/property figures plus the yearly projection"""
+    inputs = build_inputs([questionnaire])
+    projection = project(inputs, years=years, **assumptions)
+
+    loans = questionnaire.get('loans') or []
+    loan_years = max(1, -(-int(inputs.loan_tenure.max(initial=0)) // 12))
+    flows = yearly_loan_flows(inputs.loan_principal, inputs.loan_rate, inputs.loan_tenure, loan_years)
+    payments = emi(inputs.loan_principal, inputs.loan_rate, inputs.loan_tenure)
+    loan_rows = [
+        {
+            'name': loan.get('name', ''),
+            'loan_type': loan.get('loan_type', ''),
+            'principal_amount': float(inputs.loan_principal[i]),
+            'interest_rate': float(inputs.loan_rate[i]),
+            'tenure_months': int(inputs.loan_tenure[i]),
+            'emi': float(payments[i]),
+            'yearly_interest': float(flows['interest'][i, 0]),
+            'total_interest': float(flows['interest'][i].sum()),
+        }
+        for i, loan in enumerate(loans)
+    ]
+
+    investments = questionnaire.get('interest_investments') or []
+    income = yearly_interest_income(inputs.investment_principal, inputs.investment_rate, inputs.investment_kind)
+    yields = effective_annual_yield(inputs.investment_rate, inputs.investment_kind)
+    investment_rows = [
+        {
+            'name': investment.get('name', ''),
+            'investment_type': investment.get('investment_type', ''),
+            'principal_amount': float(inputs.investment_principal[i]),
+            'interest_rate': float(inputs.investment_rate[i]),
+            'yearly_interest': float(income[i]),
+            'effective_annual_yield': float(yields[i]),
+        }
+        for i, investment in enumerate(investments)
+    ]
+
+    properties = questionnaire.get('properties') or []
+    per_sqft = value_per_sqft(
+        [to_float(p.get('estimated_value')) for p in properties],
+        [to_float(p.get('area_sqft')) for p in properties]
+    )
+    property_rows = [
+        {
+            'name': prop.get('name', ''),
+            'estimated_value': to_float(prop.get('estimated_value')),
+            'area_sqft': to_float(prop.get('area_sqft')),
+            'value_per_sqft': float(per_sqft[i]),
+        }
+        for i, prop in enumerate(properties)
+    ]
+
+    rows = []
+    for year in range(years + 1):
+        flow = year - 1
+        rows.append({
+            'year': year,
+            'income': float(projection['income'][0, flow]) if year else 0.0,
+            'expenses': float(projection['expenses'][0, flow]) if year else 0.0,
+            'loan_payments': float(projection['loan_payments'][0, flow]) if year else 0.0,
+            'cash_flow': float(projection['cash_flow'][0, flow]) if year else 0.0,
+            'total_assets': float(projection['total_assets'][0, year]),
+            'liabilities': float(projection['liabilities'][0, year]),
+            'net_worth': float(projection['net_worth'][0, year]),
+        })
+
+    return {
+        'loans': loan_rows,
+        'interest_investments': investment_rows,
+        'properties': property_rows,
+        'projection': rows,
+        'assumptions': projection['assumptions'],
+    }
+
+
+# ============= Financial snapshot =============
+
+ASSET_LABELS = {
+    'gold_value': 'Gold',
+    'silver_value': 'Silver',
+    'stocks_value': 'Stocks',
+    'mutual_funds_value': 'Mutual Funds',
+    'pf_nps_value': 'PF/NPS',
+    'bank_balance': 'Bank Balance',
+    'cash_in_hand': 'Cash',
+}
+LEGACY_LOAN_LABELS = {'home_loan': 'Home Loan', 'personal_loan': 'Personal Loan', 'vehicle_loan': 'Vehicle Loan'}
+LIQUID_ASSET_FIELDS = ('bank_balance', 'cash_in_hand')
+
+
+def add_amount(breakdown: dict, label: str, amount: float):
+    if amount:
+        breakdown[label] = breakdown.get(label, 0.0) + amount
+
+
+def financial_snapshot(questionnaire: dict) -> dict:
+    """Asset/liability breakdowns and coverage ratios for one questionnaire.
+
+    Emergency-fund coverage counts bank balance, cash and deposits against a
+    month of expenses plus EMIs; debt-to-income is monthly EMIs over monthly
+    income.
+    """
+    inputs = build_inputs([questionnaire])
+    q = questionnaire
+
+    assets = {}
+    add_amount(assets, 'Property', float(inputs.property_value[0]))
+    add_amount(assets, 'Vehicles', float(inputs.vehicle_value[0]))
+    for field, label in ASSET_LABELS.items():
+        add_amount(assets, label, to_float(q.get(field)))
+    add_amount(assets, 'Fixed Income', float(inputs.fixed_income_assets[0]))
+    for entry in q.get('asset_entries') or []:
+        add_amount(assets, entry.get('type') or 'Other Assets', to_float(entry.get('amount')))
+
+    liabilities = {}
+    for loan in q.get('loans') or []:
+        label = f"{loan['loan_type']} Loan" if loan.get('loan_type') else 'Loan'
+        add_amount(liabilities, label, to_float(loan.get('principal_amount')))
+    if not q.get('loans'):
+        for field, label in LEGACY_LOAN_LABELS.items():
+            add_amount(liabilities, label, to_float(q.get(field)))
+    add_amount(liabilities, 'Credit Card', to_float(q.get('credit_card_outstanding')))
+    for entry in q.get('liability_entries') or []:
+        add_amount(liabilities, entry.get('type') or 'Other Liabilities', to_float(entry.get('amount')))
+
+    interest_income = float(yearly_interest_income(
+        inputs.investment_principal, inputs.investment_rate, inputs.investment_kind
+    ).sum())
+    monthly_income = float(inputs.monthly_income[0]) + interest_income / 12
+    monthly_expenses = float(inputs.monthly_expenses[0])
+    if q.get('loans'):
+        monthly_emi = float(emi(inputs.loan_principal, inputs.loan_rate, inputs.loan_tenure).sum())
+    else:
+        # build_inputs folds the legacy 'emis' total into expenses
+        monthly_emi = to_float(q.get('emis'))
+        monthly_expenses -= monthly_emi
+    monthly_outgoings = monthly_expenses + monthly_emi
+    liquid = sum(to_float(q.get(f)) for f in LIQUID_ASSET_FIELDS) + float(inputs.fixed_income_assets[0])
+
+    total_assets = sum(assets.values(), 0.0)
+    total_liabilities = sum(liabilities.values(), 0.0)
+    return {
+        'assets_breakdown': assets,
+        'liabilities_breakdown': liabilities,
+        'total_assets': total_assets,
+        'total_liabilities': total_liabilities,
+        'net_worth': total_assets - total_liabilities,
+        'monthly_income': monthly_income,
+        'monthly_expenses': monthly_expenses,
+        'monthly_emi': monthly_emi,
+        'liquid_assets': liquid,
+        'emergency_fund_months': liquid / monthly_outgoings if monthly_outgoings > 0 else 0.0,
+        'debt_to_income': monthly_emi / monthly_income if monthly_income > 0 else 0.0,
+    }
@@ -0,0 +1,218 @@
+"""Token-bucket rate limiting, in memory per worker or shared through Mongo.
+
+Buckets use GCRA, the "virtual scheduling" form of a token bucket: each key
+stores one float, the time at which its bucket would be full again. A
+request is allowed when the bucket is at most ``limit`` requests behind and
+pushes that time forward by ``period / limit``. Keys whose time has passed
+hold a full bucket, the same as an absent key, so they are dropped when
+the table grows past ``max_keys``.
+
+``RateLimiter.check(route, ip=..., user=..., client_id=...)`` applies each
+scope configured for a route and returns how long the caller should wait,
+0.0 when allowed. A request is charged only when every scope allows it, so
+a client over one limit doesn't drain its other buckets.
+``RateLimitMiddleware`` applies a per-IP default to every request without
+touching the database.
+"""
+import math
+import time
+from typing import Dict, NamedTuple, Optional
+
+
+class Rate(NamedTuple):
+    limit: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.limit
+
+
+# Excess below this is float error from summing intervals onto large clock
+# values, not an overrun; without it the last token of a burst can be refused
+SLACK = 1e-3
+
+PERIODS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60, "h": 3600, "hour": 3600}
+
+
+def parse_rate(text: Optional[str]) -> Optional[Rate]:
+    """'10/60' (seconds) or '10/min'; empty or '0' disables the limit"""
+    if not text or text.strip() == "0":
+        return None
+    limit, _, period = text.strip().partition("/")
+    period = period.strip().lower()
+    seconds = PERIODS.get(period) or float(period or 1)
+    if int(limit) <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate {text!r}")
+    return Rate(int(limit), float(seconds))
+
+
+class TokenBuckets:
+    """Per-key GCRA state for one worker"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.full_at: Dict[str, float] = {}
+
+    def _advance(self, key: str, rate: Rate, now: float) -> tuple:
+        full_at = max(self.full_at.get(key, now), now)
+        next_full_at = full_at + rate.interval
+        excess = next_full_at - now - rate.period
+        return next_full_at, excess if excess > SLACK else 0.0
+
+    def peek(self, key: str, rate: Rate, now: Optional[float] = None) -> float:
+        """What ``take`` would return, without consuming anything"""
+        now = time.monotonic() if now is None else now
+        return max(self._advance(key, rate, now)[1], 0.0)
+
+    def take(self, key: str, rate: Rate, now: Optional[float] = None) -> float:
+        """Consume one token; returns 0.0, or the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        next_full_at, excess = self._advance(key, rate, now)
+        if excess > 0:
+            return excess
+        if key not in self.full_at and len(self.full_at) >= self.max_keys:
+            self._evict(now)
+        self.full_at[key] = next_full_at
+        return 0.0
+
+    def _evict(self, now: float):
+        self.full_at = {key: full_at for key, full_at in self.full_at.items() if full_at > now}
+        # Everything still limited: forget the oldest keys rather than grow without bound
+        overflow = len(self.full_at) - self.max_keys + 1
+        for key in list(self.full_at)[:max(overflow, 0)]:
+            del self.full_at[key]
+
+
+class MongoTokenBuckets:
+    """The same buckets in a collection, shared by every worker using it.
+
+    One ``findAndModify`` with a pipeline update per check, so the read,
+    refill and consume are atomic. Times are wall-clock seconds, which
+    assumes the workers' clocks agree to well under a token interval.
+    ``expires_at`` is set to when the bucket is full again; a TTL index on
+    it removes idle keys.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key: str, rate: Rate, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        full_at = {"$max": [{"$ifNull": ["$full_at", now]}, now]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"next_full_at": {"$add": [full_at, rate.interval]}}},
+                {"$set": {"excess": {"$subtract": [{"$subtract": ["$next_full_at", now]}, rate.period]}}},
+                {"$set": {"full_at": {"$cond": [
+                    {"$gt": ["$excess", SLACK]}, {"$ifNull": ["$full_at", now]}, "$next_full_at"
+                ]}}},
+                {"$set": {"expires_at": {"$toDate": {"$multiply": ["$full_at", 1000]}}}},
+                {"$project": {"next_full_at": 0}}
+            ],
+            upsert=True,
+            return_document=True
+        )
+        return doc["excess"] if doc["excess"] > SLACK else 0.0
+
+
+class RateLimiter:
+    """Applies ``{route: {scope: Rate}}`` rules; scopes are ip, user and client_id.
+
+    ``shared`` (a ``MongoTokenBuckets``) replaces the local buckets for the
+    scopes it is given, so e.g. per-account login limits hold across
+    workers while cheap per-IP limits stay local.
+
+    Local scopes are checked first without consuming. Shared scopes are then
+    charged one at a time, stopping at the first rejection (a Mongo charge
+    can't be checked separately without a race), and the local buckets are
+    charged last, only if everything allowed the request.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Rate]], buckets: Optional[TokenBuckets] = None,
+                 shared: Optional[MongoTokenBuckets] = None, shared_scopes=()):
+        self.rules = rules
+        self.buckets = buckets or TokenBuckets()
+        self.shared = shared
+        self.shared_scopes = frozenset(shared_scopes)
+        self.rejected: Dict[tuple, int] = {}
+
+    async def check(self, route: str, **keys) -> float:
+        """Seconds to wait before retrying (the longest of the exceeded limits), 0.0 if allowed"""
+        local, shared = [], []
+        for scope, rate in self.rules.get(route, {}).items():
+            value = keys.get(scope)
+            if value is None:
+                continue
+            entry = (scope, f"{route}:{scope}:{value}", rate)
+            if self.shared is not None and scope in self.shared_scopes:
+                shared.append(entry)
+            else:
+                local.append(entry)
+
+        retry_after = 0.0
+        for scope, key, rate in local:
+            wait = self.buckets.peek(key, rate)
+            if wait > 0:
+                self._reject(route, scope)
+                retry_after = max(retry_after, wait)
+        if retry_after > 0:
+            return retry_after
+
+        for scope, key, rate in shared:
+            wait = await self.shared.take(key, rate)
+            if wait > 0:
+                self._reject(route, scope)
+                return wait
+
+        # Another request may have used the last token while the shared check awaited
+        for scope, key, rate in local:
+            wait = self.buckets.take(key, rate)
+            if wait > 0:
+                self._reject(route, scope)
+                retry_after = max(retry_after, wait)
+        return retry_after
+
+    def _reject(self, route: str, scope: str):
+        self.rejected[(route, scope)] = self.rejected.get((route, scope), 0) + 1
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware applying ``limiter``'s ``route`` rules per client IP.
+
+    Only in-process buckets are used, so the cost is a dict lookup and a few
+    float operations per request. The IP is the ASGI client address; behind
+    a proxy run uvicorn with ``--proxy-headers`` so it is the real client.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, route: str = "default", exclude=()):
+        self.app = app
+        self.limiter = limiter
+        self.route = route
+        self.rate = limiter.rules.get(route, {}).get("ip")
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if self.rate is None or scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        key = f"{self.route}:ip:{client[0] if client else 'unknown'}"
+        wait = self.limiter.buckets.take(key, self.rate)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        rejected = self.limiter.rejected
+        rejected[(self.route, "ip")] = rejected.get((self.route, "ip"), 0) + 1
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [(b"content-type", b"application/json"), (b"retry-after", retry_after_header(wait).encode())]
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Too many requests"}'})
@@ -0,0 +1,137 @@
+"""Render report statements to CSV, XLSX and PDF files.
+
+A statement is a title, summary ``sections`` (a heading, column names and
+rows) and optionally the transactions behind it. The server spools those
+transactions to a file as JSON lines (``[date, type, category, description,
+amount]``) while it reads them from Mongo, then calls ``render`` in a worker
+process. Rows are read back and written one at a time, so memory stays flat
+however long the history is. The one exception is PDF, which keeps finished
+pages (compressed) until the file is saved.
+
+Nothing here imports the server or touches the database, and the format
+libraries are imported only inside the worker that needs them.
+"""
+import csv
+import os
+from typing import Iterator, List, Optional
+
+import orjson
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+TRANSACTION_COLUMNS = ("Date", "Type", "Category", "Description", "Amount")
+
+
+def read_spool(path: Optional[str]) -> Iterator[list]:
+    if not path:
+        return
+    with open(path, "rb") as spool:
+        for line in spool:
+            yield orjson.loads(line)
+
+
+def render(statement: dict, spool_path: Optional[str], out_path: str, fmt: str) -> int:
+    """Write ``statement`` (plus spooled transactions) to ``out_path``; returns the size.
+
+    The file appears atomically: it is written next to ``out_path`` and
+    renamed, so a concurrent reader sees either nothing or the whole file.
+    """
+    writers = {"csv": write_csv, "xlsx": write_xlsx, "pdf": write_pdf}
+    partial = f"{out_path}.{os.getpid()}.partial"
+    try:
+        writers[fmt](statement, read_spool(spool_path), partial)
+        os.replace(partial, out_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return os.path.getsize(out_path)
+
+
+def write_csv(statement: dict, rows: Iterator[list], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow([statement["title"]])
+        writer.writerow([statement["period"]])
+        for section in statement["sections"]:
+            writer.writerow([])
+            writer.writerow([section["heading"]])
+            writer.writerow(section["columns"])
+            writer.writerows(section["rows"])
+        if statement.get("transactions"):
+            writer.writerow([])
+            writer.writerow(["Transactions"])
+            writer.writerow(TRANSACTION_COLUMNS)
+            writer.writerows(rows)
+
+
+def write_xlsx(statement: dict, rows: Iterator[list], path: str):
+    from openpyxl import Workbook
+
+    # write_only streams each row to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    summary = workbook.create_sheet("Summary")
+    summary.append([statement["title"]])
+    summary.append([statement["period"]])
+    for section in statement["sections"]:
+        summary.append([])
+        summary.append([section["heading"]])
+        summary.append(list(section["columns"]))
+        for row in section["rows"]:
+            summary.append(list(row))
+    if statement.get("transactions"):
+        sheet = workbook.create_sheet("Transactions")
+        sheet.append(list(TRANSACTION_COLUMNS))
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_pdf(statement: dict, rows: Iterator[list], path: str):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    width, height = A4
+    margin, line_height = 40, 14
+    pdf = canvas.Canvas(path, pagesize=A4)
+    y = height - margin
+
+    def line(cells: list, columns: List[tuple], font: str = "Helvetica", size: int = 9):
+        """``columns`` are ``(x, align)``; right-aligned columns end at x"""
+        nonlocal y
+        if y < margin:
+            pdf.showPage()
+            y = height - margin
+        pdf.setFont(font, size)
+        for cell, (x, align) in zip(cells, columns):
+            text = f"{cell:,.2f}" if isinstance(cell, (int, float)) else str(cell)[:50]
+            if align == "right":
+                pdf.drawRightString(x, y, text)
+            else:
+                pdf.drawString(x, y, text)
+        y -= line_height
+
+    heading = [(margin, "left")]
+    line([statement["title"]], heading, "Helvetica-Bold", 14)
+    line([statement["period"]], heading)
+    for section in statement["sections"]:
+        y -= line_height / 2
+        line([section["heading"]], heading, "Helvetica-Bold", 11)
+        # Label on the left, amount columns 90pt apart ending at the right margin
+        count = len(section["columns"])
+        columns = [(margin, "left")] + [(width - margin - (count - 1 - i) * 90, "right") for i in range(1, count)]
+        line(section["columns"], columns, "Helvetica-Bold")
+        for row in section["rows"]:
+            line(row, columns)
+    if statement.get("transactions"):
+        y -= line_height / 2
+        line(["Transactions"], heading, "Helvetica-Bold", 11)
+        columns = [(margin, "left"), (margin + 65, "left"), (margin + 115, "left"), (margin + 215, "left"),
+                   (width - margin, "right")]
+        line(TRANSACTION_COLUMNS, columns, "Helvetica-Bold")
+        for row in rows:
+            line(row, columns)
+    pdf.save()
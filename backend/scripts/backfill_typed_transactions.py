@@ -0,0 +1,122 @@
+"""Convert stored transactions to typed fields: integer paise, BSON dates, enum types.
+
+Rows get ``amount_paise`` (and lose the float ``amount``), ``date`` as a
+datetime at midnight UTC, and a lower-cased ``income``/``expense`` type. Rows
+that cannot be converted are left untouched and listed. Both the
+``transactions`` collection and monthly buckets are covered; updates are
+per row, so the script is safe to run against a live database and to re-run.
+Rollups of every user touched are rebuilt at the end, in paise.
+
+Usage (from the backend directory):
+    python scripts/backfill_typed_transactions.py --dry-run
+    python scripts/backfill_typed_transactions.py
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from pymongo import UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+BATCH_SIZE = 1000
+TYPES = {t.value for t in server.TransactionType}
+
+
+def typed_fields(row: dict) -> tuple:
+    """(fields to set, problem) for one stored row; fields is empty if already typed"""
+    try:
+        date_value = server.transaction_datetime(row.get('date'))
+    except ValueError as e:
+        return {}, str(e)
+    tx_type = str(row.get('type', '')).strip().lower()
+    if tx_type not in TYPES:
+        return {}, f"unknown type '{row.get('type')}'"
+    fields = {
+        "amount_paise": server.transaction_paise(row),
+        "date": date_value,
+        "type": tx_type
+    }
+    if all(row.get(k) == v for k, v in fields.items()) and 'amount' not in row:
+        return {}, None
+    return fields, None
+
+
+class Backfill:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.updates = []
+        self.converted = 0
+        self.problems = []
+        self.users = set()
+
+    async def add(self, collection, update: UpdateOne):
+        self.updates.append(update)
+        if len(self.updates) >= BATCH_SIZE:
+            await self.flush(collection)
+
+    async def flush(self, collection):
+        if self.updates and not self.dry_run:
+            await collection.bulk_write(self.updates, ordered=False)
+        self.updates = []
+
+    async def documents(self, collection):
+        async for row in collection.find({}):
+            fields, problem = typed_fields(row)
+            if problem:
+                self.problems.append((row.get('id'), problem))
+            elif fields:
+                self.converted += 1
+                self.users.add(row['user_id'])
+                await self.add(collection, UpdateOne({"_id": row['_id']}, {"$set": fields, "$unset": {"amount": ""}}))
+        await self.flush(collection)
+
+    async def buckets(self, collection):
+        async for bucket in collection.find({}):
+            for row in bucket.get('transactions', []):
+                fields, problem = typed_fields(row)
+                if problem:
+                    self.problems.append((row.get('id'), problem))
+                elif fields:
+                    self.converted += 1
+                    self.users.add(bucket['user_id'])
+                    await self.add(collection, UpdateOne(
+                        {"_id": bucket['_id'], "transactions.id": row['id']},
+                        {"$set": {f"transactions.$.{k}": v for k, v in fields.items()},
+                         "$unset": {"transactions.$.amount": ""}}
+                    ))
+        await self.flush(collection)
+
+
+async def run(args):
+    server.open_database()
+    backfill = Backfill(args.dry_run)
+    await backfill.documents(server.db.transactions)
+    await backfill.buckets(server.db.transaction_buckets)
+
+    verb = "would convert" if args.dry_run else "converted"
+    print(f"{verb} {backfill.converted} transactions for {len(backfill.users)} users")
+    for transaction_id, problem in backfill.problems[:50]:
+        print(f"skipped {transaction_id}: {problem}")
+    if len(backfill.problems) > 50:
+        print(f"... and {len(backfill.problems) - 50} more skipped")
+
+    if not args.dry_run and not args.skip_rollups:
+        for user_id in backfill.users:
+            await server.rebuild_user_rollup(user_id)
+        print(f"rebuilt {len(backfill.users)} rollups")
+    server.close_database()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--skip-rollups", action="store_true", help="leave rollups to rebuild lazily on read")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Fail if any route query would run as a collection scan.
+
+Ensures indexes, then runs explain() on a representative query for every
+route. Exits non-zero when a winning plan contains COLLSCAN, so it can gate CI
+against a local mongod:
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=arthverse_plans \
+        python scripts/check_query_plans.py
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+async def run(args):
+    server.open_database()
+    if not args.skip_ensure:
+        await server.ensure_indexes()
+
+    results = await server.explain_route_queries()
+    failures = 0
+    for result in results:
+        marker = "FAIL" if result['collscan'] else "ok"
+        failures += result['collscan']
+        print(f"{marker:<5} {result['route']:<28} {result['collection']:<15} {' > '.join(result['stages'])}")
+
+    server.close_database()
+    print(f"{len(results)} queries checked, {failures} collection scans")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skip-ensure", action="store_true",
+                        help="check the indexes as they exist instead of creating them first")
+    raise SystemExit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
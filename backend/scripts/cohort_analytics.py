@@ -0,0 +1,58 @@
+"""Percentile net-worth, savings-rate and debt-to-income tables across users.
+
+Runs the planning engine in batch mode over every questionnaire.
+
+Usage (from the backend directory):
+    python scripts/cohort_analytics.py                  # 10-year horizon
+    python scripts/cohort_analytics.py --years 20 --group-by city
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import planning  # noqa: E402
+import server  # noqa: E402
+
+
+def age_band(age) -> str:
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return "unknown"
+    lower = (age // 10) * 10
+    return f"{lower}-{lower + 9}"
+
+
+async def run(args):
+    server.open_database()
+    questionnaires = await server.db.questionnaires.find({}, {"_id": 0}).to_list(None)
+    groups = None
+    if args.group_by:
+        users = await server.db.users.find({}, {"_id": 0, "id": 1, args.group_by: 1}).to_list(None)
+        labels = {u["id"]: u.get(args.group_by) for u in users}
+        if args.group_by == "age":
+            labels = {k: age_band(v) for k, v in labels.items()}
+        groups = [str(labels.get(q["user_id"], "unknown")) for q in questionnaires]
+    server.close_database()
+
+    if not questionnaires:
+        print("no questionnaires found")
+        return
+    inputs = planning.build_inputs(questionnaires)
+    projection = planning.project(inputs, years=args.years)
+    print(json.dumps(planning.cohort_summary(inputs, projection, groups), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--group-by", choices=["age", "city", "marital_status", "no_of_dependents"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Copy transactions into per-user monthly buckets for TRANSACTION_STORAGE=buckets.
+
+Existing buckets of a migrated user are replaced, so the script can be re-run.
+The ``transactions`` collection is left untouched; drop it yourself once the
+app runs on buckets and ``--verify`` reports no mismatches.
+
+Usage (from the backend directory):
+    python scripts/migrate_transaction_buckets.py                # every user
+    python scripts/migrate_transaction_buckets.py --user-id ID --verify
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+from transaction_store import BucketTransactionStore, DocumentTransactionStore  # noqa: E402
+
+
+async def migrate_user(user_id: str, buckets: BucketTransactionStore, bucket_size: int) -> tuple:
+    await buckets.collection.delete_many({"user_id": user_id})
+    open_buckets, written, bucket_count = {}, 0, 0
+
+    async def flush(month):
+        nonlocal written, bucket_count
+        rows = open_buckets.pop(month)
+        await buckets.collection.insert_one({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "month": month,
+            "count": len(rows),
+            "transactions": rows
+        })
+        written += len(rows)
+        bucket_count += 1
+
+    cursor = server.db.transactions.find({"user_id": user_id}, {"_id": 0}).sort("date", 1)
+    async for transaction in cursor:
+        month = buckets.month_of(transaction['date'])
+        open_buckets.setdefault(month, []).append(buckets.pack(transaction))
+        if len(open_buckets[month]) >= bucket_size:
+            await flush(month)
+    for month in list(open_buckets):
+        await flush(month)
+    return written, bucket_count
+
+
+async def verify_user(user_id: str, documents: DocumentTransactionStore, buckets: BucketTransactionStore) -> bool:
+    expected = server.summary_from_rollup(server.rollup_from_groups(user_id, await documents.summary_groups(user_id)))
+    actual = server.summary_from_rollup(server.rollup_from_groups(user_id, await buckets.summary_groups(user_id)))
+    return server.summaries_match(expected, actual, tolerance=0.005)
+
+
+async def run(args):
+    server.open_database()
+    documents = DocumentTransactionStore(server.db.transactions)
+    buckets = BucketTransactionStore(
+        server.db.transaction_buckets, month_of=server.transaction_month, bucket_size=args.bucket_size
+    )
+    user_ids = [args.user_id] if args.user_id else await documents.user_ids()
+
+    total_rows = total_buckets = mismatches = 0
+    for user_id in user_ids:
+        rows, bucket_count = await migrate_user(user_id, buckets, args.bucket_size)
+        total_rows += rows
+        total_buckets += bucket_count
+        if args.verify and not await verify_user(user_id, documents, buckets):
+            mismatches += 1
+            print(f"summary mismatch for {user_id}")
+
+    print(f"migrated {total_rows} transactions for {len(user_ids)} users into {total_buckets} buckets")
+    if args.verify:
+        print(f"{mismatches} users with mismatched summaries")
+    server.close_database()
+    if mismatches:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id")
+    parser.add_argument("--bucket-size", type=int, default=server.TRANSACTION_BUCKET_SIZE)
+    parser.add_argument("--verify", action="store_true", help="compare report totals after migrating")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Rebuild per-user ledger rollups that drifted from raw transactions.
+
+Usage (from the backend directory):
+    python scripts/repair_rollups.py              # check and repair every user
+    python scripts/repair_rollups.py --user-id ID # a single user
+    python scripts/repair_rollups.py --force      # rebuild without comparing
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+
+async def run(args):
+    server.open_database()
+    if args.user_id:
+        user_ids = [args.user_id]
+    else:
+        user_ids = await server.transaction_store.user_ids()
+
+    repaired = 0
+    for user_id in user_ids:
+        if args.force:
+            await server.rebuild_user_rollup(user_id)
+            repaired += 1
+        elif await server.repair_user_rollup(user_id, tolerance=args.tolerance):
+            repaired += 1
+            print(f"repaired rollup for {user_id}")
+
+    print(f"checked {len(user_ids)} users, rebuilt {repaired} rollups")
+    server.close_database()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.005)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
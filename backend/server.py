@@ -1,38 +1,233 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, status, Depends, Header, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from starlette.datastructures import UploadFile
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, field_validator
 from typing import List, Optional
 import uuid
+import base64
+import codecs
+import hashlib
+import hmac
+import json
+import multiprocessing
+import orjson
+import tempfile
+import time
 from datetime import datetime, timezone, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from enum import Enum
 import bcrypt
 import jwt
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import asyncio
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import planning
+import report_exports
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, ConnectionPoolStats, EventLoopLagMonitor, MongoCommandMetrics, Registry,
+    RequestMetricsMiddleware
+)
+from ratelimit import (
+    MongoTokenBuckets, RateLimiter, RateLimitMiddleware, TokenBuckets, parse_rate, retry_after_header
+)
+from tracing import ProfilingMiddleware, SlowRequestLog, TraceCommandListener, record_span, span
+from categorizer import CategorizationQueue, CircuitBreaker, EmergentLlmClient, ExpenseCategorizer
+from transaction_store import (
+    TRANSACTION_SORT, BucketTransactionStore, DocumentTransactionStore, transaction_filter
+)
+from statement_parsers import CsvStatementReader, RowError, normalize_date, parse_csv_lines, parse_ofx
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Metrics (served at /metrics in the Prometheus text format)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('EVENT_LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+metrics_registry = Registry('arthverse')
+http_request_duration = metrics_registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template', ('method', 'route', 'status')
+)
+http_requests_in_flight = metrics_registry.gauge('http_requests_in_flight', 'HTTP requests being served')
+mongo_command_duration = metrics_registry.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency', ('command', 'collection', 'outcome')
+)
+llm_call_duration = metrics_registry.histogram(
+    'llm_call_duration_seconds', 'Categorization model call latency', ('outcome',),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+)
+event_loop_lag = metrics_registry.histogram(
+    'event_loop_lag_seconds', 'Delay of event loop wake-ups past their schedule',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+event_loop_monitor = EventLoopLagMonitor(event_loop_lag, EVENT_LOOP_LAG_INTERVAL_SECONDS)
+
+# Request profiling: a request carrying ``X-Profile: <ADMIN_TOKEN>`` is always
+# traced; others are traced at PROFILING_SAMPLE_RATE and kept when slow
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', '500'))
+SLOW_REQUEST_BUFFER_SIZE = int(os.environ.get('SLOW_REQUEST_BUFFER_SIZE', '200'))
+slow_request_log = SlowRequestLog(SLOW_REQUEST_BUFFER_SIZE)
+
+# MongoDB connection, opened by the app lifespan (scripts call open_database).
+# Pool settings are per worker process: N uvicorn workers may hold up to
+# N x MONGO_MAX_POOL_SIZE connections, so size it as (server budget / workers).
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+DB_NAME = os.environ['DB_NAME']
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+# Fail a checkout from an exhausted pool after this long instead of queueing indefinitely
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+# Wire compression, in preference order, e.g. "zstd,snappy" (needs zstandard / python-snappy)
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')
+mongo_pool_stats = ConnectionPoolStats()
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+# Readiness: /readyz fails when Mongo doesn't answer a ping in time or the pool is exhausted
+READY_PING_TIMEOUT_SECONDS = float(os.environ.get('READY_PING_TIMEOUT_SECONDS', '1'))
+READY_MAX_POOL_SATURATION = float(os.environ.get('READY_MAX_POOL_SATURATION', '1.0'))
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24 * 7
 
+# Password hashing configuration
+# bcrypt holds a CPU core for ~200-300 ms per call at the default cost, so
+# hashing runs on a small dedicated pool instead of the event loop.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix='password-hash'
+)
+password_hash_pending = 0
+
+# Largest accepted transaction amount in rupees; far below the int64 paise limit (~9.2e16)
+TRANSACTION_MAX_AMOUNT = 1e12
+
+# Transaction listing
+TRANSACTIONS_DEFAULT_PAGE_SIZE = 100
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_MAX_PAGE_SIZE', '500'))
+TRANSACTIONS_STREAM_BATCH_SIZE = int(os.environ.get('TRANSACTIONS_STREAM_BATCH_SIZE', '1000'))
+# 'documents' (one per transaction) or 'buckets' (per-user monthly buckets)
+TRANSACTION_STORAGE = os.environ.get('TRANSACTION_STORAGE', 'documents')
+TRANSACTION_BUCKET_SIZE = int(os.environ.get('TRANSACTION_BUCKET_SIZE', '500'))
+
+# Bulk import
+BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', '1000'))
+BULK_IMPORT_MAX_ROWS = int(os.environ.get('BULK_IMPORT_MAX_ROWS', '50000'))
+BULK_IMPORT_MAX_ERRORS = 100
+
+# AI categorization
+CATEGORY_CACHE_SIZE = int(os.environ.get('CATEGORY_CACHE_SIZE', '10000'))
+CATEGORIZE_BATCH_SIZE = int(os.environ.get('CATEGORIZE_BATCH_SIZE', '50'))
+CATEGORIZE_MAX_ITEMS = 500
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '10'))
+LLM_BREAKER_THRESHOLD = int(os.environ.get('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+# The LLM SDK is imported on the first categorization; set to load it before serving instead
+LLM_WARM_UP = os.environ.get('LLM_WARM_UP', 'false').lower() == 'true'
+
+def record_llm_call(seconds: float, outcome: str):
+    if METRICS_ENABLED:
+        llm_call_duration.observe(seconds, outcome)
+    record_span('llm.call', seconds, outcome=outcome)
+
+categorizer = ExpenseCategorizer(
+    llm_client=EmergentLlmClient(os.environ.get('EMERGENT_LLM_KEY')),
+    cache_collection=None,  # bound by open_database
+    cache_size=CATEGORY_CACHE_SIZE,
+    batch_size=CATEGORIZE_BATCH_SIZE,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    timeout=LLM_TIMEOUT_SECONDS,
+    breaker=CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN_SECONDS),
+    on_llm_call=record_llm_call
+)
+
+# Background categorization
+AUTO_CATEGORY = 'auto'
+PENDING_CATEGORY = 'Other'
+# The categorizer only knows expense categories; uncategorized income gets this
+INCOME_DEFAULT_CATEGORY = 'Other Income'
+CATEGORIZATION_QUEUE_SIZE = int(os.environ.get('CATEGORIZATION_QUEUE_SIZE', '10000'))
+CATEGORIZATION_LINGER_SECONDS = float(os.environ.get('CATEGORIZATION_LINGER_SECONDS', '0.5'))
+
+# Authenticated-user cache
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+
+# Rate limiting: RATE_LIMIT_<ROUTE>_<SCOPE>="count/period" overrides a default, "0" disables it
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_DEFAULTS = {
+    'default': {'ip': '600/min'},  # every route, in-process only
+    'login': {'ip': '30/min', 'client_id': '5/min'},
+    'ai_categorize': {'user': '30/min', 'ip': '60/min'},
+    'ai_categorize_batch': {'user': '10/min', 'ip': '20/min'},
+    'report_export': {'user': '10/min'},
+}
+# 'mongo' shares the per-account buckets below across workers (one extra round trip per check)
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SHARED_SCOPES = os.environ.get('RATE_LIMIT_SHARED_SCOPES', 'client_id,user').split(',')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+
+# Report exports: rendered in worker processes, files cached per user data version
+EXPORT_DIR = Path(os.environ.get('EXPORT_DIR', Path(tempfile.gettempdir()) / 'arthverse-exports'))
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+EXPORT_SPOOL_BATCH_SIZE = 1000
+# Bump when the statement layout changes so cached files are rebuilt
+EXPORT_LAYOUT_VERSION = 1
+
 # Security
 security = HTTPBearer()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A client bound beforehand (benchmarks, tests) is used as is
+    if client is None:
+        open_database()
+    if os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true':
+        await ensure_indexes()
+    warm_up = getattr(categorizer.llm_client, 'warm_up', None)
+    if LLM_WARM_UP and warm_up is not None:
+        await warm_up()
+    categorization_queue.start()
+    if METRICS_ENABLED:
+        event_loop_monitor.start()
+    try:
+        yield
+    finally:
+        await categorization_queue.stop()
+        await event_loop_monitor.stop()
+        close_database()
+        password_hash_executor.shutdown(wait=False)
+        export_executor.shutdown(wait=False, cancel_futures=True)
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -74,12 +269,22 @@ class AuthResponse(BaseModel):
     token: str
     user: UserResponse
 
+class TransactionType(str, Enum):
+    income = "income"
+    expense = "expense"
+
 class TransactionCreate(BaseModel):
-    amount: float
-    type: str  # 'income' or 'expense'
-    category: str
+    model_config = ConfigDict(use_enum_values=True)
+    amount: float = Field(gt=0, le=TRANSACTION_MAX_AMOUNT, allow_inf_nan=False)  # rupees; stored as integer paise
+    type: TransactionType
+    category: Optional[str] = None  # missing or 'auto' -> categorized in the background (expenses)
     description: str
-    date: str
+    date: str  # normalized to YYYY-MM-DD; stored as a BSON datetime
+    
+    @field_validator('date')
+    @classmethod
+    def normalize_transaction_date(cls, value: str) -> str:
+        return normalize_date(value)
 
 class Transaction(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -91,6 +296,18 @@ class Transaction(BaseModel):
     description: str
     date: str
     created_at: str
+    category_pending: bool = False
+
+class BulkImportRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResponse(BaseModel):
+    received: int
+    inserted: int
+    duplicates: int
+    failed: int
+    errors: List[BulkImportRowError]
 
 class FinancialHealthScore(BaseModel):
     score: int
@@ -100,6 +317,9 @@ class FinancialHealthScore(BaseModel):
     savings_rate: float
     expense_to_income_ratio: float
     insights: List[str]
+    net_worth: Optional[float] = None
+    emergency_fund_months: Optional[float] = None
+    debt_to_income: Optional[float] = None
 
 class PLStatement(BaseModel):
     total_income: float
@@ -109,6 +329,31 @@ class PLStatement(BaseModel):
     expenses_by_category: dict
     monthly_trend: List[dict]
 
+class TrendPoint(BaseModel):
+    month: str
+    income: float
+    expenses: float
+    net: float
+    income_by_category: dict
+    expenses_by_category: dict
+    # Trailing averages over ``window`` months, including this one
+    rolling_income: float
+    rolling_expenses: float
+    rolling_net: float
+    # Month-over-month change; percentages are None when the previous month was zero
+    income_change: float
+    expenses_change: float
+    net_change: float
+    income_change_pct: Optional[float] = None
+    expenses_change_pct: Optional[float] = None
+
+class TrendReport(BaseModel):
+    start_month: str
+    end_month: str
+    months: int
+    window: int
+    series: List[TrendPoint]
+
 class BalanceSheet(BaseModel):
     total_assets: float
     total_liabilities: float
@@ -116,6 +361,36 @@ class BalanceSheet(BaseModel):
     assets_breakdown: dict
     liabilities_breakdown: dict
 
+class ExportReport(str, Enum):
+    pl = "pl"
+    balance_sheet = "balance_sheet"
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    xlsx = "xlsx"
+    pdf = "pdf"
+
+class ReportExportRequest(BaseModel):
+    model_config = ConfigDict(use_enum_values=True)
+    report: ExportReport
+    format: ExportFormat = ExportFormat.csv
+    date_from: Optional[str] = None  # inclusive, YYYY-MM-DD
+    date_to: Optional[str] = None
+    
+    @field_validator('date_from', 'date_to')
+    @classmethod
+    def normalize_range_date(cls, value: Optional[str]) -> Optional[str]:
+        return normalize_date(value) if value else None
+
+class DashboardResponse(BaseModel):
+    user: Optional[UserResponse] = None
+    questionnaire: Optional[dict] = None
+    health_score: Optional[FinancialHealthScore] = None
+    pl: Optional[PLStatement] = None
+    balance_sheet: Optional[BalanceSheet] = None
+
+DASHBOARD_FIELDS = ('user', 'questionnaire', 'health_score', 'pl', 'balance_sheet')
+
 class CategorizeExpenseRequest(BaseModel):
     description: str
     amount: float
@@ -124,6 +399,12 @@ class CategorizeExpenseResponse(BaseModel):
     category: str
     confidence: str
 
+class CategorizeBatchRequest(BaseModel):
+    items: List[CategorizeExpenseRequest]
+
+class CategorizeBatchResponse(BaseModel):
+    results: List[CategorizeExpenseResponse]
+
 class FinancialEntry(BaseModel):
     type: str
     amount: float
@@ -134,7 +415,7 @@ class PropertyEntry(BaseModel):
     name: str = ""
     estimated_value: float = 0
     area_sqft: float = 0
-    # value_per_sqft calculated on frontend
+    # value_per_sqft computed by planning.user_plan
 
 class VehicleEntry(BaseModel):
     vehicle_type: str = ""  # 2-Wheeler / 4-Wheeler
@@ -149,14 +430,14 @@ class LoanEntry(BaseModel):
     principal_amount: float = 0
     interest_rate: float = 0  # Annual %
     tenure_months: int = 0
-    # EMI and yearly interest calculated on frontend
+    # EMI and yearly interest computed by planning.user_plan
 
 class InterestIncomeEntry(BaseModel):
     name: str = ""  # FD name, Bond name, etc.
     investment_type: str = ""  # FD/RD/Bonds/Debentures/Other
     principal_amount: float = 0
     interest_rate: float = 0  # Annual %
-    # Yearly interest income calculated on frontend
+    # Yearly interest income computed by planning.user_plan
 
 class FinancialQuestionnaire(BaseModel):
     # Predefined Income
@@ -245,19 +526,137 @@ class FinancialQuestionnaire(BaseModel):
     monthly_investment: float = 0
     
     completed_at: str = ""
+    
+    # Bumped on every write; PATCH requires it via If-Match
+    version: int = 0
+
+# Fields grouped the way the wizard edits them, for PATCH ?section= and GET ?fields=
+QUESTIONNAIRE_SECTIONS = {
+    "income": [
+        "rental_property1", "rental_property2", "salary_income", "business_income", "interest_income",
+        "dividend_income", "capital_gains", "freelance_income", "other_income", "income_entries"
+    ],
+    "expenses": [
+        "rent_expense", "emis", "term_insurance", "health_insurance", "vehicle_2w_1", "vehicle_2w_2",
+        "vehicle_4w_1", "vehicle_4w_2", "vehicle_4w_3", "household_maid", "groceries", "food_dining",
+        "fuel", "travel", "shopping", "online_shopping", "electronics", "entertainment",
+        "telecom_utilities", "healthcare", "education", "cash_withdrawals", "foreign_transactions",
+        "expense_entries"
+    ],
+    "assets": [
+        "property_value", "vehicles_value", "gold_value", "silver_value", "stocks_value",
+        "mutual_funds_value", "pf_nps_value", "bank_balance", "cash_in_hand", "asset_entries"
+    ],
+    "properties": ["properties"],
+    "vehicles": ["vehicles"],
+    "liabilities": ["home_loan", "personal_loan", "vehicle_loan", "credit_card_outstanding", "liability_entries"],
+    "loans": ["loans"],
+    "interest_investments": ["interest_investments"],
+    "stability": [
+        "has_health_insurance", "has_term_insurance", "invests_in_mutual_funds", "takes_tds_refund",
+        "has_emergency_fund", "files_itr_yearly", "credit_cards", "monthly_investment"
+    ],
+}
+QUESTIONNAIRE_FIELDS = {field for fields in QUESTIONNAIRE_SECTIONS.values() for field in fields}
 
 class QuestionnaireResponse(BaseModel):
     message: str
     questionnaire: FinancialQuestionnaire
 
+class LoanPlan(BaseModel):
+    name: str
+    loan_type: str
+    principal_amount: float
+    interest_rate: float
+    tenure_months: int
+    emi: float
+    yearly_interest: float
+    total_interest: float
+
+class InterestInvestmentPlan(BaseModel):
+    name: str
+    investment_type: str
+    principal_amount: float
+    interest_rate: float
+    yearly_interest: float
+    effective_annual_yield: float
+
+class PropertyPlan(BaseModel):
+    name: str
+    estimated_value: float
+    area_sqft: float
+    value_per_sqft: float
+
+class ProjectionYear(BaseModel):
+    year: int
+    income: float
+    expenses: float
+    loan_payments: float
+    cash_flow: float
+    total_assets: float
+    liabilities: float
+    net_worth: float
+
+class PlanningReport(BaseModel):
+    loans: List[LoanPlan]
+    interest_investments: List[InterestInvestmentPlan]
+    properties: List[PropertyPlan]
+    projection: List[ProjectionYear]
+    assumptions: dict
+
+# ============= Response Mapping =============
+#
+# Documents read from Mongo (or built here) are already valid, so hot routes
+# project them onto the response model's fields and return ORJSONResponse
+# directly, skipping the second validation and encoding pass FastAPI would
+# run for ``response_model``. The route keeps ``response_model`` for the
+# OpenAPI schema.
+
+@lru_cache(maxsize=None)
+def response_fields(model) -> tuple:
+    return tuple(
+        (name, field.is_required(), None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+def to_response(model, doc: dict) -> dict:
+    """Project a trusted document onto ``model``'s fields, filling defaults"""
+    return {
+        name: doc[name] if required else doc.get(name, default)
+        for name, required, default in response_fields(model)
+    }
+
 # ============= Helper Functions =============
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def run_password_job(func, *args):
+    """Run a bcrypt call on the hashing pool, rejecting fast when the queue is full"""
+    global password_hash_pending
+    if password_hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    password_hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        with span(f'bcrypt.{func.__name__}'):
+            return await loop.run_in_executor(password_hash_executor, func, *args)
+    finally:
+        password_hash_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await run_password_job(verify_password, password, hashed)
+
 def create_token(user_id: str) -> str:
     expiration = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     payload = {
@@ -269,40 +668,1290 @@ def create_token(user_id: str) -> str:
 async def verify_token(credentials: HTTPAuthorizationCredentials) -> str:
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        with span('jwt.decode'):
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         return payload['user_id']
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token expired')
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
 
+class TtlLruCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self.entries[key] = (self.clock() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+user_cache = TtlLruCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+def rate_limit_rules() -> dict:
+    rules = {}
+    for route, scopes in RATE_LIMIT_DEFAULTS.items():
+        for scope, default in scopes.items():
+            rate = parse_rate(os.environ.get(f'RATE_LIMIT_{route.upper()}_{scope.upper()}', default))
+            if rate is not None:
+                rules.setdefault(route, {})[scope] = rate
+    return rules
+
+rate_limiter = RateLimiter(
+    rate_limit_rules() if RATE_LIMIT_ENABLED else {},
+    buckets=TokenBuckets(RATE_LIMIT_MAX_KEYS),
+    shared=MongoTokenBuckets(None) if RATE_LIMIT_BACKEND == 'mongo' else None,  # bound by open_database
+    shared_scopes=RATE_LIMIT_SHARED_SCOPES
+)
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else 'unknown'
+
+async def enforce_rate_limit(route: str, **keys):
+    retry_after = await rate_limiter.check(route, **keys)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429, detail="Too many requests", headers={"Retry-After": retry_after_header(retry_after)}
+        )
+
+def rate_limited(route: str):
+    """Dependency applying ``route``'s per-user and per-IP limits to an authenticated route"""
+    async def dependency(request: Request, user_id: str = Depends(get_current_user_id)):
+        await enforce_rate_limit(route, ip=client_ip(request), user=user_id)
+    return dependency
+
+async def load_user(user_id: str) -> Optional[dict]:
+    """User document without the password hash, served from ``user_cache``"""
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if user is not None:
+            user_cache.set(user_id, user)
+    return user
+
+def invalidate_user(user_id: str):
+    """Call after any write to a user document (monthly_income, networth, ...)"""
+    user_cache.invalidate(user_id)
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """Decode the bearer token; FastAPI runs this once per request however many dependants use it"""
+    return await verify_token(credentials)
+
+async def get_authenticated_user(user_id: str = Depends(get_current_user_id)) -> dict:
+    user = await load_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 async def categorize_with_ai(description: str, amount: float) -> dict:
     """Use AI to categorize expenses"""
+    with span('categorize.one'):
+        return await categorizer.categorize(description, amount)
+
+async def categorize_many_with_ai(items: List[tuple]) -> List[dict]:
+    """Categorize many ``(description, amount)`` pairs with at most one model call per batch"""
+    with span('categorize.many', items=len(items)):
+        return await categorizer.categorize_many(items)
+
+# ============= Stored Transaction Fields =============
+#
+# Transactions store ``amount_paise`` (int64) and ``date`` as a BSON datetime
+# at midnight UTC, so indexes sort chronologically and sums are exact. The API
+# keeps speaking rupees and ``YYYY-MM-DD``; ``transaction_out`` converts.
+# Rows written before scripts/backfill_typed_transactions.py ran still carry a
+# float ``amount`` and a ``YYYY-MM-DD`` string ``date``. Summaries convert
+# both; list filters and cursors match the string dates too, but the document
+# store lists those rows after all typed ones (see ``transaction_filter``).
+
+INT64_MAX = 2 ** 63 - 1
+
+def to_paise(amount) -> int:
+    """Exact integer paise for a rupee amount, rounding half-up at the paisa; raises ValueError"""
     try:
-        llm_key = os.environ.get('EMERGENT_LLM_KEY')
-        chat = LlmChat(
-            api_key=llm_key,
-            session_id=f"categorize-{uuid.uuid4()}",
-            system_message="You are a financial assistant. Categorize expenses into one of these categories: Food & Dining, Transportation, Shopping, Bills & Utilities, Healthcare, Entertainment, Travel, Education, Investment, Other. Respond with ONLY the category name, nothing else."
-        ).with_model("openai", "gpt-5.1")
-        
-        user_message = UserMessage(
-            text=f"Categorize this expense: '{description}' amount: ${amount}"
+        paise = int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError) as e:
+        raise ValueError(f"amount {amount!r} cannot be stored in paise") from e
+    if abs(paise) > INT64_MAX:
+        raise ValueError(f"amount {amount!r} is too large")
+    return paise
+
+def transaction_paise(transaction: dict) -> int:
+    if 'amount_paise' in transaction:
+        return int(transaction['amount_paise'])
+    return to_paise(transaction.get('amount', 0))
+
+def transaction_datetime(value) -> datetime:
+    """Canonical stored date: the transaction day at midnight UTC; raises ValueError"""
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(normalize_date(str(value)))
+
+def transaction_out(transaction: dict) -> dict:
+    """Stored transaction -> API shape (rupee ``amount``, ``YYYY-MM-DD`` date)"""
+    out = {k: v for k, v in transaction.items() if k not in ('_id', 'amount_paise')}
+    out['amount'] = transaction_paise(transaction) / 100
+    if isinstance(out.get('date'), datetime):
+        out['date'] = out['date'].date().isoformat()
+    return out
+
+def stored_transaction_fields(transaction: TransactionCreate) -> dict:
+    fields = transaction.model_dump()
+    fields['amount_paise'] = to_paise(fields.pop('amount'))
+    fields['date'] = transaction_datetime(fields['date'])
+    return fields
+
+# ============= Report Aggregation =============
+
+async def get_transaction_summary(user_id: str) -> dict:
+    """Recompute a user's summary from raw transactions, bypassing the rollup"""
+    groups = await transaction_store.summary_groups(user_id)
+    return summary_from_rollup(rollup_from_groups(user_id, groups))
+
+def monthly_trend_from_summary(summary: dict) -> List[dict]:
+    return [
+        {
+            "month": month,
+            "income": values['income'],
+            "expenses": values['expenses'],
+            "net": values['income'] - values['expenses']
+        }
+        for month, values in sorted(summary['monthly'].items())
+    ]
+
+def build_health_score(summary: dict, snapshot: Optional[dict] = None) -> FinancialHealthScore:
+    total_income = summary['total_income']
+    total_expenses = summary['total_expenses']
+    if snapshot and total_income <= 0:
+        # No ledger income yet: score the questionnaire's monthly figures instead
+        total_income = snapshot['monthly_income']
+        total_expenses = snapshot['monthly_expenses'] + snapshot['monthly_emi']
+    net_savings = total_income - total_expenses
+    
+    # Calculate ratios
+    savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
+    expense_to_income_ratio = (total_expenses / total_income) if total_income > 0 else 0
+    
+    # Calculate score (0-100); with a snapshot, 20 points move to balance-sheet strength
+    score = 30 if snapshot else 50
+    if savings_rate >= 20:
+        score += 30
+    elif savings_rate >= 10:
+        score += 15
+    
+    if expense_to_income_ratio <= 0.5:
+        score += 20
+    elif expense_to_income_ratio <= 0.7:
+        score += 10
+    
+    if snapshot:
+        if snapshot['emergency_fund_months'] >= 6:
+            score += 10
+        elif snapshot['emergency_fund_months'] >= 3:
+            score += 5
+        if snapshot['debt_to_income'] <= 0.3:
+            score += 10
+        elif snapshot['debt_to_income'] <= 0.5:
+            score += 5
+    
+    score = min(100, max(0, score))
+    
+    # Generate insights
+    insights = []
+    if savings_rate < 10:
+        insights.append("Consider reducing expenses to improve your savings rate")
+    elif savings_rate >= 20:
+        insights.append("Excellent savings rate! You're on track for financial health")
+    
+    if expense_to_income_ratio > 0.8:
+        insights.append("Your expenses are high relative to income. Review unnecessary spending")
+    elif expense_to_income_ratio <= 0.5:
+        insights.append("Great job keeping expenses low!")
+    
+    if snapshot:
+        if snapshot['emergency_fund_months'] < 3:
+            insights.append("Build an emergency fund covering at least 3-6 months of expenses")
+        if snapshot['debt_to_income'] > 0.5:
+            insights.append("EMIs take over half your income. Prioritise paying down debt")
+        if snapshot['net_worth'] < 0:
+            insights.append("Your liabilities exceed your assets")
+    
+    if summary['transaction_count'] < 5:
+        insights.append("Add more transactions to get better insights")
+    
+    return FinancialHealthScore(
+        score=int(score),
+        total_income=total_income,
+        total_expenses=total_expenses,
+        net_savings=net_savings,
+        savings_rate=round(savings_rate, 2),
+        expense_to_income_ratio=round(expense_to_income_ratio, 2),
+        insights=insights,
+        net_worth=snapshot['net_worth'] if snapshot else None,
+        emergency_fund_months=round(snapshot['emergency_fund_months'], 2) if snapshot else None,
+        debt_to_income=round(snapshot['debt_to_income'], 4) if snapshot else None
+    )
+
+def build_pl_statement(summary: dict) -> PLStatement:
+    total_income = summary['total_income']
+    total_expenses = sum(summary['expenses_by_category'].values())
+    
+    return PLStatement(
+        total_income=total_income,
+        total_expenses=total_expenses,
+        net_profit_loss=total_income - total_expenses,
+        income_by_category=summary['income_by_category'],
+        expenses_by_category=summary['expenses_by_category'],
+        monthly_trend=monthly_trend_from_summary(summary)
+    )
+
+def build_balance_sheet(summary: dict, snapshot: Optional[dict] = None) -> BalanceSheet:
+    if snapshot:
+        return BalanceSheet(
+            total_assets=snapshot['total_assets'],
+            total_liabilities=snapshot['total_liabilities'],
+            net_worth=snapshot['net_worth'],
+            assets_breakdown=snapshot['assets_breakdown'],
+            liabilities_breakdown=snapshot['liabilities_breakdown']
         )
-        
-        response = await chat.send_message(user_message)
-        category = response.strip()
-        
-        # Validate category
-        valid_categories = ['Food & Dining', 'Transportation', 'Shopping', 'Bills & Utilities', 
-                          'Healthcare', 'Entertainment', 'Travel', 'Education', 'Investment', 'Other']
-        if category not in valid_categories:
-            category = 'Other'
-        
-        return {'category': category, 'confidence': 'high'}
-    except Exception as e:
-        logger.error(f"AI categorization failed: {e}")
-        return {'category': 'Other', 'confidence': 'low'}
+    
+    # Without a questionnaire the ledger is all we have
+    total_assets = summary['total_income']
+    total_liabilities = summary['total_expenses']
+    
+    return BalanceSheet(
+        total_assets=total_assets,
+        total_liabilities=total_liabilities,
+        net_worth=total_assets - total_liabilities,
+        assets_breakdown={'Cash': total_assets},
+        liabilities_breakdown={'Expenses': total_liabilities}
+    )
+
+# ============= Financial Snapshots =============
+#
+# ``financial_snapshots`` holds one document per user derived from their
+# questionnaire: asset/liability breakdowns, net worth and coverage ratios.
+# It is recomputed on questionnaire submit only when the inputs hash changes,
+# and reports read it instead of recomputing.
+
+# Every section except 'stability' feeds the snapshot
+SNAPSHOT_INPUT_FIELDS = QUESTIONNAIRE_FIELDS - set(QUESTIONNAIRE_SECTIONS['stability'])
+
+def snapshot_input_hash(questionnaire: dict) -> str:
+    inputs = {k: questionnaire.get(k) for k in SNAPSHOT_INPUT_FIELDS}
+    encoded = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+async def refresh_financial_snapshot(user_id: str, questionnaire: dict) -> dict:
+    """Recompute the snapshot if its inputs changed; keeps users.networth in step"""
+    input_hash = snapshot_input_hash(questionnaire)
+    existing = await db.financial_snapshots.find_one({"user_id": user_id}, {"_id": 0})
+    if existing and existing.get('input_hash') == input_hash:
+        return existing
+    
+    snapshot = planning.financial_snapshot(questionnaire)
+    snapshot.update({
+        "user_id": user_id,
+        "input_hash": input_hash,
+        "computed_at": datetime.now(timezone.utc).isoformat()
+    })
+    await db.financial_snapshots.replace_one({"user_id": user_id}, snapshot, upsert=True)
+    await db.users.update_one({"id": user_id}, {"$set": {"networth": snapshot['net_worth']}})
+    invalidate_user(user_id)
+    snapshot.pop('_id', None)
+    return snapshot
+
+async def get_financial_snapshot(user_id: str) -> Optional[dict]:
+    """The stored snapshot, built on first read for questionnaires saved before snapshots existed"""
+    snapshot = await db.financial_snapshots.find_one({"user_id": user_id}, {"_id": 0})
+    if snapshot:
+        return snapshot
+    questionnaire = await db.questionnaires.find_one({"user_id": user_id}, {"_id": 0})
+    if not questionnaire:
+        return None
+    return await refresh_financial_snapshot(user_id, questionnaire)
+
+async def clear_financial_snapshot(user_id: str):
+    await db.financial_snapshots.delete_one({"user_id": user_id})
+    await db.users.update_one({"id": user_id}, {"$set": {"networth": 0}})
+    invalidate_user(user_id)
+
+# ============= Ledger Rollups =============
+#
+# One ``user_rollups`` document per user holds running totals so reports are a
+# single indexed read. Every bucket stores ``{"total", "count"}``:
+#
+#   by_type.<type>
+#   by_category.<type>.<category>
+#   by_month.<YYYY-MM>.<type>
+#
+# Transaction writes ``$inc`` the affected buckets; ``rebuild_user_rollup``
+# recomputes the document from raw transactions when it is missing or drifts.
+# Totals are integer paise; rollups from before that carry no ``amount_unit``
+# and are rebuilt on first read. Rollups written before the month-by-category
+# series existed lack ``monthly_trends`` and are rebuilt the same way.
+
+ROLLUP_AMOUNT_UNIT = 'paise'
+ROLLUP_REBUILD_ATTEMPTS = int(os.environ.get('ROLLUP_REBUILD_ATTEMPTS', '5'))
+
+ROLLUP_KEY_ESCAPES = [('$', '\uff04'), ('.', '\uff0e')]
+
+def encode_rollup_key(key: str) -> str:
+    """Make a type/category usable as a MongoDB field name"""
+    for raw, escaped in ROLLUP_KEY_ESCAPES:
+        key = key.replace(raw, escaped)
+    return key
+
+def decode_rollup_key(key: str) -> str:
+    for raw, escaped in ROLLUP_KEY_ESCAPES:
+        key = key.replace(escaped, raw)
+    return key
+
+def transaction_month(date_value) -> Optional[str]:
+    """Month bucket (YYYY-MM) for a transaction date, or None if unparseable"""
+    if isinstance(date_value, datetime):
+        return date_value.strftime('%Y-%m')
+    try:
+        return datetime.fromisoformat(str(date_value)).strftime('%Y-%m')
+    except ValueError:
+        return None
+
+def empty_rollup(user_id: str) -> dict:
+    return {
+        "user_id": user_id,
+        "amount_unit": ROLLUP_AMOUNT_UNIT,
+        "monthly_trends": True,
+        "transaction_count": 0,
+        "by_type": {},
+        "by_category": {},
+        "by_month": {}
+    }
+
+def rollup_bucket_paths(tx_type: str, category: str, month: Optional[str]) -> List[str]:
+    tx_type = encode_rollup_key(tx_type or '')
+    category = encode_rollup_key(category or 'Other')
+    paths = [f"by_type.{tx_type}", f"by_category.{tx_type}.{category}"]
+    if month:
+        paths.append(f"by_month.{month}.{tx_type}")
+    return paths
+
+def rollup_increments(transaction: dict, sign: int = 1) -> dict:
+    """``$inc`` document that adds (sign=1) or removes (sign=-1) a transaction"""
+    increments = {"transaction_count": sign}
+    paths = rollup_bucket_paths(
+        transaction.get('type'),
+        transaction.get('category'),
+        transaction_month(transaction.get('date'))
+    )
+    for path in paths:
+        increments[f"{path}.total"] = sign * transaction_paise(transaction)
+        increments[f"{path}.count"] = sign
+    return increments
+
+def rollup_from_groups(user_id: str, groups: list) -> dict:
+    """Build a rollup document from the store's ``summary_groups`` output"""
+    rollup = empty_rollup(user_id)
+    for group in groups:
+        key = group['_id']
+        month = key.get('month')
+        paths = rollup_bucket_paths(
+            key.get('type'),
+            key.get('category'),
+            # $dateTrunc gives a datetime; buckets already carry "YYYY-MM"
+            month.strftime('%Y-%m') if isinstance(month, datetime) else month
+        )
+        rollup['transaction_count'] += group['count']
+        for path in paths:
+            node = rollup
+            for part in path.split('.'):
+                node = node.setdefault(part, {})
+            node['total'] = node.get('total', 0) + group['total']
+            node['count'] = node.get('count', 0) + group['count']
+    return rollup
+
+def summary_from_rollup(rollup: dict) -> dict:
+    """Flatten a rollup document into the rupee totals the report builders use.
+
+    Buckets emptied by deletes keep a zero count and are skipped.
+    """
+    def live(buckets: dict):
+        for key, bucket in buckets.items():
+            if bucket.get('count', 0) > 0:
+                yield decode_rollup_key(key), bucket['total'] / 100
+
+    by_type = dict(live(rollup.get('by_type', {})))
+    summary = {
+        "total_income": by_type.get('income', 0),
+        "total_expenses": by_type.get('expense', 0),
+        "transaction_count": rollup.get('transaction_count', 0),
+        "income_by_category": {},
+        "expenses_by_category": {},
+        "monthly": {}
+    }
+    for tx_type, categories in rollup.get('by_category', {}).items():
+        target = summary['income_by_category' if decode_rollup_key(tx_type) == 'income' else 'expenses_by_category']
+        for category, total in live(categories):
+            target[category] = target.get(category, 0) + total
+    for month, types in sorted(rollup.get('by_month', {}).items()):
+        bucket = {"income": 0, "expenses": 0}
+        found = False
+        for tx_type, total in live(types):
+            found = True
+            bucket['income' if tx_type == 'income' else 'expenses'] += total
+        if found:
+            summary['monthly'][month] = bucket
+    return summary
+
+async def rebuild_user_rollup(user_id: str) -> dict:
+    """Recompute a user's rollup and monthly series from raw transactions and store them.
+
+    The rollup is replaced only while its ``version`` is the one read before
+    aggregating, so an ``$inc`` from a concurrent write is never overwritten;
+    the rebuild starts over instead, and again if a write lands while the
+    series is rewritten. A transaction stored before the aggregation but
+    folded in after the replace is still counted twice; scripts/repair_rollups.py
+    finds and rebuilds such rollups.
+    """
+    for _ in range(ROLLUP_REBUILD_ATTEMPTS):
+        current = await db.user_rollups.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+        version = current.get('version') if current else None
+        groups = await transaction_store.summary_groups(user_id)
+        rollup = rollup_from_groups(user_id, groups)
+        rollup['rebuilt_at'] = datetime.now(timezone.utc).isoformat()
+        fence = {"user_id": user_id, "version": {"$exists": False} if version is None else version}
+        try:
+            result = await db.user_rollups.update_one(
+                fence, {"$set": rollup, "$inc": {"version": 1}}, upsert=current is None
+            )
+        except DuplicateKeyError:
+            continue  # another rebuild created the rollup first
+        if current is not None and result.matched_count == 0:
+            continue
+        await rebuild_monthly_trends(user_id, groups)
+        rebuilt = {"user_id": user_id, "version": (version or 0) + 1}
+        if await db.user_rollups.count_documents(rebuilt, limit=1):
+            return rollup
+    logger.warning(f"Rollup rebuild for {user_id} kept racing writes; check it with scripts/repair_rollups.py")
+    return rollup
+
+async def apply_rollup_changes(user_id: str, added: List[dict] = (), removed: List[dict] = ()):
+    """Fold written and deleted transactions into the user's rollup in one update"""
+    if not added and not removed:
+        return
+    increments = {"version": 1}
+    for transactions, sign in ((added, 1), (removed, -1)):
+        for transaction in transactions:
+            for path, value in rollup_increments(transaction, sign).items():
+                increments[path] = increments.get(path, 0) + value
+    result = await db.user_rollups.update_one(
+        {"user_id": user_id, "monthly_trends": True},
+        {
+            "$inc": increments,
+            "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+        }
+    )
+    if result.matched_count == 0:
+        # No rollup yet (new user or pre-rollup history): seed it from the
+        # raw transactions, which already include this write.
+        await rebuild_user_rollup(user_id)
+    else:
+        await apply_trend_changes(user_id, added, removed)
+
+async def apply_transactions_to_rollup(user_id: str, transactions: List[dict], sign: int = 1):
+    if sign > 0:
+        await apply_rollup_changes(user_id, added=transactions)
+    else:
+        await apply_rollup_changes(user_id, removed=transactions)
+
+async def apply_transaction_to_rollup(user_id: str, transaction: dict, sign: int = 1):
+    await apply_transactions_to_rollup(user_id, [transaction], sign)
+
+async def get_ledger_summary(user_id: str) -> dict:
+    rollup = await db.user_rollups.find_one({"user_id": user_id}, {"_id": 0})
+    if rollup is None or rollup.get('amount_unit') != ROLLUP_AMOUNT_UNIT or not rollup.get('monthly_trends'):
+        rollup = await rebuild_user_rollup(user_id)
+    return summary_from_rollup(rollup)
+
+def summaries_match(left: dict, right: dict, tolerance: float) -> bool:
+    def close(a, b):
+        if isinstance(a, dict) and isinstance(b, dict):
+            return a.keys() == b.keys() and all(close(a[k], b[k]) for k in a)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            return abs(a - b) <= tolerance
+        return a == b
+    return close(left, right)
+
+async def repair_user_rollup(user_id: str, tolerance: float = 0.005) -> bool:
+    """Rebuild a user's rollup if it drifted from raw transactions.
+
+    Returns True when a repair was needed.
+    """
+    stored = await db.user_rollups.find_one({"user_id": user_id}, {"_id": 0})
+    actual = await get_transaction_summary(user_id)
+    if stored is not None and summaries_match(summary_from_rollup(stored), actual, tolerance):
+        return False
+    await rebuild_user_rollup(user_id)
+    return True
+
+# ============= Monthly Trends =============
+#
+# ``monthly_trends`` holds one document per user and calendar month with the
+# same bucket layout as a rollup (``by_type`` and ``by_category``, paise), so a
+# multi-year chart is one range read on the (user_id, month) index. Writes
+# ``$inc`` only the months they touch; ``rebuild_user_rollup`` rewrites the
+# series from the same grouped aggregation it uses for the rollup.
+
+TREND_MAX_MONTHS = int(os.environ.get('TREND_MAX_MONTHS', '120'))
+TREND_MAX_WINDOW = 12
+
+def trend_month_increments(transactions: List[dict], sign: int, increments: dict):
+    """Accumulate per-month ``$inc`` documents for ``transactions`` into ``increments``"""
+    for transaction in transactions:
+        month = transaction_month(transaction.get('date'))
+        if month is None:
+            continue
+        month_increments = increments.setdefault(month, {})
+        amount = sign * transaction_paise(transaction)
+        for path in rollup_bucket_paths(transaction.get('type'), transaction.get('category'), None):
+            month_increments[f"{path}.total"] = month_increments.get(f"{path}.total", 0) + amount
+            month_increments[f"{path}.count"] = month_increments.get(f"{path}.count", 0) + sign
+
+async def apply_trend_changes(user_id: str, added: List[dict] = (), removed: List[dict] = ()):
+    increments = {}
+    trend_month_increments(added, 1, increments)
+    trend_month_increments(removed, -1, increments)
+    if not increments:
+        return
+    await db.monthly_trends.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "month": month},
+            {"$inc": month_increments, "$setOnInsert": {"amount_unit": ROLLUP_AMOUNT_UNIT}},
+            upsert=True
+        )
+        for month, month_increments in increments.items()
+    ], ordered=False)
+
+async def rebuild_monthly_trends(user_id: str, groups: list):
+    """Replace a user's series with the months present in ``summary_groups`` output"""
+    groups_by_month = {}
+    for group in groups:
+        month = group['_id'].get('month')
+        month = month.strftime('%Y-%m') if isinstance(month, datetime) else month
+        if month:
+            # Without a month the rollup builder fills only by_type/by_category
+            groups_by_month.setdefault(month, []).append({**group, "_id": {**group['_id'], "month": None}})
+    
+    docs = []
+    for month, month_groups in groups_by_month.items():
+        buckets = rollup_from_groups(user_id, month_groups)
+        docs.append({
+            "user_id": user_id,
+            "month": month,
+            "amount_unit": ROLLUP_AMOUNT_UNIT,
+            "by_type": buckets['by_type'],
+            "by_category": buckets['by_category']
+        })
+    
+    await db.monthly_trends.delete_many({"user_id": user_id, "month": {"$nin": list(groups_by_month)}})
+    if docs:
+        await db.monthly_trends.bulk_write([
+            ReplaceOne({"user_id": user_id, "month": doc['month']}, doc, upsert=True) for doc in docs
+        ], ordered=False)
+
+def shift_month(month: str, offset: int) -> str:
+    year, number = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + offset, 12)
+    return f"{year:04d}-{number + 1:02d}"
+
+def month_range(months: int, end_month: Optional[str] = None) -> List[str]:
+    """``months`` consecutive YYYY-MM strings ending with ``end_month`` (default: this month)"""
+    end_month = end_month or datetime.now(timezone.utc).strftime('%Y-%m')
+    return [shift_month(end_month, offset) for offset in range(1 - months, 1)]
+
+async def get_trend_summaries(user_id: str, first_month: str, last_month: str) -> dict:
+    """``{month: summary}`` for the user's months in the inclusive range"""
+    query = {"user_id": user_id, "month": {"$gte": first_month, "$lte": last_month}}
+    docs = await db.monthly_trends.find(query, {"_id": 0}).sort("month", ASCENDING).to_list(None)
+    if not docs:
+        # Rollups from before the series existed have none yet; one rebuild fills it in
+        rollup = await db.user_rollups.find_one({"user_id": user_id}, {"_id": 0, "monthly_trends": 1})
+        if rollup is None or not rollup.get('monthly_trends'):
+            await rebuild_user_rollup(user_id)
+            docs = await db.monthly_trends.find(query, {"_id": 0}).sort("month", ASCENDING).to_list(None)
+    return {doc['month']: summary_from_rollup(doc) for doc in docs}
+
+def summary_from_trends(summaries: dict) -> dict:
+    """Combine monthly summaries into the shape ``build_pl_statement`` expects"""
+    combined = {
+        "total_income": 0,
+        "total_expenses": 0,
+        "income_by_category": {},
+        "expenses_by_category": {},
+        "monthly": {}
+    }
+    for month, summary in sorted(summaries.items()):
+        combined['total_income'] += summary['total_income']
+        combined['total_expenses'] += summary['total_expenses']
+        for key in ('income_by_category', 'expenses_by_category'):
+            for category, total in summary[key].items():
+                combined[key][category] = combined[key].get(category, 0) + total
+        if summary['total_income'] or summary['total_expenses']:
+            combined['monthly'][month] = {"income": summary['total_income'], "expenses": summary['total_expenses']}
+    return combined
+
+def percent_change(current: float, previous: float) -> Optional[float]:
+    return round((current - previous) / abs(previous) * 100, 2) if previous else None
+
+def build_trend_report(months: List[str], summaries: dict, shown: int, window: int) -> TrendReport:
+    """Series for the last ``shown`` of ``months``; earlier ones only feed averages and deltas"""
+    values = []
+    for month in months:
+        summary = summaries.get(month)
+        income = summary['total_income'] if summary else 0
+        expenses = summary['total_expenses'] if summary else 0
+        values.append((income, expenses, income - expenses))
+    
+    series = []
+    for index in range(len(months) - shown, len(months)):
+        income, expenses, net = values[index]
+        trailing = values[max(0, index - window + 1):index + 1]
+        previous = values[index - 1] if index > 0 else (0, 0, 0)
+        summary = summaries.get(months[index])
+        series.append(TrendPoint(
+            month=months[index],
+            income=round(income, 2),
+            expenses=round(expenses, 2),
+            net=round(net, 2),
+            income_by_category=summary['income_by_category'] if summary else {},
+            expenses_by_category=summary['expenses_by_category'] if summary else {},
+            rolling_income=round(sum(v[0] for v in trailing) / len(trailing), 2),
+            rolling_expenses=round(sum(v[1] for v in trailing) / len(trailing), 2),
+            rolling_net=round(sum(v[2] for v in trailing) / len(trailing), 2),
+            income_change=round(income - previous[0], 2),
+            expenses_change=round(expenses - previous[1], 2),
+            net_change=round(net - previous[2], 2),
+            income_change_pct=percent_change(income, previous[0]),
+            expenses_change_pct=percent_change(expenses, previous[1])
+        ))
+    return TrendReport(
+        start_month=months[-shown],
+        end_month=months[-1],
+        months=shown,
+        window=window,
+        series=series
+    )
+
+# ============= Transaction Queries =============
+
+def encode_cursor(transaction: dict) -> str:
+    """Opaque keyset cursor pointing just past ``transaction``"""
+    date_value = transaction['date']
+    if isinstance(date_value, datetime):
+        date_value = date_value.isoformat()
+    raw = json.dumps([date_value, transaction['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_value, transaction_id = json.loads(base64.urlsafe_b64decode(padded))
+        if 'T' not in date_value:
+            # A page that ended on a legacy row carries its bare string date
+            return str(date_value), transaction_id
+        return datetime.fromisoformat(date_value), transaction_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def transaction_filters(
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    tx_type: Optional[str] = None,
+    category: Optional[str] = None
+) -> dict:
+    """Keyword filters for the transaction store, newest first after ``cursor``"""
+    try:
+        date_from = transaction_datetime(date_from) if date_from else None
+        date_to = transaction_datetime(date_to) if date_to else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "tx_type": tx_type,
+        "category": category,
+        "after": decode_cursor(cursor) if cursor else None
+    }
+
+async def stream_transactions_ndjson(user_id: str, filters: dict, limit: Optional[int]):
+    """Yield one JSON document per line as the store produces them"""
+    async for transaction in transaction_store.iterate(user_id, limit=limit or None, **filters):
+        yield orjson.dumps(to_response(Transaction, transaction_out(transaction)), default=str) + b"\n"
+
+# Collections are bound by open_database
+if TRANSACTION_STORAGE == 'buckets':
+    TRANSACTION_COLLECTION = 'transaction_buckets'
+    transaction_store = BucketTransactionStore(
+        None, month_of=transaction_month, bucket_size=TRANSACTION_BUCKET_SIZE
+    )
+elif TRANSACTION_STORAGE == 'documents':
+    TRANSACTION_COLLECTION = 'transactions'
+    transaction_store = DocumentTransactionStore(None, stream_batch_size=TRANSACTIONS_STREAM_BATCH_SIZE)
+else:
+    raise RuntimeError(f"Unknown TRANSACTION_STORAGE: {TRANSACTION_STORAGE}")
+
+# ============= Database Lifecycle =============
+
+def mongo_client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [mongo_pool_stats, TraceCommandListener()]
+        + ([MongoCommandMetrics(mongo_command_duration)] if METRICS_ENABLED else [])
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+def open_database(mongo_client: Optional[AsyncIOMotorClient] = None):
+    """Bind ``client``/``db`` and the collections long-lived objects hold.
+
+    Creates a pooled client from the MONGO_* settings unless one is passed in.
+    """
+    global client, db
+    client = mongo_client or AsyncIOMotorClient(mongo_url, **mongo_client_options())
+    db = client[DB_NAME]
+    categorizer.cache_collection = db.category_cache
+    transaction_store.collection = db[TRANSACTION_COLLECTION]
+    if rate_limiter.shared is not None:
+        rate_limiter.shared.collection = db.rate_limits
+    return db
+
+def close_database():
+    global client, db
+    if client is not None:
+        client.close()
+    client = db = None
+
+# ============= Indexes =============
+
+INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("client_id", ASCENDING)], unique=True, name="client_id_unique"),
+    ],
+    "transactions": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("id", DESCENDING)], name="user_date_id"),
+        IndexModel(
+            [("category_pending", ASCENDING)],
+            partialFilterExpression={"category_pending": True},
+            name="category_pending_partial"
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("content_hash", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}},
+            name="user_content_hash_unique"
+        ),
+    ],
+    "transaction_buckets": [
+        IndexModel([("user_id", ASCENDING), ("month", DESCENDING)], name="user_month"),
+        IndexModel([("transactions.id", ASCENDING)], name="transaction_id"),
+        IndexModel([("user_id", ASCENDING), ("transactions.content_hash", ASCENDING)], name="user_content_hash"),
+        IndexModel(
+            [("transactions.category_pending", ASCENDING)],
+            partialFilterExpression={"transactions.category_pending": True},
+            name="category_pending_partial"
+        ),
+    ],
+    "questionnaires": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+    ],
+    "user_rollups": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+    ],
+    "monthly_trends": [
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING)], unique=True, name="user_month_unique"),
+    ],
+    "financial_snapshots": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+    ],
+    "category_cache": [
+        IndexModel([("key", ASCENDING)], unique=True, name="key_unique"),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+async def ensure_indexes():
+    """Create the indexes every route query relies on (idempotent)"""
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate emails in legacy data block a unique index; keep
+            # serving and surface it rather than failing startup.
+            logger.error(f"Index creation failed on {collection_name}: {e}")
+
+def route_query_samples(user_id: str) -> List[dict]:
+    """Representative query for every route, used for query-plan checks"""
+    transactions = TRANSACTION_COLLECTION
+    probe_after = (datetime(2024, 1, 1), "probe")
+    if isinstance(transaction_store, BucketTransactionStore):
+        list_sort = [("month", -1)]
+        list_filter = transaction_store.bucket_query(user_id)
+        cursor_filter = transaction_store.bucket_query(user_id, after=probe_after)
+        delete_filter = {"user_id": user_id, "transactions.id": "probe"}
+    else:
+        list_sort = TRANSACTION_SORT
+        list_filter = transaction_filter(user_id)
+        cursor_filter = transaction_filter(user_id, after=probe_after)
+        delete_filter = {"id": "probe", "user_id": user_id}
+    return [
+        {"route": "POST /auth/register", "collection": "users", "filter": {"email": "probe@example.com"}},
+        {"route": "POST /auth/login", "collection": "users", "filter": {"client_id": "AVPROBE00"}},
+        {"route": "GET /auth/me", "collection": "users", "filter": {"id": user_id}},
+        {"route": "GET /transactions", "collection": transactions, "filter": list_filter, "sort": list_sort},
+        {"route": "GET /transactions?cursor", "collection": transactions, "filter": cursor_filter, "sort": list_sort},
+        {"route": "DELETE /transactions/{id}", "collection": transactions, "filter": delete_filter},
+        {"route": "GET /questionnaire", "collection": "questionnaires", "filter": {"user_id": user_id}},
+        {"route": "GET /reports/*", "collection": "user_rollups", "filter": {"user_id": user_id}},
+        {"route": "GET /reports/balance-sheet", "collection": "financial_snapshots", "filter": {"user_id": user_id}},
+        {
+            "route": "GET /reports/trend",
+            "collection": "monthly_trends",
+            "filter": {"user_id": user_id, "month": {"$gte": "2020-01", "$lte": "2024-12"}},
+            "sort": [("month", 1)]
+        },
+        {"route": "rollup rebuild", "collection": transactions, "pipeline": transaction_store.summary_pipeline(user_id)},
+    ]
+
+def plan_stages(plan) -> List[str]:
+    """All stage names in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+def plan_nodes(explain, key: str) -> List[dict]:
+    """Every sub-document of an explain() result that contains ``key``"""
+    found = []
+    if isinstance(explain, dict):
+        if key in explain:
+            found.append(explain)
+        for value in explain.values():
+            found.extend(plan_nodes(value, key))
+    elif isinstance(explain, list):
+        for item in explain:
+            found.extend(plan_nodes(item, key))
+    return found
+
+async def explain_route_queries(user_id: str = "probe-user") -> List[dict]:
+    """Run explain() on every route query and report the winning plan stages"""
+    results = []
+    for sample in route_query_samples(user_id):
+        collection = db[sample['collection']]
+        if 'pipeline' in sample:
+            explain = await db.command(
+                'aggregate', sample['collection'],
+                pipeline=sample['pipeline'], explain=True
+            )
+        else:
+            cursor = collection.find(sample['filter'])
+            if sample.get('sort'):
+                cursor = cursor.sort(sample['sort'])
+            explain = await cursor.explain()
+        winning = [
+            node['winningPlan'] for node in plan_nodes(explain, 'winningPlan')
+        ]
+        stages = plan_stages(winning)
+        results.append({
+            "route": sample['route'],
+            "collection": sample['collection'],
+            "stages": stages,
+            "collscan": 'COLLSCAN' in stages
+        })
+    return results
+
+# ============= Bulk Import =============
+
+def import_content_hash(user_id: str, row: TransactionCreate, occurrence: int) -> str:
+    """Stable hash of an imported row.
+
+    ``occurrence`` numbers identical rows within one upload, so two genuine
+    same-day purchases survive while re-importing the statement is a no-op.
+    """
+    key = "|".join([
+        user_id, row.date, f"{row.amount:.2f}", row.type,
+        " ".join(row.description.lower().split()), str(occurrence)
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+# Statement exports from Windows tools are often cp1252 rather than UTF-8
+CSV_FALLBACK_ENCODING = 'cp1252'
+
+def clean_line(line: bytes, first: bool) -> bytes:
+    if first:
+        line = line.removeprefix(codecs.BOM_UTF8)
+    return line.rstrip(b'\r\n')
+
+def iter_file_lines(file):
+    """Undecoded lines of an uploaded file, without line endings or a UTF-8 BOM"""
+    for number, line in enumerate(file):
+        yield clean_line(line, number == 0)
+
+async def iter_request_lines(request: Request):
+    """Undecoded body lines as they arrive, without line endings or a UTF-8 BOM"""
+    pending, first = b'', True
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield clean_line(line, first)
+            first = False
+    if pending:
+        yield clean_line(pending, first)
+
+def decode_csv_line(line: bytes) -> str:
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return line.decode(CSV_FALLBACK_ENCODING, errors='replace')
+
+def parse_json_rows(rows) -> list:
+    if isinstance(rows, dict):
+        rows = rows.get('transactions')
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of transactions")
+    return list(enumerate(rows, start=1))
+
+def parse_ndjson_line(line_number: int, line: bytes):
+    try:  # invalid UTF-8 raises UnicodeDecodeError, a ValueError
+        return line_number, json.loads(line)
+    except ValueError as e:
+        return line_number, RowError(f"invalid JSON: {e}")
+
+async def iter_import_rows(request: Request):
+    """Yield ``(row_number, value | RowError)`` from a JSON, NDJSON, CSV or OFX upload"""
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    
+    if content_type == 'multipart/form-data':
+        form = await request.form()
+        upload = form.get('file')
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=400, detail="Expected a 'file' upload")
+        name = (upload.filename or '').lower()
+        if name.endswith(('.ofx', '.qfx')):
+            rows = parse_ofx(upload.file.read().decode('utf-8-sig', errors='replace'))
+        elif name.endswith('.json'):
+            try:
+                rows = parse_json_rows(json.loads(upload.file.read()))
+            except ValueError as e:  # includes UnicodeDecodeError
+                raise HTTPException(status_code=400, detail=f"{upload.filename} is not valid UTF-8 JSON: {e}")
+        elif name.endswith(('.ndjson', '.jsonl')):
+            lines = enumerate(iter_file_lines(upload.file), start=1)
+            rows = (parse_ndjson_line(n, line) for n, line in lines if line.strip())
+        else:
+            rows = parse_csv_lines(decode_csv_line(line) for line in iter_file_lines(upload.file))
+        for row in rows:
+            yield row
+    elif content_type in ('application/x-ndjson', 'application/jsonl'):
+        line_number = 0
+        async for line in iter_request_lines(request):
+            line_number += 1
+            if line.strip():
+                yield parse_ndjson_line(line_number, line)
+    elif content_type == 'text/csv':
+        reader = CsvStatementReader()
+        async for line in iter_request_lines(request):
+            row = reader.feed(decode_csv_line(line))
+            if row is not None:
+                yield row
+        row = reader.finish()
+        if row is not None:
+            yield row
+    elif content_type in ('application/x-ofx', 'application/vnd.intu.qfx'):
+        body = await request.body()
+        for row in parse_ofx(body.decode('utf-8', errors='replace')):
+            yield row
+    else:
+        try:
+            rows = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        for row in parse_json_rows(rows):
+            yield row
+
+async def insert_import_chunk(user_id: str, docs: List[dict], row_numbers: List[int], report: dict):
+    """Unordered insert of one chunk; duplicate content hashes are counted, not failed"""
+    inserted, duplicates, errors = await transaction_store.insert_many(docs)
+    report['duplicates'] += duplicates
+    for index, error in errors:
+        record_import_error(report, row_numbers[index], error)
+    report['inserted'] += len(inserted)
+    await apply_transactions_to_rollup(user_id, inserted)
+    for doc in inserted:
+        if doc.get('category_pending'):
+            categorization_queue.enqueue(transaction_out(doc))
+
+def record_import_error(report: dict, row_number: int, error: str):
+    report['failed'] += 1
+    if len(report['errors']) < BULK_IMPORT_MAX_ERRORS:
+        report['errors'].append(BulkImportRowError(row=row_number, error=error))
+
+# ============= Background Categorization =============
+
+def needs_auto_category(category: Optional[str]) -> bool:
+    return not category or category.strip().lower() == AUTO_CATEGORY
+
+def initial_category(transaction: TransactionCreate) -> Optional[str]:
+    """Category to store right away; None when the row goes to the background categorizer"""
+    if not needs_auto_category(transaction.category):
+        return transaction.category
+    if transaction.type == TransactionType.expense.value:
+        return None
+    return INCOME_DEFAULT_CATEGORY
+
+async def apply_background_categories(results: List[tuple]):
+    """Patch pending transactions with their category and move rollup totals"""
+    changes = {}
+    for transaction, result in results:
+        previous = await transaction_store.set_pending_category(
+            transaction['id'], result['category'], result['confidence']
+        )
+        if previous is None:
+            continue  # deleted or already categorized meanwhile
+        added, removed = changes.setdefault(previous['user_id'], ([], []))
+        removed.append(previous)
+        added.append({**previous, "category": result['category']})
+    for user_id, (added, removed) in changes.items():
+        await apply_rollup_changes(user_id, added=added, removed=removed)
+
+async def load_pending_categorizations(limit: int) -> List[dict]:
+    pending = [transaction_out(t) for t in await transaction_store.pending(limit)]
+    # Income rows flagged before only expenses were queued: settle them without the model
+    income = [t for t in pending if t['type'] != TransactionType.expense.value]
+    if income:
+        await apply_background_categories(
+            [(t, {'category': INCOME_DEFAULT_CATEGORY, 'confidence': 'low'}) for t in income]
+        )
+    return [t for t in pending if t['type'] == TransactionType.expense.value]
+
+categorization_queue = CategorizationQueue(
+    categorizer,
+    apply_results=apply_background_categories,
+    load_pending=load_pending_categorizations,
+    batch_size=CATEGORIZE_BATCH_SIZE,
+    linger=CATEGORIZATION_LINGER_SECONDS,
+    maxsize=CATEGORIZATION_QUEUE_SIZE
+)
+
+# ============= Report Exports =============
+#
+# Statements are rendered by report_exports in worker processes, so the
+# event loop only streams rows. Transactions go to a spool file as they come
+# out of the store, and the worker reads that file back one row at a time.
+# Neither process ever holds a user's full history. Files are cached under
+# EXPORT_DIR/<user>/<report>/ and named after the data version they show
+# (the rollup version, or the snapshot hash for questionnaire balance
+# sheets). Every transaction write bumps that version, so a cached file is
+# served only while its data is unchanged.
+
+# spawn: forking a process that runs Motor's threads is unsafe, and workers only need report_exports
+export_executor = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+export_jobs = {}
+export_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+async def report_data_version(user_id: str, report: str) -> tuple:
+    """``(version tag, snapshot)``; the snapshot is only loaded for balance sheets"""
+    if report == ExportReport.balance_sheet.value:
+        snapshot = await get_financial_snapshot(user_id)
+        if snapshot:
+            return f"s{snapshot['input_hash'][:16]}", snapshot
+    rollup = await db.user_rollups.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    return f"r{rollup.get('version', 0) if rollup else 0}", None
+
+def export_path(user_id: str, request: ReportExportRequest, data_version: str) -> Path:
+    options = [EXPORT_LAYOUT_VERSION, request.format, request.date_from, request.date_to]
+    key = hashlib.sha256(orjson.dumps(options)).hexdigest()[:16]
+    return EXPORT_DIR / user_id / request.report / f"{data_version}-{key}.{request.format}"
+
+def prune_exports(path: Path):
+    """Delete the report's files built from other data versions; they can't be served again.
+
+    Call only while ``path``'s version is still current, or a slow build for an
+    older version would delete the newer file.
+    """
+    current = path.name.split('-', 1)[0] + '-'
+    for old in path.parent.iterdir():
+        if old.name.startswith(('.', current)) or old.name.endswith('.partial'):
+            continue
+        old.unlink(missing_ok=True)
+
+def export_row(transaction: dict) -> list:
+    out = transaction_out(transaction)
+    return [str(out.get('date')), out.get('type'), out.get('category') or '', out.get('description') or '', out['amount']]
+
+async def spool_transactions(user_id: str, filters: dict, spool_path: Optional[Path]) -> dict:
+    """Summary of the user's transactions in range, writing each row to ``spool_path`` if given"""
+    groups = {}
+    batch = []
+    spool = open(spool_path, 'wb') if spool_path else None
+    try:
+        async for transaction in transaction_store.iterate(user_id, **filters):
+            key = (transaction.get('type'), transaction.get('category'), transaction_month(transaction.get('date')))
+            group = groups.setdefault(key, [0, 0])
+            group[0] += transaction_paise(transaction)
+            group[1] += 1
+            if spool:
+                batch.append(orjson.dumps(export_row(transaction)))
+                if len(batch) >= EXPORT_SPOOL_BATCH_SIZE:
+                    spool.write(b"\n".join(batch) + b"\n")
+                    batch.clear()
+        if spool and batch:
+            spool.write(b"\n".join(batch) + b"\n")
+    finally:
+        if spool:
+            spool.close()
+    return summary_from_rollup(rollup_from_groups(user_id, [
+        {"_id": {"type": tx_type, "category": category, "month": month}, "total": total, "count": count}
+        for (tx_type, category, month), (total, count) in groups.items()
+    ]))
+
+def amount_rows(amounts: dict) -> List[list]:
+    return [[label, round(value, 2)] for label, value in sorted(amounts.items(), key=lambda item: -item[1])]
+
+def export_statement(request: ReportExportRequest, summary: Optional[dict], snapshot: Optional[dict]) -> dict:
+    """Title and summary sections for report_exports.render"""
+    period = f"{request.date_from or 'First transaction'} to {request.date_to or 'latest'}"
+    if request.report == ExportReport.pl.value:
+        pl = build_pl_statement(summary)
+        return {
+            "title": "Profit & Loss Statement",
+            "period": period,
+            "transactions": True,
+            "sections": [
+                {"heading": "Summary", "columns": ["", "Amount"], "rows": [
+                    ["Total income", round(pl.total_income, 2)],
+                    ["Total expenses", round(pl.total_expenses, 2)],
+                    ["Net profit/loss", round(pl.net_profit_loss, 2)]
+                ]},
+                {"heading": "Income by category", "columns": ["Category", "Amount"],
+                 "rows": amount_rows(pl.income_by_category)},
+                {"heading": "Expenses by category", "columns": ["Category", "Amount"],
+                 "rows": amount_rows(pl.expenses_by_category)},
+                {"heading": "Monthly", "columns": ["Month", "Income", "Expenses", "Net"], "rows": [
+                    [point['month'], round(point['income'], 2), round(point['expenses'], 2), round(point['net'], 2)]
+                    for point in pl.monthly_trend
+                ]}
+            ]
+        }
+    sheet = build_balance_sheet(summary, snapshot)
+    return {
+        "title": "Balance Sheet",
+        "period": f"From the financial questionnaire, {snapshot['computed_at'][:10]}" if snapshot else period,
+        "transactions": False,
+        "sections": [
+            {"heading": "Summary", "columns": ["", "Amount"], "rows": [
+                ["Total assets", round(sheet.total_assets, 2)],
+                ["Total liabilities", round(sheet.total_liabilities, 2)],
+                ["Net worth", round(sheet.net_worth, 2)]
+            ]},
+            {"heading": "Assets", "columns": ["", "Amount"], "rows": amount_rows(sheet.assets_breakdown)},
+            {"heading": "Liabilities", "columns": ["", "Amount"], "rows": amount_rows(sheet.liabilities_breakdown)}
+        ]
+    }
+
+async def build_report_export(
+    user_id: str, request: ReportExportRequest, path: Path, data_version: str, snapshot: Optional[dict]
+):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A questionnaire balance sheet doesn't read the ledger at all
+    summary = None
+    spool_path = path.parent / f".{uuid.uuid4().hex}.rows" if request.report == ExportReport.pl.value else None
+    try:
+        if snapshot is None:
+            with span('export.spool'):
+                filters = transaction_filters(date_from=request.date_from, date_to=request.date_to)
+                summary = await spool_transactions(user_id, filters, spool_path)
+        statement = export_statement(request, summary, snapshot)
+        with span('export.render', format=request.format):
+            await asyncio.get_running_loop().run_in_executor(
+                export_executor, report_exports.render,
+                statement, str(spool_path) if spool_path else None, str(path), request.format
+            )
+    finally:
+        if spool_path:
+            spool_path.unlink(missing_ok=True)
+    # The data may have changed while this rendered; then a newer file may exist
+    current_version, _ = await report_data_version(user_id, request.report)
+    if current_version == data_version:
+        prune_exports(path)
+
+async def get_report_export(user_id: str, request: ReportExportRequest) -> tuple:
+    """``(path, cache status)``; identical concurrent requests share one build"""
+    data_version, snapshot = await report_data_version(user_id, request.report)
+    path = export_path(user_id, request, data_version)
+    if path.exists():
+        export_stats['hits'] += 1
+        return path, 'hit'
+    job = export_jobs.get(path)
+    if job is not None:
+        export_stats['coalesced'] += 1
+        await asyncio.shield(job)
+        return path, 'coalesced'
+    export_stats['misses'] += 1
+    # Shielded so a client disconnect doesn't abandon the build for everyone waiting on it
+    job = export_jobs[path] = asyncio.ensure_future(
+        build_report_export(user_id, request, path, data_version, snapshot)
+    )
+    job.add_done_callback(lambda _: export_jobs.pop(path, None))
+    await asyncio.shield(job)
+    return path, 'miss'
 
 # ============= Auth Routes =============
 
@@ -322,7 +1971,7 @@ async def register(user_data: UserCreate):
         "id": user_id,
         "client_id": client_id,
         "email": user_data.email,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await hash_password_async(user_data.password),
         "name": user_data.name,
         "mobile_number": user_data.mobile_number,
         "age": user_data.age,
@@ -340,298 +1989,683 @@ async def register(user_data: UserCreate):
     # Create token
     token = create_token(user_id)
     
-    user_response = UserResponse(
-        id=user_id,
-        client_id=client_id,
-        email=user_data.email,
-        name=user_data.name,
-        mobile_number=user_data.mobile_number,
-        age=user_data.age,
-        city=user_data.city,
-        marital_status=user_data.marital_status,
-        no_of_dependents=user_data.no_of_dependents,
-        monthly_income=user_data.monthly_income,
-        created_at=user_doc['created_at'],
-        networth=0
-    )
-    
-    return AuthResponse(token=token, user=user_response)
+    return ORJSONResponse({"token": token, "user": to_response(UserResponse, user_doc)})
 
 @api_router.post("/auth/login", response_model=AuthResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
+    # Before the lookup so throttled attempts cost neither a query nor a bcrypt check
+    await enforce_rate_limit('login', ip=client_ip(request), client_id=credentials.client_id)
     user = await db.users.find_one({"client_id": credentials.client_id}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user['password_hash']):
+    if not user or not await verify_password_async(credentials.password, user['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_token(user['id'])
+    user_cache.set(user['id'], {k: v for k, v in user.items() if k != 'password_hash'})
     
-    user_response = UserResponse(
-        id=user['id'],
-        client_id=user['client_id'],
-        email=user['email'],
-        name=user['name'],
-        mobile_number=user['mobile_number'],
-        age=user['age'],
-        city=user['city'],
-        marital_status=user['marital_status'],
-        no_of_dependents=user['no_of_dependents'],
-        monthly_income=user['monthly_income'],
-        created_at=user['created_at'],
-        networth=user.get('networth', 0)
-    )
-    
-    return AuthResponse(token=token, user=user_response)
+    return ORJSONResponse({"token": token, "user": to_response(UserResponse, user)})
 
 @api_router.get("/auth/me", response_model=UserResponse)
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return UserResponse(
-        id=user['id'],
-        client_id=user['client_id'],
-        email=user['email'],
-        name=user['name'],
-        mobile_number=user['mobile_number'],
-        age=user['age'],
-        city=user['city'],
-        marital_status=user['marital_status'],
-        no_of_dependents=user['no_of_dependents'],
-        monthly_income=user['monthly_income'],
-        created_at=user['created_at'],
-        networth=user.get('networth', 0)
-    )
+async def get_current_user(user: dict = Depends(get_authenticated_user)):
+    return ORJSONResponse(to_response(UserResponse, user))
 
 # ============= Transaction Routes =============
 
 @api_router.post("/transactions", response_model=Transaction)
-async def create_transaction(transaction_data: TransactionCreate, credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
-    
+async def create_transaction(transaction_data: TransactionCreate, user_id: str = Depends(get_current_user_id)):
     transaction_id = str(uuid.uuid4())
+    category = initial_category(transaction_data)
+    auto_category = category is None
     transaction_doc = {
         "id": transaction_id,
         "user_id": user_id,
-        "amount": transaction_data.amount,
-        "type": transaction_data.type,
-        "category": transaction_data.category,
-        "description": transaction_data.description,
-        "date": transaction_data.date,
+        **stored_transaction_fields(transaction_data),
+        "category": PENDING_CATEGORY if auto_category else category,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
+    if auto_category:
+        transaction_doc["category_pending"] = True
+    
+    await transaction_store.insert_one(transaction_doc)
+    await apply_transaction_to_rollup(user_id, transaction_doc)
+    if auto_category:
+        categorization_queue.enqueue(transaction_out(transaction_doc))
+    
+    return ORJSONResponse(to_response(Transaction, transaction_out(transaction_doc)))
+
+@api_router.post("/transactions/bulk", response_model=BulkImportResponse)
+async def bulk_import_transactions(request: Request, user_id: str = Depends(get_current_user_id)):
+    """Import many transactions from a JSON array, NDJSON, or a CSV/OFX statement.
+
+    Rows are validated as they are read and written with unordered
+    ``insert_many`` in chunks. Rows already imported (same content hash) are
+    reported as duplicates.
+    """
+    report = {"received": 0, "inserted": 0, "duplicates": 0, "failed": 0, "errors": []}
+    seen = Counter()
+    created_at = datetime.now(timezone.utc).isoformat()
+    docs, row_numbers = [], []
+    
+    async for row_number, row in iter_import_rows(request):
+        report['received'] += 1
+        if report['received'] > BULK_IMPORT_MAX_ROWS:
+            record_import_error(report, row_number, f"import limited to {BULK_IMPORT_MAX_ROWS} rows")
+            break
+        if isinstance(row, RowError):
+            record_import_error(report, row_number, row.message)
+            continue
+        if not isinstance(row, dict):
+            record_import_error(report, row_number, f"row {row_number}: expected an object")
+            continue
+        try:
+            transaction = TransactionCreate(**row)
+            fields = stored_transaction_fields(transaction)
+        except ValidationError as e:
+            record_import_error(report, row_number, "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+            continue
+        except (ValueError, TypeError) as e:
+            record_import_error(report, row_number, str(e))
+            continue
+        
+        base_hash = import_content_hash(user_id, transaction, 0)
+        seen[base_hash] += 1
+        doc = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            **fields,
+            "content_hash": import_content_hash(user_id, transaction, seen[base_hash] - 1),
+            "created_at": created_at
+        }
+        category = initial_category(transaction)
+        if category is None:
+            doc["category"] = PENDING_CATEGORY
+            doc["category_pending"] = True
+        else:
+            doc["category"] = category
+        docs.append(doc)
+        row_numbers.append(row_number)
+        
+        if len(docs) >= BULK_IMPORT_CHUNK_SIZE:
+            await insert_import_chunk(user_id, docs, row_numbers, report)
+            docs, row_numbers = [], []
     
-    await db.transactions.insert_one(transaction_doc)
+    if docs:
+        await insert_import_chunk(user_id, docs, row_numbers, report)
     
-    return Transaction(**transaction_doc)
+    return BulkImportResponse(**report)
 
 @api_router.get("/transactions", response_model=List[Transaction])
-async def get_transactions(credentials: HTTPAuthorizationCredentials = Depends(security), limit: int = 100):
-    user_id = await verify_token(credentials)
+async def get_transactions(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    format: Optional[str] = None
+):
+    """List transactions newest first.
+
+    Pages are keyset-based: pass the ``X-Next-Cursor`` response header back as
+    ``cursor`` to fetch the next page. ``format=ndjson`` (or an
+    ``application/x-ndjson`` Accept header) streams every matching row instead;
+    ``limit`` caps the stream only when given (0 also means no limit).
+    """
+    filters = transaction_filters(cursor, date_from, date_to, type, category)
     
-    transactions = await db.transactions.find(
-        {"user_id": user_id},
-        {"_id": 0}
-    ).sort("date", -1).limit(limit).to_list(limit)
+    if format == 'ndjson' or 'application/x-ndjson' in request.headers.get('accept', ''):
+        return StreamingResponse(
+            stream_transactions_ndjson(user_id, filters, max(limit or 0, 0)),
+            media_type='application/x-ndjson'
+        )
+    
+    if limit is None:
+        limit = TRANSACTIONS_DEFAULT_PAGE_SIZE
+    limit = min(max(limit, 1), TRANSACTIONS_MAX_PAGE_SIZE)
+    transactions = await transaction_store.find(user_id, limit + 1, **filters)
     
-    return [Transaction(**t) for t in transactions]
+    headers = {}
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(transactions[-1])
+    
+    with span('response.build', rows=len(transactions)):
+        return ORJSONResponse(
+            content=[to_response(Transaction, transaction_out(t)) for t in transactions],
+            headers=headers
+        )
 
 @api_router.delete("/transactions/{transaction_id}")
-async def delete_transaction(transaction_id: str, credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
-    
-    result = await db.transactions.delete_one({"id": transaction_id, "user_id": user_id})
-    if result.deleted_count == 0:
+async def delete_transaction(transaction_id: str, user_id: str = Depends(get_current_user_id)):
+    deleted = await transaction_store.delete(user_id, transaction_id)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    await apply_transaction_to_rollup(user_id, deleted, sign=-1)
+    
     return {"message": "Transaction deleted"}
 
 # ============= AI Routes =============
 
-@api_router.post("/ai/categorize", response_model=CategorizeExpenseResponse)
-async def categorize_expense(request: CategorizeExpenseRequest, credentials: HTTPAuthorizationCredentials = Depends(security)):
-    await verify_token(credentials)
-    
+@api_router.post(
+    "/ai/categorize", response_model=CategorizeExpenseResponse, dependencies=[Depends(rate_limited('ai_categorize'))]
+)
+async def categorize_expense(request: CategorizeExpenseRequest, user_id: str = Depends(get_current_user_id)):
     result = await categorize_with_ai(request.description, request.amount)
     return CategorizeExpenseResponse(**result)
 
+@api_router.post(
+    "/ai/categorize/batch", response_model=CategorizeBatchResponse,
+    dependencies=[Depends(rate_limited('ai_categorize_batch'))]
+)
+async def categorize_expenses_batch(request: CategorizeBatchRequest, user_id: str = Depends(get_current_user_id)):
+    if len(request.items) > CATEGORIZE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {CATEGORIZE_MAX_ITEMS} items per request")
+    
+    results = await categorize_many_with_ai([(item.description, item.amount) for item in request.items])
+    return CategorizeBatchResponse(results=[CategorizeExpenseResponse(**r) for r in results])
+
 # ============= Questionnaire Routes =============
 
+def questionnaire_etag(version: int) -> str:
+    return f'"{version}"'
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    tag = value.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a questionnaire version ETag")
+
+def version_filter(user_id: str, version: int) -> dict:
+    # Questionnaires saved before versioning have no field; treat them as version 0
+    return {"user_id": user_id, "version": version if version else {"$in": [0, None]}}
+
+def parse_questionnaire_fields(fields: str) -> List[str]:
+    selected = []
+    for name in (f.strip() for f in fields.split(',')):
+        if not name:
+            continue
+        if name in QUESTIONNAIRE_SECTIONS:
+            selected.extend(QUESTIONNAIRE_SECTIONS[name])
+        elif name in QUESTIONNAIRE_FIELDS or name == 'completed_at':
+            selected.append(name)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown questionnaire field or section: {name}")
+    return selected
+
 @api_router.post("/questionnaire", response_model=QuestionnaireResponse)
-async def submit_questionnaire(questionnaire: FinancialQuestionnaire, credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
-    
-    questionnaire_data = questionnaire.dict()
+async def submit_questionnaire(questionnaire: FinancialQuestionnaire, user_id: str = Depends(get_current_user_id)):
+    questionnaire_data = questionnaire.model_dump(exclude={'version'})
     questionnaire_data['user_id'] = user_id
     questionnaire_data['completed_at'] = datetime.now(timezone.utc).isoformat()
     
     # Update or insert questionnaire
-    await db.questionnaires.update_one(
+    saved = await db.questionnaires.find_one_and_update(
         {"user_id": user_id},
-        {"$set": questionnaire_data},
-        upsert=True
+        {"$set": questionnaire_data, "$inc": {"version": 1}},
+        projection={"_id": 0, "version": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    questionnaire_data['version'] = questionnaire.version = saved['version']
+    await refresh_financial_snapshot(user_id, questionnaire_data)
     
     return QuestionnaireResponse(
         message="Questionnaire saved successfully",
         questionnaire=questionnaire
     )
 
-@api_router.get("/questionnaire", response_model=FinancialQuestionnaire)
-async def get_questionnaire(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
+@api_router.patch("/questionnaire", response_model=FinancialQuestionnaire)
+async def patch_questionnaire(
+    request: Request,
+    response: Response,
+    section: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Apply a JSON merge patch (RFC 7396) to the saved questionnaire.
+
+    Only the patched fields are written. ``null`` resets a field to its default
+    and lists are replaced whole. ``section`` restricts the patch to one wizard
+    section. The expected version comes from ``If-Match`` (or a ``version`` key
+    in the body); a stale version gets 409. The derived snapshot is only
+    recomputed when a field it depends on changed.
+    """
+    try:
+        patch = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+    if not isinstance(patch, dict):
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
     
-    questionnaire = await db.questionnaires.find_one({"user_id": user_id}, {"_id": 0})
+    body_version = patch.pop('version', None)
+    expected_version = parse_if_match(request.headers.get('if-match'))
+    if expected_version is None:
+        expected_version = body_version
+    if not isinstance(expected_version, int):
+        raise HTTPException(status_code=428, detail="Send If-Match with the questionnaire version")
+    
+    if section is not None and section not in QUESTIONNAIRE_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown questionnaire section: {section}")
+    allowed = set(QUESTIONNAIRE_SECTIONS[section]) if section else QUESTIONNAIRE_FIELDS
+    unknown = set(patch) - allowed
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Fields not patchable here: {', '.join(sorted(unknown))}")
+    
+    current = await db.questionnaires.find_one({"user_id": user_id}, {"_id": 0})
+    if not current:
+        raise HTTPException(status_code=404, detail="Questionnaire not found")
+    current_version = current.get('version', 0)
+    if current_version != expected_version:
+        raise HTTPException(status_code=409, detail=f"Questionnaire was modified (current version {current_version})")
+    
+    defaults = FinancialQuestionnaire().model_dump()
+    merged = {**current, **{k: defaults[k] if v is None else v for k, v in patch.items()}}
+    try:
+        validated = FinancialQuestionnaire(**merged).model_dump()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=jsonable_encoder(e.errors(include_url=False)))
+    
+    changes = {k: validated[k] for k in patch if validated[k] != current.get(k, defaults[k])}
+    if changes:
+        result = await db.questionnaires.update_one(
+            version_filter(user_id, expected_version),
+            {"$set": {**changes, "updated_at": datetime.now(timezone.utc).isoformat()}, "$inc": {"version": 1}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=409, detail="Questionnaire was modified concurrently")
+        validated['version'] = current_version + 1
+        if changes.keys() & SNAPSHOT_INPUT_FIELDS:
+            await refresh_financial_snapshot(user_id, validated)
+    
+    response.headers["ETag"] = questionnaire_etag(validated['version'])
+    return FinancialQuestionnaire(**validated)
+
+@api_router.get("/questionnaire", response_model=FinancialQuestionnaire)
+async def get_questionnaire(response: Response, fields: Optional[str] = None, user_id: str = Depends(get_current_user_id)):
+    """The saved questionnaire; ``fields`` takes section and/or field names"""
+    projection = {"_id": 0}
+    if fields:
+        projection.update({name: 1 for name in parse_questionnaire_fields(fields)})
+        projection["version"] = 1
+    questionnaire = await db.questionnaires.find_one({"user_id": user_id}, projection)
     
     if not questionnaire:
         raise HTTPException(status_code=404, detail="Questionnaire not found")
     
+    etag = questionnaire_etag(questionnaire.get('version', 0))
+    if fields:
+        # Return just the projected keys rather than padding with model defaults
+        questionnaire.setdefault('version', 0)
+        return ORJSONResponse(content=questionnaire, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return FinancialQuestionnaire(**questionnaire)
 
 @api_router.delete("/questionnaire")
-async def reset_questionnaire(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def reset_questionnaire(user_id: str = Depends(get_current_user_id)):
     """Reset/delete user's questionnaire data"""
-    user_id = await verify_token(credentials)
-    
     result = await db.questionnaires.delete_one({"user_id": user_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="No questionnaire found to reset")
+    await clear_financial_snapshot(user_id)
     
     return {"message": "Financial data reset successfully"}
 
-# ============= Reports Routes =============
+# ============= Planning Routes =============
 
-@api_router.get("/reports/health-score", response_model=FinancialHealthScore)
-async def get_health_score(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
-    
-    # Get user's monthly income
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    monthly_income = user.get('monthly_income', 0)
-    
-    # Get all transactions
-    transactions = await db.transactions.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
-    
-    total_income = sum(t['amount'] for t in transactions if t['type'] == 'income')
-    total_expenses = sum(t['amount'] for t in transactions if t['type'] == 'expense')
-    net_savings = total_income - total_expenses
-    
-    # Calculate ratios
-    savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
-    expense_to_income_ratio = (total_expenses / total_income) if total_income > 0 else 0
-    
-    # Calculate score (0-100)
-    score = 50
-    if savings_rate >= 20:
-        score += 30
-    elif savings_rate >= 10:
-        score += 15
-    
-    if expense_to_income_ratio <= 0.5:
-        score += 20
-    elif expense_to_income_ratio <= 0.7:
-        score += 10
-    
-    score = min(100, max(0, score))
-    
-    # Generate insights
-    insights = []
-    if savings_rate < 10:
-        insights.append("Consider reducing expenses to improve your savings rate")
-    elif savings_rate >= 20:
-        insights.append("Excellent savings rate! You're on track for financial health")
-    
-    if expense_to_income_ratio > 0.8:
-        insights.append("Your expenses are high relative to income. Review unnecessary spending")
-    elif expense_to_income_ratio <= 0.5:
-        insights.append("Great job keeping expenses low!")
-    
-    if len(transactions) < 5:
-        insights.append("Add more transactions to get better insights")
+PLANNING_MAX_YEARS = int(os.environ.get('PLANNING_MAX_YEARS', '40'))
+
+@api_router.get("/planning", response_model=PlanningReport)
+async def get_planning_report(
+    years: int = 10,
+    income_growth: Optional[float] = None,
+    inflation: Optional[float] = None,
+    expected_return: Optional[float] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Loan schedules, deposit yields and a year-by-year net-worth projection"""
+    if not 1 <= years <= PLANNING_MAX_YEARS:
+        raise HTTPException(status_code=400, detail=f"years must be between 1 and {PLANNING_MAX_YEARS}")
+    questionnaire = await db.questionnaires.find_one({"user_id": user_id}, {"_id": 0})
+    if not questionnaire:
+        raise HTTPException(status_code=404, detail="Questionnaire not found")
     
-    return FinancialHealthScore(
-        score=int(score),
-        total_income=total_income,
-        total_expenses=total_expenses,
-        net_savings=net_savings,
-        savings_rate=round(savings_rate, 2),
-        expense_to_income_ratio=round(expense_to_income_ratio, 2),
-        insights=insights
+    # NumPy work is CPU-bound; keep it off the event loop
+    return await asyncio.to_thread(
+        planning.user_plan, questionnaire, years,
+        income_growth=income_growth, inflation=inflation, expected_return=expected_return
     )
 
+# ============= Reports Routes =============
+
+@api_router.get("/reports/health-score", response_model=FinancialHealthScore)
+async def get_health_score(user_id: str = Depends(get_current_user_id)):
+    summary, snapshot = await asyncio.gather(get_ledger_summary(user_id), get_financial_snapshot(user_id))
+    return build_health_score(summary, snapshot)
+
+def validate_trend_months(months: int):
+    if not 1 <= months <= TREND_MAX_MONTHS:
+        raise HTTPException(status_code=400, detail=f"months must be between 1 and {TREND_MAX_MONTHS}")
+
 @api_router.get("/reports/pl", response_model=PLStatement)
-async def get_pl_statement(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
+async def get_pl_statement(months: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
+    """All-time P&L, or the last ``months`` calendar months (this month included)"""
+    if months is None:
+        summary = await get_ledger_summary(user_id)
+        return build_pl_statement(summary)
+    validate_trend_months(months)
+    window = month_range(months)
+    summaries = await get_trend_summaries(user_id, window[0], window[-1])
+    return build_pl_statement(summary_from_trends(summaries))
+
+@api_router.get("/reports/trend", response_model=TrendReport)
+async def get_trend_report(months: int = 12, window: int = 3, user_id: str = Depends(get_current_user_id)):
+    """Month-by-month income and expenses with category splits, ``window``-month
+    rolling averages and month-over-month changes, ending this month.
+    """
+    validate_trend_months(months)
+    if not 1 <= window <= TREND_MAX_WINDOW:
+        raise HTTPException(status_code=400, detail=f"window must be between 1 and {TREND_MAX_WINDOW}")
+    # Read window - 1 (at least one) earlier months so the first point has full averages and a delta
+    all_months = month_range(months + max(window - 1, 1))
+    summaries = await get_trend_summaries(user_id, all_months[0], all_months[-1])
+    return build_trend_report(all_months, summaries, months, window)
+
+@api_router.get("/reports/balance-sheet", response_model=BalanceSheet)
+async def get_balance_sheet(user_id: str = Depends(get_current_user_id)):
+    snapshot = await get_financial_snapshot(user_id)
+    summary = None if snapshot else await get_ledger_summary(user_id)
+    return build_balance_sheet(summary, snapshot)
+
+@api_router.post("/reports/export", response_class=FileResponse, dependencies=[Depends(rate_limited('report_export'))])
+async def export_report(request: ReportExportRequest, user_id: str = Depends(get_current_user_id)):
+    """P&L (with its transactions) or balance sheet for a date range as CSV, XLSX or PDF.
+
+    Served from cache while the user's data is unchanged; ``X-Export-Cache``
+    says whether this response was a hit, a miss or joined a build in progress.
+    """
+    if request.date_from and request.date_to and request.date_from > request.date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    path, cache_status = await get_report_export(user_id, request)
+    filename = f"{request.report}_{request.date_from or 'start'}_{request.date_to or 'latest'}.{request.format}"
+    return FileResponse(
+        path,
+        media_type=report_exports.FORMATS[request.format],
+        filename=filename,
+        headers={"X-Export-Cache": cache_status}
+    )
+
+# ============= Dashboard Routes =============
+
+def parse_dashboard_fields(fields: Optional[str]) -> set:
+    if not fields:
+        return set(DASHBOARD_FIELDS)
+    selected = {f.strip() for f in fields.split(',') if f.strip()}
+    unknown = selected - set(DASHBOARD_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dashboard fields: {', '.join(sorted(unknown))}")
+    return selected
+
+async def none_result():
+    return None
+
+@api_router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(request: Request, fields: Optional[str] = None, user_id: str = Depends(get_current_user_id)):
+    """User, questionnaire and all three reports in one round trip.
+
+    ``fields`` is a comma-separated subset of the response keys. The response
+    carries an ETag; a matching ``If-None-Match`` returns 304.
+    """
+    selected = parse_dashboard_fields(fields)
+    needs_summary = bool(selected & {'health_score', 'pl', 'balance_sheet'})
+    needs_snapshot = bool(selected & {'health_score', 'balance_sheet'})
     
-    transactions = await db.transactions.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
+    user, questionnaire, summary, snapshot = await asyncio.gather(
+        load_user(user_id) if 'user' in selected else none_result(),
+        db.questionnaires.find_one({"user_id": user_id}, {"_id": 0}) if 'questionnaire' in selected else none_result(),
+        get_ledger_summary(user_id) if needs_summary else none_result(),
+        get_financial_snapshot(user_id) if needs_snapshot else none_result()
+    )
     
-    total_income = 0
-    total_expenses = 0
-    income_by_category = {}
-    expenses_by_category = {}
+    if 'user' in selected and not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    for t in transactions:
-        if t['type'] == 'income':
-            total_income += t['amount']
-            category = t.get('category', 'Other')
-            income_by_category[category] = income_by_category.get(category, 0) + t['amount']
-        else:
-            total_expenses += t['amount']
-            category = t.get('category', 'Other')
-            expenses_by_category[category] = expenses_by_category.get(category, 0) + t['amount']
+    with span('response.build'):
+        dashboard = {}
+        if 'user' in selected:
+            dashboard['user'] = to_response(UserResponse, user)
+        if 'questionnaire' in selected:
+            dashboard['questionnaire'] = FinancialQuestionnaire(**questionnaire).model_dump() if questionnaire else None
+        if 'health_score' in selected:
+            dashboard['health_score'] = build_health_score(summary, snapshot).model_dump()
+        if 'pl' in selected:
+            dashboard['pl'] = build_pl_statement(summary).model_dump()
+        if 'balance_sheet' in selected:
+            dashboard['balance_sheet'] = build_balance_sheet(summary, snapshot).model_dump()
+        
+        # Serialize once: the same bytes are hashed for the ETag and sent
+        body = orjson.dumps(dashboard, option=orjson.OPT_SORT_KEYS)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
     
-    net_profit_loss = total_income - total_expenses
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return PLStatement(
-        total_income=total_income,
-        total_expenses=total_expenses,
-        net_profit_loss=net_profit_loss,
-        income_by_category=income_by_category,
-        expenses_by_category=expenses_by_category,
-        monthly_trend=[]
-    )
+    return Response(content=body, media_type="application/json", headers=headers)
 
-@api_router.get("/reports/balance-sheet", response_model=BalanceSheet)
-async def get_balance_sheet(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    user_id = await verify_token(credentials)
-    
-    transactions = await db.transactions.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
+# ============= Admin Routes =============
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+def profiling_forced(scope: dict) -> bool:
+    if not ADMIN_TOKEN:
+        return False
+    for name, value in scope['headers']:
+        if name == b'x-profile':
+            return hmac.compare_digest(value, ADMIN_TOKEN.encode())
+    return False
+
+@api_router.get("/admin/slow-requests")
+async def get_slow_requests(
+    limit: int = 20,
+    min_duration_ms: float = 0,
+    path: Optional[str] = None,
+    _: None = Depends(require_admin)
+):
+    """Recent traced requests, newest first, with their span trees.
+
+    ``path`` matches either the raw path or the route template.
+    """
+    limit = min(max(limit, 1), SLOW_REQUEST_BUFFER_SIZE)
+    return {
+        "threshold_ms": SLOW_REQUEST_THRESHOLD_MS,
+        "sample_rate": PROFILING_SAMPLE_RATE,
+        "capacity": SLOW_REQUEST_BUFFER_SIZE,
+        "traces": slow_request_log.recent(limit, min_duration_ms, path)
+    }
+
+@api_router.get("/admin/slow-requests/{trace_id}")
+async def get_slow_request(trace_id: str, _: None = Depends(require_admin)):
+    trace = slow_request_log.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+@api_router.get("/ai/categorization-queue")
+async def get_categorization_queue_stats(_: None = Depends(require_admin)):
+    """Depth, batch size and lag of the background categorization worker"""
+    return categorization_queue.snapshot()
+
+@api_router.get("/cache-stats")
+async def get_cache_stats(_: None = Depends(require_admin)):
+    """Hit/miss counters for the in-process caches, for sizing them"""
+    return {
+        "users": user_cache.stats(),
+        "categories": {"size": len(categorizer.memory_cache), **categorizer.stats}
+    }
+
+# ============= Metrics =============
+#
+# Hot-path metrics (requests, Mongo commands, model calls, loop lag) are
+# recorded as they happen; cache and queue figures are read from the existing
+# stats dicts only when /metrics is scraped.
+
+CATEGORY_RESOLVED_SOURCES = ('memory', 'keyword', 'persistent')
+CATEGORY_LOOKUP_SOURCES = CATEGORY_RESOLVED_SOURCES + ('llm', 'failed', 'short_circuited', 'coalesced')
+
+def category_hit_ratio() -> float:
+    stats = categorizer.stats
+    resolved = sum(stats[source] for source in CATEGORY_RESOLVED_SOURCES)
+    lookups = resolved + stats['llm'] + stats['failed'] + stats['short_circuited']
+    return resolved / lookups if lookups else 0.0
+
+metrics_registry.counter(
+    'cache_lookups_total', 'Authenticated-user cache lookups', ('cache', 'result'),
+    callback=lambda: {('users', 'hit'): user_cache.hits, ('users', 'miss'): user_cache.misses}
+)
+metrics_registry.gauge(
+    'cache_hit_ratio', 'Share of lookups answered from cache (categories: without a model call)', ('cache',),
+    callback=lambda: {
+        ('users',): user_cache.stats()['hit_rate'],
+        ('categories',): category_hit_ratio()
+    }
+)
+metrics_registry.gauge(
+    'cache_entries', 'Entries held by in-process caches', ('cache',),
+    callback=lambda: {('users',): len(user_cache.entries), ('categories',): len(categorizer.memory_cache)}
+)
+metrics_registry.counter(
+    'categorization_lookups_total', 'Category lookups by where they were resolved', ('source',),
+    callback=lambda: {(source,): categorizer.stats[source] for source in CATEGORY_LOOKUP_SOURCES}
+)
+metrics_registry.counter(
+    'llm_calls_total', 'Categorization model calls started', callback=lambda: categorizer.stats['llm_calls']
+)
+metrics_registry.gauge(
+    'categorization_queue_depth', 'Transactions waiting for background categorization',
+    callback=lambda: categorization_queue.depth
+)
+metrics_registry.gauge(
+    'categorization_queue_max_lag_seconds', 'Longest enqueue-to-categorized delay seen',
+    callback=lambda: categorization_queue.stats['max_lag_seconds']
+)
+metrics_registry.gauge(
+    'event_loop_lag_max_seconds', 'Largest event loop lag seen since start',
+    callback=lambda: event_loop_monitor.max_lag
+)
+metrics_registry.counter(
+    'report_exports_total', 'Report export requests by cache outcome', ('cache',),
+    callback=lambda: {(outcome,): count for outcome, count in export_stats.items()}
+)
+metrics_registry.counter(
+    'rate_limited_total', 'Requests rejected by a rate limit', ('route', 'scope'),
+    callback=lambda: dict(rate_limiter.rejected)
+)
+metrics_registry.gauge(
+    'mongo_pool_connections', 'MongoDB pool connections per server', ('address', 'state'),
+    callback=lambda: {
+        (address, state): pool[state]
+        for address, pool in mongo_pool_stats.snapshot().items()
+        for state in ('open', 'in_use', 'waiting', 'max_size')
+    }
+)
+metrics_registry.counter(
+    'mongo_pool_checkout_timeouts_total', 'Connection checkouts that timed out waiting for the pool', ('address',),
+    callback=lambda: {
+        (address,): pool['checkout_timeouts'] for address, pool in mongo_pool_stats.snapshot().items()
+    }
+)
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+# ============= Health Probes =============
+#
+# /healthz is liveness: it only proves the event loop is serving requests, so
+# a Mongo outage doesn't get every worker restarted. /readyz is readiness: it
+# takes the worker out of rotation while Mongo is unreachable or the pool has
+# no free connection.
+
+# Checkout timeouts seen by the previous /readyz call, per pool address
+ready_checkout_timeouts = {}
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    return {"status": "ok", "event_loop_lag_seconds": round(event_loop_monitor.last_lag, 4)}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    problems = []
+    ping_ms = None
     
-    total_assets = sum(t['amount'] for t in transactions if t['type'] == 'income')
-    total_liabilities = sum(t['amount'] for t in transactions if t['type'] == 'expense')
-    net_worth = total_assets - total_liabilities
+    if db is None:
+        problems.append("database not opened")
+    else:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), READY_PING_TIMEOUT_SECONDS)
+            ping_ms = round((time.perf_counter() - started) * 1000, 3)
+        except Exception as exc:
+            problems.append(f"mongo ping failed: {type(exc).__name__}")
     
-    assets_breakdown = {'Cash': total_assets}
-    liabilities_breakdown = {'Expenses': total_liabilities}
+    pools = mongo_pool_stats.snapshot()
+    for address, pool in pools.items():
+        if pool["waiting"] > 0 and pool["in_use"] >= pool["max_size"] * READY_MAX_POOL_SATURATION:
+            problems.append(f"connection pool exhausted: {address}")
+        if pool["checkout_timeouts"] > ready_checkout_timeouts.get(address, 0):
+            problems.append(f"connection checkouts timed out: {address}")
+        ready_checkout_timeouts[address] = pool["checkout_timeouts"]
     
-    return BalanceSheet(
-        total_assets=total_assets,
-        total_liabilities=total_liabilities,
-        net_worth=net_worth,
-        assets_breakdown=assets_breakdown,
-        liabilities_breakdown=liabilities_breakdown
-    )
+    body = {
+        "status": "unavailable" if problems else "ready",
+        "ping_ms": ping_ms,
+        "pools": pools,
+        **({"problems": problems} if problems else {})
+    }
+    return ORJSONResponse(body, status_code=503 if problems else 200)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Inside CORS so browsers can read the 429
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, exclude=("/metrics", "/healthz", "/readyz"))
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Trace-Id", "Retry-After", "X-Export-Cache", "Content-Disposition"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+if ADMIN_TOKEN or PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        log=slow_request_log,
+        force=profiling_forced,
+        sample_rate=PROFILING_SAMPLE_RATE,
+        threshold_ms=SLOW_REQUEST_THRESHOLD_MS
+    )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+if METRICS_ENABLED:
+    # Added last so it is outermost and times CORS handling too
+    app.add_middleware(
+        RequestMetricsMiddleware,
+        duration=http_request_duration,
+        in_flight=http_requests_in_flight,
+        exclude=("/metrics", "/healthz", "/readyz")
+    )
@@ -0,0 +1,184 @@
+"""Parsers that turn bank statement exports into transaction rows.
+
+Every parser yields ``(row_number, row)`` pairs where ``row`` is a dict with the
+``TransactionCreate`` fields (``category`` is None when the statement has none,
+leaving it to background categorization), or a ``RowError`` for lines that
+could not be read. Nothing here touches the database.
+"""
+import csv
+import re
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+DATE_FORMATS = (
+    '%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y',
+    '%d-%b-%Y', '%d %b %Y', '%d-%b-%y', '%d %b %y', '%Y%m%d', '%Y/%m/%d'
+)
+
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'txn date', 'tran date', 'value date', 'posting date'),
+    'description': ('description', 'narration', 'particulars', 'details', 'remarks', 'memo', 'name'),
+    'amount': ('amount', 'transaction amount', 'amount (inr)', 'amount(inr)'),
+    'debit': ('debit', 'withdrawal', 'withdrawals', 'withdrawal amt.', 'withdrawal amount', 'debit amount', 'dr'),
+    'credit': ('credit', 'deposit', 'deposits', 'deposit amt.', 'deposit amount', 'credit amount', 'cr'),
+    'type': ('type', 'dr/cr', 'cr/dr'),
+    'category': ('category',),
+}
+
+OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))', re.S | re.I)
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+class RowError(NamedTuple):
+    """A row that could not be read; kept apart from row values, which may be any JSON"""
+    message: str
+
+
+Row = Tuple[int, Union[dict, RowError]]
+
+
+def normalize_date(value: str) -> str:
+    """Parse a statement date into ``YYYY-MM-DD``; raises ValueError"""
+    value = value.strip()
+    if not value:
+        raise ValueError("missing date")
+    try:
+        return datetime.fromisoformat(value).date().isoformat()
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date '{value}'")
+
+
+def parse_amount(value) -> float:
+    """Parse '1,234.50', '₹ 99', 'Rs. 10', '(250.00)' or '-250' into a float"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    negative = text.startswith('(') and text.endswith(')')
+    text = re.sub(r'(?i)^(inr|rs\.?)|[₹,\s()]', '', text)
+    if not text:
+        raise ValueError("missing amount")
+    amount = float(text)
+    return -amount if negative else amount
+
+
+def resolve_columns(header: Iterable[str]) -> dict:
+    """Map our field names to column indexes for a CSV header row"""
+    normalized = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for index, name in enumerate(normalized):
+            if name in aliases:
+                columns[field] = index
+                break
+    if 'date' not in columns:
+        raise ValueError("CSV header has no date column")
+    if not ({'amount'} <= columns.keys() or columns.keys() & {'debit', 'credit'}):
+        raise ValueError("CSV header has no amount or debit/credit columns")
+    return columns
+
+
+def row_from_csv(values: list, columns: dict) -> dict:
+    def cell(field):
+        index = columns.get(field)
+        return values[index].strip() if index is not None and index < len(values) else ''
+
+    explicit_type = cell('type').lower()
+    debit, credit = cell('debit'), cell('credit')
+    if debit or credit:
+        debit_amount = parse_amount(debit) if debit else 0
+        credit_amount = parse_amount(credit) if credit else 0
+        if credit_amount:
+            amount, tx_type = credit_amount, 'income'
+        else:
+            amount, tx_type = debit_amount, 'expense'
+    else:
+        amount = parse_amount(cell('amount'))
+        tx_type = 'expense' if amount < 0 else 'income'
+
+    if explicit_type in ('income', 'credit', 'cr'):
+        tx_type = 'income'
+    elif explicit_type in ('expense', 'debit', 'dr'):
+        tx_type = 'expense'
+
+    return {
+        "amount": abs(amount),
+        "type": tx_type,
+        "category": cell('category') or None,
+        "description": cell('description'),
+        "date": normalize_date(cell('date')),
+    }
+
+
+class CsvStatementReader:
+    """Incremental bank statement CSV parser, fed one line at a time.
+
+    Preamble lines before the header (account details many banks prepend) are
+    skipped until a line with recognisable date and amount columns appears.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.line_number = 0
+
+    def feed(self, line: str) -> Optional[Row]:
+        self.line_number += 1
+        values = next(csv.reader([line]), [])
+        if not any(v.strip() for v in values):
+            return None
+        if self.columns is None:
+            try:
+                self.columns = resolve_columns(values)
+            except ValueError:
+                pass
+            return None
+        try:
+            return self.line_number, row_from_csv(values, self.columns)
+        except (ValueError, IndexError) as e:
+            return self.line_number, RowError(str(e))
+
+    def finish(self) -> Optional[Row]:
+        if self.columns is None:
+            return 0, RowError("no CSV header with date and amount columns found")
+        return None
+
+
+def parse_csv_lines(lines: Iterable[str]) -> Iterator[Row]:
+    reader = CsvStatementReader()
+    for line in lines:
+        row = reader.feed(line)
+        if row is not None:
+            yield row
+    row = reader.finish()
+    if row is not None:
+        yield row
+
+
+def parse_ofx(text: str) -> Iterator[Row]:
+    """Parse the <STMTTRN> blocks of an OFX/QFX statement (SGML or XML)"""
+    for number, match in enumerate(OFX_TRANSACTION.finditer(text), start=1):
+        fields = {k.upper(): v.strip() for k, v in OFX_FIELD.findall(match.group(1))}
+        try:
+            amount = parse_amount(fields.get('TRNAMT', ''))
+            posted = fields.get('DTPOSTED', '')[:8]
+            trn_type = fields.get('TRNTYPE', '').upper()
+            if trn_type in ('CREDIT', 'DEP', 'INT', 'DIV'):
+                tx_type = 'income'
+            elif trn_type in ('DEBIT', 'PAYMENT', 'POS', 'ATM', 'FEE', 'SRVCHG', 'CHECK'):
+                tx_type = 'expense'
+            else:
+                tx_type = 'expense' if amount < 0 else 'income'
+            yield number, {
+                "amount": abs(amount),
+                "type": tx_type,
+                "category": None,
+                "description": fields.get('NAME') or fields.get('MEMO', ''),
+                "date": normalize_date(posted),
+            }
+        except ValueError as e:
+            yield number, RowError(str(e))
@@ -0,0 +1,215 @@
+"""Opt-in per-request span trees, kept in memory for slow requests.
+
+``ProfilingMiddleware`` starts a root span for a request when it is forced
+(an admin asked for it with a header) or sampled. Code marks interesting
+sections with ``with span("jwt.decode"):``; while no trace is active that is
+a single ContextVar lookup, so instrumented code paths cost next to nothing
+on untraced requests. Motor runs pymongo on worker threads but copies the
+calling context, so ``TraceCommandListener`` attaches every Mongo command to
+the span that issued it.
+
+Finished traces slower than the threshold (and every forced trace) go into a
+bounded ``SlowRequestLog``; nothing is exported to an external service.
+"""
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from pymongo import monitoring
+
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: Optional[dict] = None, start: Optional[float] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.children: List[Span] = []
+
+    def finish(self, end: Optional[float] = None):
+        self.end = time.perf_counter() if end is None else end
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [child.to_dict(origin) for child in self.children]} if self.children else {})
+        }
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a child of the current span; a no-op outside traced requests"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        current_span.reset(token)
+
+
+def record_span(name: str, seconds: float, **attrs):
+    """Attach an already finished section of ``seconds`` ending now"""
+    parent = current_span.get()
+    if parent is not None:
+        end = time.perf_counter()
+        child = Span(name, attrs, start=end - seconds)
+        child.finish(end)
+        parent.children.append(child)
+
+
+def breakdown(root: Span) -> dict:
+    """Total milliseconds per span kind (the name up to the first dot)"""
+    totals = {}
+    stack = list(root.children)
+    while stack:
+        node = stack.pop()
+        kind = node.name.split(".", 1)[0]
+        totals[kind] = totals.get(kind, 0.0) + node.duration * 1000
+        stack.extend(node.children)
+    return {kind: round(ms, 3) for kind, ms in sorted(totals.items(), key=lambda item: -item[1])}
+
+
+class SlowRequestLog:
+    """Ring buffer of finished traces, newest last"""
+
+    def __init__(self, maxlen: int = 200):
+        self.traces = deque(maxlen=maxlen)
+
+    def add(self, trace: dict):
+        self.traces.append(trace)
+
+    def recent(self, limit: int, min_duration_ms: float = 0.0, path: Optional[str] = None) -> List[dict]:
+        matches = []
+        for trace in reversed(self.traces):
+            if trace["duration_ms"] < min_duration_ms:
+                continue
+            if path is not None and path not in (trace["path"], trace["route"]):
+                continue
+            matches.append(trace)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        return next((trace for trace in self.traces if trace["id"] == trace_id), None)
+
+
+class TraceCommandListener(monitoring.CommandListener):
+    """Adds a ``mongo.<command>`` span for every command issued inside a trace"""
+
+    def __init__(self):
+        self.open = {}
+
+    def started(self, event):
+        parent = current_span.get()
+        if parent is None:
+            return
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        child = Span(f"mongo.{event.command_name}", {"collection": target} if isinstance(target, str) else None)
+        parent.children.append(child)
+        self.open[(event.connection_id, event.request_id)] = child
+
+    def _finish(self, event, error: bool):
+        child = self.open.pop((event.connection_id, event.request_id), None)
+        if child is None:
+            return
+        child.finish(child.start + event.duration_micros / 1e6)
+        if error:
+            child.attrs["error"] = True
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware recording a span tree for forced or sampled requests.
+
+    ``force(scope)`` decides whether a request was explicitly asked to be
+    profiled; those are always kept and answer with an ``X-Trace-Id`` header.
+    Other requests are traced with probability ``sample_rate`` and kept only
+    when they take at least ``threshold_ms``.
+    """
+
+    def __init__(self, app, log: SlowRequestLog, force: Callable[[dict], bool],
+                 sample_rate: float = 0.0, threshold_ms: float = 500.0):
+        self.app = app
+        self.log = log
+        self.force = force
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        forced = self.force(scope)
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = uuid.uuid4().hex
+        root = Span("request")
+        started_at = datetime.now(timezone.utc)
+        status_code = 500
+        response_span = None
+
+        async def send_traced(message):
+            nonlocal status_code, response_span
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_span = Span("response.send")
+                root.children.append(response_span)
+                if forced:
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-trace-id", trace_id.encode())]}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_span.finish()
+
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            current_span.reset(token)
+            root.finish()
+            duration_ms = root.duration * 1000
+            if forced or duration_ms >= self.threshold_ms:
+                route = scope.get("route")
+                self.log.add({
+                    "id": trace_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None) or "unmatched",
+                    "status": status_code,
+                    "started_at": started_at.isoformat(),
+                    "duration_ms": round(duration_ms, 3),
+                    "sampled": "forced" if forced else "sampled",
+                    "breakdown_ms": breakdown(root),
+                    "spans": [child.to_dict(root.start) for child in root.children]
+                })
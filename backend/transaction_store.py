@@ -0,0 +1,406 @@
+"""Storage backends for transactions.
+
+``DocumentTransactionStore`` keeps one document per transaction in
+``transactions``. ``BucketTransactionStore`` packs each user's transactions
+into monthly bucket documents in ``transaction_buckets``, so listing a page or
+rebuilding a heavy user's report touches one document per month instead of
+one per row.
+
+Both expose the same coroutine API and hand back plain transaction dicts with
+``user_id`` set, so routes and rollups do not care which one is configured.
+"""
+import uuid
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+TRANSACTION_SORT = [("date", -1), ("id", -1)]
+
+
+def legacy_date(value) -> str:
+    """The ``YYYY-MM-DD`` string a row not yet backfilled stores for ``value``"""
+    return value.date().isoformat() if isinstance(value, datetime) else value
+
+
+def transaction_filter(
+    user_id: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    tx_type: Optional[str] = None,
+    category: Optional[str] = None,
+    after: Optional[tuple] = None
+) -> dict:
+    """Mongo filter for a user's transactions, newest first after ``after`` = (date, id).
+
+    Rows not yet backfilled keep a ``YYYY-MM-DD`` string date. Mongo compares
+    values of one BSON type only, so date bounds get a string twin, and since
+    strings sort below dates those rows come after every typed row. ``after``
+    holds a string date when the previous page ended on such a row.
+    """
+    query = {"user_id": user_id}
+    clauses = []
+    date_range, legacy_range = {}, {}
+    if date_from:
+        date_range["$gte"] = date_from
+        legacy_range["$gte"] = legacy_date(date_from)
+    if date_to:
+        date_range["$lte"] = date_to
+        legacy_range["$lte"] = legacy_date(date_to)
+    if date_range:
+        clauses.append({"$or": [{"date": date_range}, {"date": legacy_range}]})
+    if tx_type:
+        query["type"] = tx_type
+    if category:
+        query["category"] = category
+    if after:
+        date_value, transaction_id = after
+        page = [
+            {"date": {"$lt": date_value}},
+            {"date": date_value, "id": {"$lt": transaction_id}}
+        ]
+        if isinstance(date_value, datetime):
+            page.append({"date": {"$type": "string"}})
+        clauses.append({"$or": page})
+    if len(clauses) == 1:
+        query.update(clauses[0])
+    elif clauses:
+        query["$and"] = clauses
+    return query
+
+
+def row_datetime(value) -> datetime:
+    """A row's date as a datetime, parsing legacy strings; unparseable dates sort first"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.min
+
+
+def matches_filter(transaction: dict, date_from=None, date_to=None, tx_type=None, category=None, after=None) -> bool:
+    """Python twin of ``transaction_filter`` for rows unpacked from buckets.
+
+    Buckets are ordered in Python, so legacy string dates are parsed and sort
+    among typed rows by day rather than after them.
+    """
+    date_value = row_datetime(transaction.get('date'))
+    if date_from and not date_value >= date_from:
+        return False
+    if date_to and not date_value <= date_to:
+        return False
+    if tx_type and transaction.get('type') != tx_type:
+        return False
+    if category and transaction.get('category') != category:
+        return False
+    if after and not (date_value, transaction['id']) < (row_datetime(after[0]), after[1]):
+        return False
+    return True
+
+
+def stored_paise(paise_field: str, legacy_field: str) -> dict:
+    """Amount in paise; rows not yet backfilled only have float rupees.
+
+    Rounds like ``to_paise``: through a decimal (1234.565 is 1234.56499... as a
+    double) and half away from zero, where ``$round`` rounds half to even.
+    """
+    half_up = {"$cond": [
+        {"$gte": ["$$cents", 0]},
+        {"$floor": {"$add": ["$$cents", 0.5]}},
+        {"$ceil": {"$subtract": ["$$cents", 0.5]}}
+    ]}
+    return {"$ifNull": [
+        paise_field,
+        {"$let": {
+            "vars": {"cents": {"$multiply": [{"$toDecimal": legacy_field}, 100]}},
+            "in": {"$toLong": half_up}
+        }}
+    ]}
+
+
+def stored_date(field: str) -> dict:
+    """BSON date as-is; legacy string dates are parsed (unparseable -> null)"""
+    return {"$convert": {"input": field, "to": "date", "onError": None, "onNull": None}}
+
+
+def summary_pipeline(user_id: str) -> list:
+    """Group a user's transaction documents by type, category and calendar month"""
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": {
+                "type": "$type",
+                "category": {"$ifNull": ["$category", "Other"]},
+                "month": {"$dateTrunc": {"date": stored_date("$date"), "unit": "month"}}
+            },
+            "total": {"$sum": stored_paise("$amount_paise", "$amount")},
+            "count": {"$sum": 1}
+        }}
+    ]
+
+
+class DocumentTransactionStore:
+    """One document per transaction (the original layout)"""
+
+    def __init__(self, collection, stream_batch_size: int = 500):
+        self.collection = collection
+        self.stream_batch_size = stream_batch_size
+
+    async def insert_one(self, doc: dict):
+        await self.collection.insert_one(dict(doc))
+
+    async def insert_many(self, docs: List[dict]) -> tuple:
+        """Unordered insert; returns (inserted docs, duplicate count, [(index, error)])"""
+        failed, duplicates, errors = set(), 0, []
+        try:
+            await self.collection.insert_many([dict(doc) for doc in docs], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed.add(error['index'])
+                if error.get('code') == 11000:
+                    duplicates += 1
+                else:
+                    errors.append((error['index'], error.get('errmsg', 'write failed')))
+        inserted = [doc for index, doc in enumerate(docs) if index not in failed]
+        return inserted, duplicates, errors
+
+    async def delete(self, user_id: str, transaction_id: str) -> Optional[dict]:
+        return await self.collection.find_one_and_delete(
+            {"id": transaction_id, "user_id": user_id},
+            projection={"_id": 0}
+        )
+
+    async def find(self, user_id: str, limit: int, **filters) -> List[dict]:
+        return await self.collection.find(
+            transaction_filter(user_id, **filters), {"_id": 0}
+        ).sort(TRANSACTION_SORT).limit(limit).to_list(limit)
+
+    async def iterate(self, user_id: str, limit: Optional[int] = None, **filters):
+        cursor = self.collection.find(
+            transaction_filter(user_id, **filters), {"_id": 0}
+        ).sort(TRANSACTION_SORT).batch_size(self.stream_batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+        async for transaction in cursor:
+            yield transaction
+
+    def summary_pipeline(self, user_id: str) -> list:
+        return summary_pipeline(user_id)
+
+    async def summary_groups(self, user_id: str) -> list:
+        return await self.collection.aggregate(self.summary_pipeline(user_id)).to_list(None)
+
+    async def set_pending_category(self, transaction_id: str, category: str, confidence: str) -> Optional[dict]:
+        """Categorize a pending transaction; returns it as it was, or None if no longer pending"""
+        return await self.collection.find_one_and_update(
+            {"id": transaction_id, "category_pending": True},
+            {"$set": {"category": category, "category_confidence": confidence},
+             "$unset": {"category_pending": ""}},
+            projection={"_id": 0}
+        )
+
+    async def pending(self, limit: int) -> List[dict]:
+        return await self.collection.find(
+            {"category_pending": True},
+            {"_id": 0, "id": 1, "user_id": 1, "type": 1, "description": 1, "amount_paise": 1, "amount": 1}
+        ).limit(limit).to_list(limit)
+
+    async def user_ids(self) -> list:
+        return await self.collection.distinct("user_id")
+
+
+class BucketTransactionStore:
+    """Transactions packed into ``{user_id, month, count, transactions: [...]}`` buckets.
+
+    A month holds as many buckets as it needs, each capped at ``bucket_size``
+    rows. Rows are stored without ``user_id``; it is put back on read.
+    Transactions whose date has no month share a ``month: None`` bucket.
+
+    MongoDB time-series collections were the other option. They cannot update
+    or pull individual measurements by ``id`` (needed for deletes and
+    background categorization) and do not support unique indexes, so buckets
+    are kept as a regular collection.
+    """
+
+    def __init__(self, collection, month_of: Callable, bucket_size: int = 500):
+        self.collection = collection
+        self.month_of = month_of
+        self.bucket_size = bucket_size
+
+    @staticmethod
+    def pack(doc: dict) -> dict:
+        return {k: v for k, v in doc.items() if k not in ('user_id', '_id')}
+
+    @staticmethod
+    def unpack(user_id: str, row: dict) -> dict:
+        return {**row, "user_id": user_id}
+
+    async def push(self, user_id: str, month: Optional[str], rows: List[dict]):
+        """Append rows to a bucket with room for all of them, opening a new one if needed"""
+        await self.collection.update_one(
+            {"user_id": user_id, "month": month, "count": {"$lte": self.bucket_size - len(rows)}},
+            {"$push": {"transactions": {"$each": rows}},
+             "$inc": {"count": len(rows)},
+             "$setOnInsert": {"id": str(uuid.uuid4())}},
+            upsert=True
+        )
+
+    async def insert_one(self, doc: dict):
+        await self.push(doc['user_id'], self.month_of(doc['date']), [self.pack(doc)])
+
+    async def existing_hashes(self, user_id: str, hashes: List[str]) -> set:
+        if not hashes:
+            return set()
+        rows = await self.collection.aggregate([
+            {"$match": {"user_id": user_id, "transactions.content_hash": {"$in": hashes}}},
+            {"$unwind": "$transactions"},
+            {"$match": {"transactions.content_hash": {"$in": hashes}}},
+            {"$project": {"_id": 0, "hash": "$transactions.content_hash"}}
+        ]).to_list(None)
+        return {row['hash'] for row in rows}
+
+    async def insert_many(self, docs: List[dict]) -> tuple:
+        """Group rows by user and month and push them a bucket at a time.
+
+        Duplicate content hashes are filtered against what is already stored;
+        unlike the unique index on ``transactions`` this check is not atomic,
+        so two imports of the same file racing each other can both insert.
+        """
+        by_user = {}
+        for doc in docs:
+            by_user.setdefault(doc['user_id'], []).append(doc)
+
+        inserted, duplicates = [], 0
+        for user_id, user_docs in by_user.items():
+            stored = await self.existing_hashes(user_id, [d['content_hash'] for d in user_docs if d.get('content_hash')])
+            months = {}
+            for doc in user_docs:
+                if doc.get('content_hash') in stored:
+                    duplicates += 1
+                    continue
+                months.setdefault(self.month_of(doc['date']), []).append(doc)
+            for month, month_docs in months.items():
+                for start in range(0, len(month_docs), self.bucket_size):
+                    chunk = month_docs[start:start + self.bucket_size]
+                    await self.push(user_id, month, [self.pack(doc) for doc in chunk])
+                    inserted.extend(chunk)
+        return inserted, duplicates, []
+
+    async def delete(self, user_id: str, transaction_id: str) -> Optional[dict]:
+        selector = {"user_id": user_id, "transactions.id": transaction_id}
+        bucket = await self.collection.find_one(
+            selector, {"_id": 0, "transactions": {"$elemMatch": {"id": transaction_id}}}
+        )
+        if not bucket or not bucket.get('transactions'):
+            return None
+        deleted = self.unpack(user_id, bucket['transactions'][0])
+        result = await self.collection.update_one(
+            selector,
+            {"$pull": {"transactions": {"id": transaction_id}}, "$inc": {"count": -1}}
+        )
+        if result.modified_count == 0:
+            return None  # deleted concurrently
+        await self.collection.delete_many({"user_id": user_id, "count": {"$lte": 0}})
+        return deleted
+
+    def bucket_query(self, user_id: str, date_from=None, date_to=None, tx_type=None, category=None, after=None) -> dict:
+        query = {"user_id": user_id}
+        lower = self.month_of(date_from) if date_from else None
+        uppers = [m for m in (self.month_of(date_to) if date_to else None,
+                              self.month_of(after[0]) if after else None) if m]
+        months = {}
+        if lower:
+            months["$gte"] = lower
+        if uppers:
+            months["$lte"] = min(uppers)
+        if months:
+            query["month"] = months
+        if tx_type:
+            query["transactions.type"] = tx_type
+        if category:
+            query["transactions.category"] = category
+        return query
+
+    async def iterate(self, user_id: str, limit: Optional[int] = None, **filters):
+        """Yield rows newest first, reading buckets one month at a time"""
+        cursor = self.collection.find(self.bucket_query(user_id, **filters), {"_id": 0}).sort([("month", -1)])
+        emitted = 0
+        month, rows = None, []
+
+        def ordered(batch):
+            batch.sort(key=lambda row: (row_datetime(row.get('date')), row['id']), reverse=True)
+            return [self.unpack(user_id, row) for row in batch if matches_filter(row, **filters)]
+
+        async for bucket in cursor:
+            if rows and bucket.get('month') != month:
+                for transaction in ordered(rows):
+                    yield transaction
+                    emitted += 1
+                    if limit and emitted >= limit:
+                        return
+                rows = []
+            month = bucket.get('month')
+            rows.extend(bucket.get('transactions', []))
+        for transaction in ordered(rows):
+            yield transaction
+            emitted += 1
+            if limit and emitted >= limit:
+                return
+
+    async def find(self, user_id: str, limit: int, **filters) -> List[dict]:
+        return [transaction async for transaction in self.iterate(user_id, limit=limit, **filters)]
+
+    def summary_pipeline(self, user_id: str) -> list:
+        # The month is already on the bucket: no per-row date parsing
+        return [
+            {"$match": {"user_id": user_id}},
+            {"$unwind": "$transactions"},
+            {"$group": {
+                "_id": {
+                    "type": "$transactions.type",
+                    "category": {"$ifNull": ["$transactions.category", "Other"]},
+                    "month": "$month"
+                },
+                "total": {"$sum": stored_paise("$transactions.amount_paise", "$transactions.amount")},
+                "count": {"$sum": 1}
+            }}
+        ]
+
+    async def summary_groups(self, user_id: str) -> list:
+        return await self.collection.aggregate(self.summary_pipeline(user_id)).to_list(None)
+
+    async def set_pending_category(self, transaction_id: str, category: str, confidence: str) -> Optional[dict]:
+        selector = {"transactions": {"$elemMatch": {"id": transaction_id, "category_pending": True}}}
+        bucket = await self.collection.find_one(
+            selector, {"_id": 0, "user_id": 1, "transactions": {"$elemMatch": {"id": transaction_id}}}
+        )
+        if not bucket:
+            return None
+        previous = self.unpack(bucket['user_id'], bucket['transactions'][0])
+        result = await self.collection.update_one(
+            selector,
+            {"$set": {"transactions.$.category": category, "transactions.$.category_confidence": confidence},
+             "$unset": {"transactions.$.category_pending": ""}}
+        )
+        return previous if result.modified_count else None
+
+    async def pending(self, limit: int) -> List[dict]:
+        return await self.collection.aggregate([
+            {"$match": {"transactions.category_pending": True}},
+            {"$unwind": "$transactions"},
+            {"$match": {"transactions.category_pending": True}},
+            {"$limit": limit},
+            {"$project": {
+                "_id": 0,
+                "user_id": 1,
+                "id": "$transactions.id",
+                "type": "$transactions.type",
+                "description": "$transactions.description",
+                "amount_paise": "$transactions.amount_paise",
+                "amount": "$transactions.amount"
+            }}
+        ]).to_list(limit)
+
+    async def user_ids(self) -> list:
+        return await self.collection.distinct("user_id")
@@ -21,32 +21,20 @@ export default function Dashboard({ token, user, onLogout }) {
 
   const fetchData = async () => {
     try {
-      // Check if questionnaire is completed
-      let questionnaireData = null;
-      try {
-        const qResponse = await axios.get(`${API}/questionnaire`, {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        questionnaireData = qResponse.data;
-        setQuestionnaire(questionnaireData);
-      } catch (error) {
-        // Questionnaire not completed, redirect to setup
-        if (error.response?.status === 404) {
-          navigate('/arthvyay/questionnaire');
-          return;
-        }
-      }
-
-      const [scoreRes, transactionsRes] = await Promise.all([
-        axios.get(`${API}/reports/health-score`, {
-          headers: { Authorization: `Bearer ${token}` }
-        }),
-        axios.get(`${API}/transactions?limit=5`, {
-          headers: { Authorization: `Bearer ${token}` }
-        })
+      const headers = { Authorization: `Bearer ${token}` };
+      const [dashboardRes, transactionsRes] = await Promise.all([
+        axios.get(`${API}/dashboard?fields=questionnaire,health_score`, { headers }),
+        axios.get(`${API}/transactions?limit=5`, { headers })
       ]);
 
-      setHealthScore(scoreRes.data);
+      // Questionnaire not completed, redirect to setup
+      if (!dashboardRes.data.questionnaire) {
+        navigate('/arthvyay/questionnaire');
+        return;
+      }
+
+      setQuestionnaire(dashboardRes.data.questionnaire);
+      setHealthScore(dashboardRes.data.health_score);
       setRecentTransactions(transactionsRes.data);
     } catch (error) {
       toast.error('Failed to load dashboard data');
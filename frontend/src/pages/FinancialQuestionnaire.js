@@ -17,6 +17,7 @@ export default function FinancialQuestionnaire({ token, onLogout }) {
   const [loading, setLoading] = useState(false);
   const [initialLoading, setInitialLoading] = useState(true);
   const [isEditing, setIsEditing] = useState(false);
+  const [savedData, setSavedData] = useState(null);
   const [step, setStep] = useState(1);
   
   const defaultFormData = {
@@ -133,6 +134,7 @@ export default function FinancialQuestionnaire({ token, onLogout }) {
             loans: response.data.loans || [],
             interest_investments: response.data.interest_investments || []
           });
+          setSavedData(response.data);
           setIsEditing(true);
           toast.info('Your saved financial data has been loaded. Make any changes and submit to update.');
         }
@@ -159,6 +161,7 @@ export default function FinancialQuestionnaire({ token, onLogout }) {
         headers: { Authorization: `Bearer ${token}` }
       });
       setFormData(defaultFormData);
+      setSavedData(null);
       setIsEditing(false);
       setStep(1);
       toast.success('Financial data has been reset successfully!');
@@ -276,13 +279,29 @@ export default function FinancialQuestionnaire({ token, onLogout }) {
         monthly_investment: parseFloat(formData.monthly_investment) || 0
       };
 
-      await axios.post(`${API}/questionnaire`, payload, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
+      if (savedData) {
+        // Send only the fields that changed since the profile was loaded
+        const changes = Object.fromEntries(
+          Object.entries(payload).filter(([key, value]) => JSON.stringify(value) !== JSON.stringify(savedData[key]))
+        );
+        if (Object.keys(changes).length > 0) {
+          await axios.patch(`${API}/questionnaire`, changes, {
+            headers: { Authorization: `Bearer ${token}`, 'If-Match': `"${savedData.version || 0}"` }
+          });
+        }
+      } else {
+        await axios.post(`${API}/questionnaire`, payload, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+      }
       
       toast.success('Financial profile saved successfully!');
       navigate('/arthvyay/dashboard');
     } catch (error) {
+      if (error.response?.status === 409) {
+        toast.error('Your profile was changed elsewhere. Reload the page and try again.');
+        return;
+      }
       toast.error('Failed to save questionnaire');
     } finally {
       setLoading(false);
@@ -2,16 +2,25 @@ import { useState, useEffect } from 'react';
 import axios from 'axios';
 import { API } from '../App';
 import Layout from '../components/Layout';
+import { Button } from '../components/ui/button';
 import { Card } from '../components/ui/card';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '../components/ui/tabs';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { toast } from 'sonner';
-import { TrendingUp, TrendingDown, DollarSign } from 'lucide-react';
+import { TrendingUp, TrendingDown, DollarSign, Download, Loader2 } from 'lucide-react';
+
+const EXPORT_FORMATS = [
+  { format: 'csv', label: 'CSV' },
+  { format: 'xlsx', label: 'Excel' },
+  { format: 'pdf', label: 'PDF' }
+];
 
 export default function Reports({ token, onLogout }) {
   const [plData, setPlData] = useState(null);
   const [balanceSheet, setBalanceSheet] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [activeTab, setActiveTab] = useState('pl');
+  const [exporting, setExporting] = useState(null);
 
   useEffect(() => {
     fetchReports();
@@ -37,6 +46,29 @@ export default function Reports({ token, onLogout }) {
     }
   };
 
+  const downloadReport = async (format) => {
+    const report = activeTab === 'pl' ? 'pl' : 'balance_sheet';
+    setExporting(format);
+    try {
+      const response = await axios.post(`${API}/reports/export`, { report, format }, {
+        headers: { Authorization: `Bearer ${token}` },
+        responseType: 'blob'
+      });
+      const disposition = response.headers['content-disposition'] || '';
+      const match = disposition.match(/filename="?([^"]+)"?/);
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = match ? match[1] : `${report}.${format}`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      toast.error(error.response?.status === 429 ? 'Too many exports, try again in a minute' : 'Failed to export report');
+    } finally {
+      setExporting(null);
+    }
+  };
+
   if (loading) {
     return (
       <Layout token={token} onLogout={onLogout}>
@@ -60,12 +92,32 @@ export default function Reports({ token, onLogout }) {
   return (
     <Layout token={token} onLogout={onLogout}>
       <div className="max-w-7xl mx-auto p-6" data-testid="reports-page">
-        <div className="mb-8">
-          <h1 className="text-4xl font-bold font-heading text-slate-900 mb-2" data-testid="reports-title">Financial Reports</h1>
-          <p className="text-slate-600 font-body">Detailed P&L and Balance Sheet analysis</p>
+        <div className="flex justify-between items-center mb-8">
+          <div>
+            <h1 className="text-4xl font-bold font-heading text-slate-900 mb-2" data-testid="reports-title">Financial Reports</h1>
+            <p className="text-slate-600 font-body">Detailed P&L and Balance Sheet analysis</p>
+          </div>
+
+          <div className="flex gap-2" data-testid="report-export-buttons">
+            {EXPORT_FORMATS.map(({ format, label }) => (
+              <Button
+                key={format}
+                variant="outline"
+                className="rounded-full"
+                disabled={exporting !== null}
+                onClick={() => downloadReport(format)}
+                data-testid={`export-${format}-btn`}
+              >
+                {exporting === format
+                  ? <Loader2 className="mr-2 h-4 w-4 animate-spin" />
+                  : <Download className="mr-2 h-4 w-4" />}
+                {label}
+              </Button>
+            ))}
+          </div>
         </div>
 
-        <Tabs defaultValue="pl" className="space-y-6" data-testid="reports-tabs">
+        <Tabs value={activeTab} onValueChange={setActiveTab} className="space-y-6" data-testid="reports-tabs">
           <TabsList className="bg-slate-100 p-1 rounded-full" data-testid="reports-tabs-list">
             <TabsTrigger value="pl" className="rounded-full px-6" data-testid="pl-tab">P&L Statement</TabsTrigger>
             <TabsTrigger value="bs" className="rounded-full px-6" data-testid="bs-tab">Balance Sheet</TabsTrigger>
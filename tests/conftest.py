@@ -0,0 +1,221 @@
+"""Shared fixtures: the FastAPI app on mongomock-motor with a stub LLM client.
+
+Run from the repository root:
+
+    python -m pytest tests
+
+Everything runs offline. ``TEST_MONGO_URL`` additionally enables the checks
+that need a real mongod (query plans, summary aggregation pipelines).
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "arthverse_test")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+os.environ.setdefault("METRICS_ENABLED", "false")
+os.environ.setdefault("EXPORT_WORKERS", "1")
+
+import server as server_module  # noqa: E402
+from categorizer import CircuitBreaker, ExpenseCategorizer, VALID_CATEGORIES  # noqa: E402
+
+PASSWORD = "test-password"
+
+
+class StubLlmClient:
+    """Records prompts and answers them from ``answers`` (lowercase description
+    fragment -> category). Unknown descriptions get 'Other'. ``fail`` makes every call raise and
+    ``delay`` holds each call, so tests can overlap concurrent lookups.
+    """
+
+    def __init__(self, answers=None, delay: float = 0.0, fail: bool = False):
+        self.answers = answers or {}
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def complete(self, system_message: str, text: str) -> str:
+        self.calls.append(text)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider unavailable")
+        lines = text.splitlines()
+        if len(lines) == 1:
+            return self.pick(text)
+        return json.dumps([self.pick(line) for line in lines[1:]])
+
+    def pick(self, line: str) -> str:
+        for description, category in self.answers.items():
+            if description in line.lower():
+                assert category in VALID_CATEGORIES
+                return category
+        return "Other"
+
+
+async def python_summary_groups(user_id: str, store=None) -> list:
+    """``summary_groups`` computed in Python; mongomock has no ``$dateTrunc``.
+
+    Every first write rebuilds a rollup, so the ``server`` fixture patches it
+    in for all tests; test_summary_pipeline.py checks the real pipelines
+    against it on a real mongod.
+    """
+    groups = {}
+    async for transaction in (store or server_module.transaction_store).iterate(user_id):
+        key = (
+            transaction.get('type'),
+            transaction.get('category') or 'Other',
+            server_module.transaction_month(transaction.get('date'))
+        )
+        group = groups.setdefault(key, {
+            "_id": {"type": key[0], "category": key[1], "month": key[2]}, "total": 0, "count": 0
+        })
+        group['total'] += server_module.transaction_paise(transaction)
+        group['count'] += 1
+    return list(groups.values())
+
+
+async def create_indexes(db):
+    """``ensure_indexes`` one index at a time: mongomock's ``create_indexes``
+    drops options such as ``partialFilterExpression``
+    """
+    for collection_name, indexes in server_module.INDEXES.items():
+        for index in indexes:
+            options = dict(index.document)
+            keys = list(options.pop('key').items())
+            await db[collection_name].create_index(keys, **options)
+
+
+@pytest.fixture
+def cache_collection():
+    from mongomock_motor import AsyncMongoMockClient
+
+    return AsyncMongoMockClient()["arthverse_test"]["category_cache"]
+
+
+def make_categorizer(llm_client, cache_collection=None, **options):
+    return ExpenseCategorizer(llm_client, cache_collection=cache_collection, **options)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def server(monkeypatch, tmp_path):
+    """The server module bound to a fresh mongomock database and a stub LLM"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    server_module.open_database(AsyncMongoMockClient())
+    await create_indexes(server_module.db)
+    monkeypatch.setattr(server_module.transaction_store, "summary_groups", python_summary_groups)
+    monkeypatch.setattr(server_module, "EXPORT_DIR", tmp_path / "exports")
+
+    categorizer = server_module.categorizer
+    monkeypatch.setattr(categorizer, "llm_client", StubLlmClient())
+    monkeypatch.setattr(categorizer, "breaker", CircuitBreaker(categorizer.breaker.failure_threshold))
+    # asyncio primitives bind to the loop that first waits on them; each test runs its own
+    monkeypatch.setattr(categorizer, "semaphore", asyncio.Semaphore(server_module.LLM_MAX_CONCURRENCY))
+    categorizer.inflight.clear()
+    categorizer.memory_cache.entries.clear()
+    for name in categorizer.stats:
+        categorizer.stats[name] = 0
+    server_module.user_cache.entries.clear()
+    server_module.rate_limiter.buckets.full_at.clear()
+    server_module.rate_limiter.rejected.clear()
+    yield server_module
+    server_module.close_database()
+
+
+@pytest.fixture
+async def client(server):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+async def register(client) -> dict:
+    """Register a fresh user; returns the auth response plus ready-made headers"""
+    response = await client.post("/api/auth/register", json={
+        "email": f"user-{uuid.uuid4().hex[:8]}@example.com",
+        "password": PASSWORD,
+        "name": "Test User",
+        "mobile_number": "9999999999",
+        "age": 30,
+        "city": "Pune",
+        "marital_status": "single",
+        "no_of_dependents": 0,
+        "data_privacy_consent": True,
+        "monthly_income": 80000
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    body["headers"] = {"Authorization": f"Bearer {body['token']}"}
+    return body
+
+
+@pytest.fixture
+async def user(client):
+    return await register(client)
+
+
+def transaction(day: int, amount: float = 100.0, **fields) -> dict:
+    return {
+        "amount": amount,
+        "type": "expense",
+        "category": "Shopping",
+        "description": f"purchase {day}",
+        "date": (date(2024, 1, 1) + timedelta(days=day)).isoformat(),
+        **fields
+    }
+
+
+async def create(client, user, **fields):
+    response = await client.post("/api/transactions", json=transaction(**fields), headers=user["headers"])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def bulk(client, user, rows):
+    response = await client.post("/api/transactions/bulk", json=rows, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def month_day(offset: int, day: int = 10) -> str:
+    """A date ``offset`` calendar months before the current one"""
+    today = datetime.now(timezone.utc)
+    year, month = divmod(today.year * 12 + today.month - 1 - offset, 12)
+    return f"{year:04d}-{month + 1:02d}-{day:02d}"
+
+
+async def seed_ledger(client, user):
+    rows = [
+        (0, 90000, "income", "Salary", "salary credit"),
+        (0, 1200, "expense", "Food & Dining", "swiggy"),
+        (0, 450.75, "expense", "Transportation", "uber"),
+        (1, 90000, "income", "Salary", "salary credit"),
+        (1, 20000, "expense", "Bills & Utilities", "rent"),
+        (2, 3000, "expense", "Shopping", "amazon"),
+    ]
+    created = []
+    for offset, amount, tx_type, category, description in rows:
+        response = await client.post("/api/transactions", json={
+            "amount": amount, "type": tx_type, "category": category,
+            "description": description, "date": month_day(offset)
+        }, headers=user["headers"])
+        assert response.status_code == 200, response.text
+        created.append(response.json())
+    return created
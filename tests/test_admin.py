@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+ADMIN_HEADERS = {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+
+
+@pytest.mark.parametrize("path", ["/api/cache-stats", "/api/ai/categorization-queue", "/api/admin/slow-requests"])
+async def test_operational_routes_need_the_admin_token(client, user, path):
+    assert (await client.get(path, headers=user["headers"])).status_code == 403
+    assert (await client.get(path, headers=ADMIN_HEADERS)).status_code == 200
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from tests.conftest import bulk, transaction
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_import_skips_duplicates_on_reimport(client, user):
+    rows = [transaction(0), transaction(0), transaction(1)]
+
+    first = await bulk(client, user, rows)
+    second = await bulk(client, user, rows)
+
+    # Identical rows within one upload are kept: they are numbered, not merged
+    assert (first["inserted"], first["duplicates"]) == (3, 0)
+    assert (second["inserted"], second["duplicates"]) == (0, 3)
+    listed = (await client.get("/api/transactions", headers=user["headers"])).json()
+    assert len(listed) == 3
+
+
+async def test_bulk_import_reports_bad_rows_and_keeps_the_rest(client, user, server, monkeypatch):
+    convert = server.stored_transaction_fields
+
+    def failing_conversion(row):
+        if row.description == "unconvertible":
+            raise ValueError("amount cannot be stored in paise")
+        return convert(row)
+
+    monkeypatch.setattr(server, "stored_transaction_fields", failing_conversion)
+    rows = [
+        transaction(0),
+        {**transaction(1), "amount": -5},
+        {**transaction(2), "date": "not a date"},
+        transaction(3, description="unconvertible"),
+        transaction(4)
+    ]
+
+    report = await bulk(client, user, rows)
+
+    assert (report["received"], report["inserted"], report["failed"]) == (5, 2, 3)
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4]
+    assert "amount" in report["errors"][0]["error"]
+    assert report["errors"][2]["error"] == "amount cannot be stored in paise"
+
+
+async def test_bulk_import_accepts_ndjson_with_invalid_lines(client, user):
+    body = "\n".join([json.dumps(transaction(0)), "{not json", json.dumps(transaction(1))])
+
+    response = await client.post(
+        "/api/transactions/bulk", content=body,
+        headers={**user["headers"], "Content-Type": "application/x-ndjson"}
+    )
+
+    report = response.json()
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["row"] == 2
+
+
+async def test_bulk_import_rejects_rows_that_are_not_objects(client, user):
+    report = await bulk(client, user, ["x", 42, None, [1], transaction(0)])
+
+    assert (report["inserted"], report["failed"]) == (1, 4)
+    assert [error["error"] for error in report["errors"]] == [
+        f"row {number}: expected an object" for number in range(1, 5)
+    ]
+
+
+CSV_STATEMENT = "Date,Narration,Debit,Credit\n05/01/2024,Café Mocha,250.00,\n06/01/2024,Salary,,90000\n"
+
+
+async def upload(client, user, name, content: bytes):
+    return await client.post(
+        "/api/transactions/bulk", files={"file": (name, content)}, headers=user["headers"]
+    )
+
+
+async def test_invalid_json_upload_gets_400(client, user):
+    response = await upload(client, user, "statement.json", b'[{"amount": ')
+
+    assert response.status_code == 400
+    assert "statement.json is not valid UTF-8 JSON" in response.json()["detail"]
+
+
+async def test_non_utf8_json_upload_gets_400(client, user):
+    response = await upload(client, user, "statement.json", '[{"description": "Café"}]'.encode("latin-1"))
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "cp1252"])
+async def test_csv_upload_decodes_utf8_and_cp1252(client, user, encoding):
+    response = await upload(client, user, "statement.csv", CSV_STATEMENT.encode(encoding))
+
+    assert response.status_code == 200
+    assert (response.json()["inserted"], response.json()["failed"]) == (2, 0)
+    listed = (await client.get("/api/transactions", params={"type": "expense"}, headers=user["headers"])).json()
+    assert listed[0]["description"] == "Café Mocha"
+
+
+async def test_cp1252_csv_body_is_imported(client, user):
+    response = await client.post(
+        "/api/transactions/bulk", content=CSV_STATEMENT.encode("cp1252"),
+        headers={**user["headers"], "Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 2
+
+
+async def test_ndjson_line_with_invalid_utf8_is_a_row_error(client, user):
+    body = json.dumps(transaction(0)).encode() + b"\n" + '{"description": "Café"}'.encode("latin-1")
+
+    response = await client.post(
+        "/api/transactions/bulk", content=body, headers={**user["headers"], "Content-Type": "application/x-ndjson"}
+    )
+
+    report = response.json()
+    assert (report["inserted"], report["failed"]) == (1, 1)
+    assert report["errors"][0]["row"] == 2
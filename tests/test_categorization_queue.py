@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from categorizer import CategorizationQueue, is_fallback
+from tests.conftest import StubLlmClient, create, make_categorizer
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_model_answer_of_other_is_not_a_fallback(cache_collection):
+    categorizer = make_categorizer(StubLlmClient(), cache_collection)
+
+    result = await categorizer.categorize("mystery vendor", 100)
+
+    assert result == {"category": "Other", "confidence": "high"}
+    assert not is_fallback(result)
+
+
+async def run_queue(queue, until, timeout=2.0):
+    queue.start()
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not until():
+            assert asyncio.get_running_loop().time() < deadline, queue.snapshot()
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+
+async def test_queue_leaves_fallback_rows_pending(cache_collection):
+    categorizer = make_categorizer(StubLlmClient(fail=True), cache_collection)
+    applied, swept = [], []
+
+    async def apply(results):
+        applied.extend(results)
+
+    async def load_pending(limit):
+        swept.append(limit)
+        return []
+
+    queue = CategorizationQueue(categorizer, apply_results=apply, load_pending=load_pending, linger=0, retry_delay=0.01)
+    queue.needs_sweep = False
+    queue.enqueue({"id": "t1", "description": "vendor one", "amount": 100.0})
+    # The deferred row brings a sweep of the pending rows in the database
+    await run_queue(queue, lambda: swept)
+
+    assert applied == []
+    assert queue.stats["deferred"] == 1
+
+
+async def test_queue_applies_model_answers(cache_collection):
+    categorizer = make_categorizer(StubLlmClient({"zeta labs": "Healthcare"}), cache_collection)
+    applied = []
+
+    async def apply(results):
+        applied.extend(results)
+
+    queue = CategorizationQueue(categorizer, apply_results=apply, linger=0)
+    queue.enqueue({"id": "t1", "description": "ZETA LABS", "amount": 100.0})
+    await run_queue(queue, lambda: applied)
+
+    assert [(t["id"], r["category"]) for t, r in applied] == [("t1", "Healthcare")]
+    assert queue.stats["deferred"] == 0
+
+
+async def test_uncategorized_income_is_not_sent_to_the_categorizer(client, user, server):
+    income = await create(client, user, day=0, type="income", category=None, description="SALARY CREDIT ACME")
+    expense = await create(client, user, day=0, category="auto", description="ACME STORES")
+
+    assert (income["category"], income["category_pending"]) == (server.INCOME_DEFAULT_CATEGORY, False)
+    assert (expense["category"], expense["category_pending"]) == (server.PENDING_CATEGORY, True)
+    assert expense["id"] in server.categorization_queue.queued_ids
+    assert income["id"] not in server.categorization_queue.queued_ids
+
+
+async def test_background_categories_move_rollup_totals(client, user, server):
+    expense = await create(client, user, day=0, amount=300, category="auto", description="ZETA LABS")
+
+    await server.apply_background_categories([(expense, {"category": "Healthcare", "confidence": "high"})])
+
+    pl = (await client.get("/api/reports/pl", headers=user["headers"])).json()
+    assert pl["expenses_by_category"] == {"Healthcare": 300.0}
+    assert await server.transaction_store.pending(10) == []
@@ -0,0 +1,64 @@
+import pytest
+
+from categorizer import normalize_description
+from tests.conftest import StubLlmClient, make_categorizer
+
+pytestmark = pytest.mark.anyio
+
+
+def test_normalize_description_keeps_merchant_words():
+    assert normalize_description("UPI/SWIGGY/4821/Payment") == "swiggy"
+    assert normalize_description("POS 4412 AMAZON PAY INDIA") == "amazon pay"
+
+
+async def test_keywords_answer_without_the_model(cache_collection):
+    stub = StubLlmClient()
+    categorizer = make_categorizer(stub, cache_collection)
+
+    result = await categorizer.categorize("UPI/SWIGGY/4821/Payment", 250)
+
+    assert result == {"category": "Food & Dining", "confidence": "high"}
+    assert stub.calls == []
+    assert categorizer.stats["keyword"] == 1
+
+
+async def test_memory_cache_is_consulted_before_keywords(cache_collection):
+    stub = StubLlmClient()
+    categorizer = make_categorizer(stub, cache_collection)
+    categorizer.memory_cache.set("swiggy", {"category": "Shopping", "confidence": "high"})
+
+    result = await categorizer.categorize("SWIGGY", 250)
+
+    assert result["category"] == "Shopping"
+    assert (categorizer.stats["memory"], categorizer.stats["keyword"]) == (1, 0)
+
+
+async def test_persistent_cache_is_consulted_before_the_model(cache_collection):
+    await cache_collection.insert_one({"key": "acme tools", "category": "Shopping", "confidence": "high"})
+    stub = StubLlmClient()
+    categorizer = make_categorizer(stub, cache_collection)
+
+    result = await categorizer.categorize("ACME TOOLS 9921", 1200)
+
+    assert result == {"category": "Shopping", "confidence": "high"}
+    assert stub.calls == []
+    assert categorizer.stats["persistent"] == 1
+    # promoted to the in-process cache
+    assert categorizer.memory_cache.get("acme tools") == result
+
+
+async def test_unknown_descriptions_share_one_model_call_and_are_persisted(cache_collection):
+    stub = StubLlmClient({"zeta labs": "Healthcare", "orbit hall": "Entertainment"})
+    categorizer = make_categorizer(stub, cache_collection)
+
+    results = await categorizer.categorize_many([("ZETA LABS", 500), ("ORBIT HALL", 900), ("SWIGGY", 300)])
+
+    assert [r["category"] for r in results] == ["Healthcare", "Entertainment", "Food & Dining"]
+    assert len(stub.calls) == 1
+    stored = {doc["key"]: doc["category"] async for doc in cache_collection.find({})}
+    assert stored == {"zeta labs": "Healthcare", "orbit hall": "Entertainment"}
+
+    # A fresh process finds them in the persistent cache
+    restarted = make_categorizer(StubLlmClient(), cache_collection)
+    assert (await restarted.categorize("zeta labs", 500))["category"] == "Healthcare"
+    assert restarted.llm_client.calls == []
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_MONGO_URL"), reason="query plans need a real mongod (TEST_MONGO_URL)")
+async def test_route_queries_use_indexes(server):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    server.open_database(AsyncIOMotorClient(os.environ["TEST_MONGO_URL"]))
+    try:
+        await server.ensure_indexes()
+        results = await server.explain_route_queries()
+        assert [r["route"] for r in results if r["collscan"]] == []
+    finally:
+        await server.client.drop_database(server.DB_NAME)
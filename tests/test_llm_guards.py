@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from categorizer import FALLBACK, CircuitBreaker, is_fallback
+from tests.conftest import StubLlmClient, make_categorizer
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_identical_lookups_make_one_call(cache_collection):
+    stub = StubLlmClient({"nimbus": "Travel"}, delay=0.05)
+    categorizer = make_categorizer(stub, cache_collection)
+
+    results = await asyncio.gather(*(categorizer.categorize("NIMBUS", 150) for _ in range(5)))
+
+    assert all(result["category"] == "Travel" for result in results)
+    assert len(stub.calls) == 1
+    assert categorizer.stats["coalesced"] == 4
+
+
+async def test_different_amount_buckets_are_not_coalesced(cache_collection):
+    stub = StubLlmClient({"nimbus": "Travel"}, delay=0.05)
+    categorizer = make_categorizer(stub, cache_collection)
+
+    await asyncio.gather(categorizer.categorize("NIMBUS", 150), categorizer.categorize("NIMBUS", 150000))
+
+    assert len(stub.calls) == 2
+
+
+async def test_breaker_opens_after_repeated_failures(cache_collection):
+    stub = StubLlmClient(fail=True)
+    clock = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: clock[0])
+    categorizer = make_categorizer(stub, cache_collection, breaker=breaker)
+
+    first = await categorizer.categorize("vendor one", 100)
+    await categorizer.categorize("vendor two", 100)
+    third = await categorizer.categorize("vendor three", 100)
+
+    assert is_fallback(first) and is_fallback(third)
+    assert len(stub.calls) == 2
+    assert breaker.state == "open"
+    assert categorizer.stats["short_circuited"] == 1
+
+    # Half-open after the cooldown: one trial call, which closes the breaker
+    stub.fail = False
+    clock[0] = 31
+    assert not is_fallback(await categorizer.categorize("vendor four", 100))
+    assert breaker.state == "closed"
+
+
+async def test_timeout_returns_the_fallback(cache_collection):
+    stub = StubLlmClient(delay=1)
+    categorizer = make_categorizer(stub, cache_collection, timeout=0.01)
+
+    result = await categorizer.categorize("slow vendor", 100)
+
+    assert result is FALLBACK
+    assert categorizer.stats["timeouts"] == 1
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from tests.conftest import bulk, create, transaction
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_keyset_pages_cover_every_row_once(client, user):
+    # Two rows per day, so pages break inside a date and the id tie-break matters
+    created = [await create(client, user, day=day // 2) for day in range(7)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/transactions", params=params, headers=user["headers"])
+        assert response.status_code == 200
+        seen.extend(row["id"] for row in response.json())
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(row["id"] for row in created)
+    expected = sorted(created, key=lambda row: (row["date"], row["id"]), reverse=True)
+    assert seen == [row["id"] for row in expected]
+
+
+async def test_filters_apply_with_the_cursor(client, user):
+    for day in range(4):
+        await create(client, user, day=day, category="Travel" if day % 2 else "Shopping")
+
+    response = await client.get(
+        "/api/transactions", params={"category": "Travel", "limit": 1}, headers=user["headers"]
+    )
+    first = response.json()
+    second = (await client.get(
+        "/api/transactions",
+        params={"category": "Travel", "limit": 1, "cursor": response.headers["x-next-cursor"]},
+        headers=user["headers"]
+    )).json()
+
+    assert [row["date"] for row in first + second] == ["2024-01-04", "2024-01-02"]
+
+
+async def test_invalid_cursor_is_rejected(client, user):
+    response = await client.get("/api/transactions", params={"cursor": "not-a-cursor"}, headers=user["headers"])
+    assert response.status_code == 400
+
+
+async def test_ndjson_streams_every_row_unless_limited(client, user, server):
+    await bulk(client, user, [transaction(day) for day in range(server.TRANSACTIONS_DEFAULT_PAGE_SIZE + 5)])
+
+    response = await client.get("/api/transactions", params={"format": "ndjson"}, headers=user["headers"])
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == server.TRANSACTIONS_DEFAULT_PAGE_SIZE + 5
+
+    limited = await client.get(
+        "/api/transactions", params={"format": "ndjson", "limit": 10}, headers=user["headers"]
+    )
+    assert len(limited.text.splitlines()) == 10
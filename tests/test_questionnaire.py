@@ -0,0 +1,71 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def save_questionnaire(client, user) -> str:
+    response = await client.post(
+        "/api/questionnaire", json={"salary_income": 80000, "rent_expense": 20000}, headers=user["headers"]
+    )
+    assert response.status_code == 200, response.text
+    return (await client.get("/api/questionnaire", headers=user["headers"])).headers["etag"]
+
+
+async def test_patch_without_a_version_gets_428(client, user):
+    await save_questionnaire(client, user)
+
+    response = await client.patch("/api/questionnaire", json={"groceries": 9000}, headers=user["headers"])
+
+    assert response.status_code == 428
+
+
+async def test_patch_with_a_stale_version_gets_409(client, user):
+    etag = await save_questionnaire(client, user)
+    first = await client.patch(
+        "/api/questionnaire", json={"groceries": 9000}, headers={**user["headers"], "If-Match": etag}
+    )
+    assert first.status_code == 200
+    assert first.headers["etag"] != etag
+
+    stale = await client.patch(
+        "/api/questionnaire", json={"fuel": 4000}, headers={**user["headers"], "If-Match": etag}
+    )
+
+    assert stale.status_code == 409
+    saved = (await client.get("/api/questionnaire", headers=user["headers"])).json()
+    assert (saved["groceries"], saved["fuel"]) == (9000, 0)
+
+
+async def test_patch_accepts_the_version_in_the_body(client, user):
+    etag = await save_questionnaire(client, user)
+
+    response = await client.patch(
+        "/api/questionnaire", json={"version": int(etag.strip('"')), "rent_expense": None}, headers=user["headers"]
+    )
+
+    assert response.status_code == 200
+    assert response.json()["rent_expense"] == 0
+    assert response.json()["salary_income"] == 80000
+
+
+async def test_patch_rejects_fields_outside_the_section(client, user, server):
+    etag = await save_questionnaire(client, user)
+    section = next(iter(server.QUESTIONNAIRE_SECTIONS))
+    outside = sorted(server.QUESTIONNAIRE_FIELDS - set(server.QUESTIONNAIRE_SECTIONS[section]))[0]
+
+    response = await client.patch(
+        "/api/questionnaire", params={"section": section}, json={outside: 1},
+        headers={**user["headers"], "If-Match": etag}
+    )
+
+    assert response.status_code == 400
+
+
+async def test_get_projects_requested_fields(client, user):
+    await save_questionnaire(client, user)
+
+    response = await client.get(
+        "/api/questionnaire", params={"fields": "salary_income"}, headers=user["headers"]
+    )
+
+    assert response.json() == {"salary_income": 80000, "version": 1}
@@ -0,0 +1,63 @@
+import pytest
+
+from ratelimit import RateLimiter, TokenBuckets, parse_rate
+from tests.conftest import PASSWORD, register
+
+pytestmark = pytest.mark.anyio
+
+
+def test_parse_rate():
+    assert parse_rate("10/min") == (10, 60.0)
+    assert parse_rate("5/30") == (5, 30.0)
+    assert parse_rate("0") is None
+    with pytest.raises(ValueError):
+        parse_rate("-1/min")
+
+
+def test_token_bucket_refills_over_time():
+    buckets = TokenBuckets()
+    rate = parse_rate("2/10")
+
+    assert [buckets.take("k", rate, now=0) for _ in range(2)] == [0.0, 0.0]
+    assert buckets.take("k", rate, now=0) == pytest.approx(5.0)
+    assert buckets.peek("k", rate, now=5) == 0.0
+    assert buckets.take("k", rate, now=5) == 0.0
+
+
+def test_a_full_burst_is_allowed_despite_float_error():
+    buckets = TokenBuckets()
+    rate = parse_rate("7/10")
+    # Seven intervals of 10/7s summed onto this clock overshoot the period by a few ns
+    now = 9693605.310302658
+
+    assert [buckets.take("k", rate, now=now) for _ in range(7)] == [0.0] * 7
+    assert buckets.take("k", rate, now=now) == pytest.approx(10 / 7)
+
+
+async def test_a_rejected_scope_does_not_drain_the_others():
+    limiter = RateLimiter({"login": {"ip": parse_rate("3/min"), "client_id": parse_rate("1/min")}})
+
+    assert await limiter.check("login", ip="10.0.0.1", client_id="AVABUSER") == 0.0
+    for _ in range(5):
+        assert await limiter.check("login", ip="10.0.0.1", client_id="AVABUSER") > 0
+
+    # The abusive account used one IP token; the other two are still there
+    assert await limiter.check("login", ip="10.0.0.1", client_id="AVOTHER1") == 0.0
+    assert await limiter.check("login", ip="10.0.0.1", client_id="AVOTHER2") == 0.0
+    assert await limiter.check("login", ip="10.0.0.1", client_id="AVOTHER3") > 0
+    assert limiter.rejected == {("login", "client_id"): 5, ("login", "ip"): 1}
+
+
+async def test_login_is_throttled_per_client_id_with_retry_after(client, server):
+    user = await register(client)
+    credentials = {"client_id": user["user"]["client_id"], "password": "wrong"}
+    limit = server.rate_limiter.rules["login"]["client_id"].limit
+
+    statuses = [(await client.post("/api/auth/login", json=credentials)).status_code for _ in range(limit)]
+    throttled = await client.post(
+        "/api/auth/login", json={**credentials, "password": PASSWORD}
+    )
+
+    assert statuses == [401] * limit
+    assert throttled.status_code == 429
+    assert int(throttled.headers["retry-after"]) >= 1
@@ -0,0 +1,58 @@
+import pytest
+
+from tests.conftest import month_day, seed_ledger
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rollup_matches_raw_transactions_after_writes(client, user, server):
+    created = await seed_ledger(client, user)
+    await client.delete(f"/api/transactions/{created[1]['id']}", headers=user["headers"])
+
+    rollup_summary = await server.get_ledger_summary(user["user"]["id"])
+    raw_summary = await server.get_transaction_summary(user["user"]["id"])
+
+    assert rollup_summary == raw_summary
+    assert rollup_summary["total_income"] == 180000
+    assert rollup_summary["total_expenses"] == 23450.75
+    assert "Food & Dining" not in rollup_summary["expenses_by_category"]
+    assert await server.repair_user_rollup(user["user"]["id"]) is False
+
+
+async def test_repair_rebuilds_a_drifted_rollup(client, user, server):
+    await seed_ledger(client, user)
+    user_id = user["user"]["id"]
+    await server.db.user_rollups.update_one(
+        {"user_id": user_id}, {"$inc": {"by_type.expense.total": 12345}}
+    )
+    assert await server.get_ledger_summary(user_id) != await server.get_transaction_summary(user_id)
+
+    assert await server.repair_user_rollup(user_id) is True
+
+    assert await server.get_ledger_summary(user_id) == await server.get_transaction_summary(user_id)
+    assert await server.repair_user_rollup(user_id) is False
+
+
+async def test_rebuild_does_not_overwrite_a_concurrent_write(client, user, server, monkeypatch):
+    await seed_ledger(client, user)
+    user_id = user["user"]["id"]
+    aggregate = server.transaction_store.summary_groups
+    raced = []
+
+    async def summary_groups_then_write(group_user_id):
+        groups = await aggregate(group_user_id)
+        if not raced:
+            # A transaction written between the aggregation and the rollup replace
+            raced.append(await client.post("/api/transactions", json={
+                "amount": 500, "type": "expense", "category": "Shopping",
+                "description": "concurrent", "date": month_day(0)
+            }, headers=user["headers"]))
+        return groups
+
+    monkeypatch.setattr(server.transaction_store, "summary_groups", summary_groups_then_write)
+    await server.rebuild_user_rollup(user_id)
+
+    assert raced[0].status_code == 200
+    assert await server.get_ledger_summary(user_id) == await server.get_transaction_summary(user_id)
+    trend = (await client.get("/api/reports/trend", params={"months": 1}, headers=user["headers"])).json()
+    assert trend["series"][-1]["expenses"] == 1650.75 + 500
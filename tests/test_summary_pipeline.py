@@ -0,0 +1,73 @@
+"""The stores' summary aggregation pipelines on a real mongod.
+
+mongomock implements neither ``$dateTrunc`` nor ``$convert``/``$toDecimal``,
+so the other tests use ``python_summary_groups``; these check that the real
+pipelines agree with it, legacy float amounts and string dates included.
+"""
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import python_summary_groups
+from transaction_store import BucketTransactionStore, DocumentTransactionStore
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not os.environ.get("TEST_MONGO_URL"), reason="needs a real mongod (TEST_MONGO_URL)")
+]
+
+USER_ID = "pipeline-user"
+
+TYPED = [
+    {"amount_paise": 12345, "date": datetime(2024, 1, 5), "type": "expense", "category": "Food & Dining"},
+    {"amount_paise": 9000000, "date": datetime(2024, 2, 1), "type": "income", "category": None},
+]
+
+# As stored before scripts/backfill_typed_transactions.py: float rupees, string dates
+LEGACY = [
+    {"amount": 1234.565, "date": "2024-01-20", "type": "expense", "category": "Food & Dining"},
+    {"amount": 0.1 + 0.2, "date": "2024-02-29", "type": "expense", "category": "Shopping"},
+    {"amount": -19.995, "date": "2024-02-10", "type": "expense", "category": "Shopping"},
+    {"amount": 50.0, "date": "not a date", "type": "expense", "category": "Other"},
+]
+
+
+@pytest.fixture
+async def mongo_db():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ["TEST_MONGO_URL"])
+    name = f"arthverse_pipeline_{uuid.uuid4().hex[:8]}"
+    yield client[name]
+    await client.drop_database(name)
+    client.close()
+
+
+def comparable(groups: list) -> list:
+    rows = []
+    for group in groups:
+        key = group["_id"]
+        month = key.get("month")
+        month = month.strftime("%Y-%m") if isinstance(month, datetime) else month
+        rows.append((key["type"], key["category"], month or "", int(group["total"]), group["count"]))
+    return sorted(rows)
+
+
+@pytest.mark.parametrize("layout", ["documents", "buckets"])
+async def test_summary_pipeline_matches_the_python_twin(server, mongo_db, layout):
+    if layout == "documents":
+        store = DocumentTransactionStore(mongo_db.transactions)
+    else:
+        store = BucketTransactionStore(mongo_db.transaction_buckets, month_of=server.transaction_month)
+    for number, row in enumerate(TYPED + LEGACY):
+        await store.insert_one({**row, "id": f"t{number}", "user_id": USER_ID})
+
+    groups = comparable(await store.summary_groups(USER_ID))
+
+    assert groups == comparable(await python_summary_groups(USER_ID, store))
+    assert ("expense", "Food & Dining", "2024-01", 12345 + 123457, 2) in groups
+    assert ("expense", "Shopping", "2024-02", 30 - 2000, 2) in groups
+    assert ("income", "Other", "2024-02", 9000000, 1) in groups
+    assert ("expense", "Other", "", 5000, 1) in groups
@@ -0,0 +1,47 @@
+import pytest
+
+from tests.conftest import month_day, seed_ledger
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_incremental_trends_match_a_rebuild(client, user, server):
+    created = await seed_ledger(client, user)
+    await client.delete(f"/api/transactions/{created[2]['id']}", headers=user["headers"])
+    user_id = user["user"]["id"]
+
+    def live_months(docs):
+        # Deletes leave zero-count buckets behind; a rebuild doesn't write them
+        return {doc["month"]: server.summary_from_rollup(doc) for doc in docs}
+
+    incremental = live_months(await server.db.monthly_trends.find({"user_id": user_id}).to_list(None))
+    await server.rebuild_user_rollup(user_id)
+    rebuilt = live_months(await server.db.monthly_trends.find({"user_id": user_id}).to_list(None))
+
+    assert incremental == rebuilt
+
+
+async def test_trend_report_series(client, user):
+    await seed_ledger(client, user)
+
+    response = await client.get("/api/reports/trend", params={"months": 3, "window": 2}, headers=user["headers"])
+
+    assert response.status_code == 200
+    series = {point["month"]: point for point in response.json()["series"]}
+    assert list(series) == [month_day(offset)[:7] for offset in (2, 1, 0)]
+    current = series[month_day(0)[:7]]
+    assert (current["income"], current["expenses"]) == (90000, 1650.75)
+    assert current["expenses_by_category"] == {"Food & Dining": 1200, "Transportation": 450.75}
+    previous = series[month_day(1)[:7]]
+    assert previous["net"] == 70000
+    assert current["rolling_income"] == 90000
+
+
+async def test_windowed_pl_reads_the_trend_series(client, user):
+    await seed_ledger(client, user)
+
+    last_two = (await client.get("/api/reports/pl", params={"months": 2}, headers=user["headers"])).json()
+    all_time = (await client.get("/api/reports/pl", headers=user["headers"])).json()
+
+    assert last_two["total_expenses"] == 1650.75 + 20000
+    assert all_time["total_expenses"] == last_two["total_expenses"] + 3000